@@ -7,10 +7,10 @@ import json
 import re
 from datetime import datetime
 from urllib.parse import urlparse
-import tldextract
 
 from app.config import get_settings
 from app.services.scraper import scraper
+from app.services.domain_parser import domain_parser
 from app.services.classifier import classifier
 from app.services.embeddings import get_embedding_service
 
@@ -42,10 +42,21 @@ class ArchivistAgent:
             raise
         self.embedding_service = get_embedding_service()
     
-    async def process(self, url: str, original_title: str) -> Dict:
+    async def process(
+        self,
+        url: str,
+        original_title: str,
+        scraped: Optional[Dict] = None,
+    ) -> Dict:
         """
         Procesa un bookmark a través del Agente Archivista
         
+        Args:
+            url: URL del bookmark
+            original_title: Título original
+            scraped: Resultado previo de scraper.scrape_url (ej: de scrape_many).
+                Si es None se scrapea aquí.
+        
         Returns:
             Dict con: clean_title, full_text, is_nsfw, scraping_status, error_type, etc.
         """
@@ -60,6 +71,7 @@ class ArchivistAgent:
             "is_local": False,
             "domain": None,
             "language": None,
+            "favicon_url": None,
             "word_count": 0,
             "error": None,
             # Nuevos campos de resiliencia
@@ -71,10 +83,12 @@ class ArchivistAgent:
         
         try:
             # 1. Scraping del contenido con estrategias resilientes
-            scraped = await scraper.scrape_url(url)
+            if scraped is None:
+                scraped = await scraper.scrape_url(url)
             
             result["domain"] = scraped.get("domain")
             result["language"] = scraped.get("language")
+            result["favicon_url"] = scraped.get("favicon_url")
             result["word_count"] = scraped.get("word_count", 0)
             result["scraping_strategy"] = scraped.get("strategy")
             result["scraping_error_type"] = scraped.get("error_type")
@@ -286,7 +300,7 @@ class CuratorAgent:
                 
                 # Generar embedding
                 text_for_embedding = f"{clean_title}. {result['summary']}"
-                embedding = self.embedding_service.generate_embedding(text_for_embedding)
+                embedding = await self.embedding_service.embed(text_for_embedding)
                 result["embedding"] = embedding
                 
                 result["success"] = True
@@ -470,13 +484,13 @@ Responde SOLO con el JSON."""
     def _analyze_domain(self, url: str) -> Dict:
         """Extrae información estructurada del dominio"""
         try:
-            extracted = tldextract.extract(url)
+            extracted = domain_parser.parse(url)
             
             return {
                 "domain": extracted.domain,
                 "tld": extracted.suffix,
                 "subdomains": extracted.subdomain.split('.') if extracted.subdomain else [],
-                "full_domain": f"{extracted.domain}.{extracted.suffix}"
+                "full_domain": extracted.registered_domain
             }
         
         except Exception as e:
@@ -541,6 +555,7 @@ def _default_orchestrator_result(url: str, original_title: str) -> Dict:
         "is_local": False,
         "domain": None,
         "language": None,
+        "favicon_url": None,
         "word_count": 0,
         "embedding": None,
         "status": "failed",
@@ -566,6 +581,7 @@ def _merge_archivist_into_result(result: Dict, archivist_result: Dict, original_
         "is_local": archivist_result.get("is_local", False),
         "domain": archivist_result.get("domain"),
         "language": archivist_result.get("language"),
+        "favicon_url": archivist_result.get("favicon_url"),
         "word_count": archivist_result.get("word_count", 0),
         "scraping_status": archivist_result.get("scraping_status", "failed"),
         "scraping_strategy": archivist_result.get("scraping_strategy"),
@@ -586,10 +602,12 @@ class AgentOrchestrator:
         self.archivist = ArchivistAgent()
         self.curator = CuratorAgent()
 
-    async def _run_archivist(self, url: str, original_title: str) -> Dict:
+    async def _run_archivist(
+        self, url: str, original_title: str, scraped: Optional[Dict] = None
+    ) -> Dict:
         """Ejecuta el agente archivista y devuelve su resultado (nunca lanza)."""
         try:
-            return await self.archivist.process(url, original_title)
+            return await self.archivist.process(url, original_title, scraped)
         except Exception as e:
             logger.exception("Error en Agente Archivista")
             return {"error": str(e)}
@@ -631,17 +649,22 @@ class AgentOrchestrator:
             url, result["status"], result["confidence_score"],
         )
 
-    async def process_bookmark(self, url: str, original_title: str) -> Dict:
+    async def process_bookmark(
+        self, url: str, original_title: str, scraped: Optional[Dict] = None
+    ) -> Dict:
         """
         Procesa un bookmark completo a través de ambos agentes.
         Garantiza que siempre se intenta la curación, incluso si scraping falla.
+        
+        `scraped` permite pasar un resultado ya obtenido con scraper.scrape_many
+        para que los imports masivos scrapeen en paralelo.
         """
         start_time = datetime.now()
         logger.info("[Orchestrator] Iniciando procesamiento: %s", url)
         result = _default_orchestrator_result(url, original_title)
 
         try:
-            archivist_result = await self._run_archivist(url, original_title)
+            archivist_result = await self._run_archivist(url, original_title, scraped)
             _merge_archivist_into_result(result, archivist_result, original_title)
 
             if result["is_local"]:
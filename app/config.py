@@ -1,7 +1,7 @@
 # app/config.py
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
-from typing import List
+from typing import Dict, List, Tuple
 
 
 class Settings(BaseSettings):
@@ -26,10 +26,112 @@ class Settings(BaseSettings):
         "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
     )
     SCRAPER_TIMEOUT: int = 30
-    SCRAPER_MAX_RETRIES: int = 3
+    SCRAPER_MAX_RETRIES: int = 3  # peticiones totales por URL (todas las capas)
     SCRAPER_MAX_REDIRECTS: int = 5
     SCRAPER_DELAY_BETWEEN_REQUESTS: float = 1.0
 
+    # Presupuesto por URL: deadline total y backoff exponencial con jitter
+    # entre intentos (0 desactiva el deadline)
+    SCRAPER_URL_DEADLINE: float = 60.0
+    SCRAPER_RETRY_BACKOFF_BASE: float = 1.0
+    SCRAPER_RETRY_BACKOFF_MAX: float = 10.0
+
+    # Fallos transitorios (429, timeouts, 5xx, circuito abierto) no se esperan
+    # en línea: el bookmark guarda next_attempt_at (Retry-After o backoff
+    # exponencial desde la base) y reprocess_failed.py lo recoge después
+    SCRAPER_REQUEUE_BASE_DELAY: float = 300.0
+    SCRAPER_REQUEUE_MAX_DELAY: float = 86400.0
+    SCRAPER_REQUEUE_MAX_RETRIES: int = 5
+
+    # Hedging: si una petición no recibe headers en el percentil N del tiempo
+    # habitual de su host, se lanza otra con headers distintos (sólo si hay
+    # capacidad sin esperar) y gana la primera que termine
+    SCRAPER_HEDGING: bool = False
+    SCRAPER_HEDGE_PERCENTILE: float = 95.0
+    SCRAPER_HEDGE_MIN_SAMPLES: int = 20
+    SCRAPER_HEDGE_MIN_DELAY: float = 1.0
+
+    # Archivo WARC (append-only, gzip) de las respuestas en bruto, para volver
+    # a extraer con scripts/reextract_warc.py sin volver a descargar
+    SCRAPER_WARC_ENABLED: bool = False
+    SCRAPER_WARC_DIR: str = "data/warc"
+    SCRAPER_WARC_MAX_FILE_BYTES: int = 1_000_000_000
+
+    # Mapa persistente URL -> URL final (acortadores, http -> https...). Las
+    # cadenas sólo 301/308 duran SCRAPER_REDIRECT_TTL; con 302/307, TEMP_TTL
+    SCRAPER_REDIRECT_CACHE: bool = True
+    SCRAPER_REDIRECT_CACHE_FILE: str = "data/redirects.sqlite3"
+    SCRAPER_REDIRECT_TTL: float = 2592000.0
+    SCRAPER_REDIRECT_TEMP_TTL: float = 86400.0
+
+    # Preferencia de estrategia por dominio: con MIN_SAMPLES éxitos y una
+    # estrategia que gana MIN_SHARE de las veces, se prueba ésa primero.
+    # EXPLORE_RATE de las extracciones recorren la cadena completa igualmente
+    SCRAPER_STRATEGY_LEARNING: bool = True
+    SCRAPER_STRATEGY_MIN_SAMPLES: int = 5
+    SCRAPER_STRATEGY_MIN_SHARE: float = 0.8
+    SCRAPER_STRATEGY_EXPLORE_RATE: float = 0.05
+
+    # Parseo de dominios (app/services/domain_parser.py): sin red, con la
+    # Public Suffix List incluida en tldextract o la de este fichero
+    DOMAIN_SUFFIX_LIST_FILE: str = ""
+    DOMAIN_PARSER_CACHE_SIZE: int = 100_000
+
+    # Canonicalización de URLs (app/services/canonicalizer.py): packs de
+    # reglas por sitio adicionales (JSON), plegado de hosts m./mobile./amp.
+    # y fichero con los contadores de tracking acumulados
+    URL_RULE_PACKS_FILE: str = ""
+    URL_FOLD_MOBILE_HOSTS: bool = True
+    URL_STATS_FILE: str = "data/url_stats.json"
+
+    # Pool de conexiones HTTP compartido (keep-alive)
+    SCRAPER_MAX_CONNECTIONS: int = 100
+    SCRAPER_MAX_CONNECTIONS_PER_HOST: int = 6
+    SCRAPER_KEEPALIVE_EXPIRY: float = 30.0
+    SCRAPER_HTTP2: bool = False
+
+    # Rate limiting por dominio (token bucket). El ritmo por defecto sale de
+    # SCRAPER_DELAY_BETWEEN_REQUESTS; overrides como CSV "dominio=rate/burst",
+    # ej: "github.com=2/5,medium.com=0.5/1"
+    SCRAPER_DOMAIN_BURST: int = 1
+    SCRAPER_DOMAIN_RATE_LIMITS: str = ""
+    SCRAPER_MAX_CONCURRENCY: int = 16
+    # Workers por defecto de scraper.scrape_many (importaciones masivas)
+    SCRAPER_CONCURRENCY: int = 8
+
+    # Descarga en streaming: el HTML se corta al llegar al límite; los tipos con
+    # extractor propio (PDF) se descartan si lo superan; el resto ni se descarga
+    SCRAPER_MAX_BODY_BYTES: int = 2_000_000
+    SCRAPER_MAX_DOCUMENT_BYTES: int = 20_000_000
+
+    # Caché de páginas en disco (revalidación con ETag/Last-Modified).
+    # off: sin caché | on: revalidar y guardar | only: sólo caché, sin red
+    SCRAPER_CACHE_MODE: str = "on"
+    SCRAPER_CACHE_DIR: str = "data/page_cache"
+    SCRAPER_CACHE_MAX_BYTES: int = 500_000_000
+
+    # Caché DNS (TTL) y caché negativa de hosts que no resuelven o rechazan
+    # conexiones; esta última se guarda en disco entre ejecuciones
+    SCRAPER_DNS_TTL: float = 300.0
+    # Happy eyeballs: segundos antes de probar la siguiente dirección del host
+    # en paralelo (una IPv6 sin ruta no bloquea la conexión)
+    SCRAPER_CONNECT_ATTEMPT_DELAY: float = 0.25
+    SCRAPER_DEAD_HOST_COOLDOWN: float = 86400.0
+    SCRAPER_DEAD_HOSTS_FILE: str = "data/dead_hosts.json"
+
+    # Circuit breaker por dominio: tras N fallos consecutivos (timeouts,
+    # conexión) se deja de pedir al dominio durante el cool-down; un 429 lo
+    # abre al primero y un 403 al segundo. 0 desactiva el circuit breaker
+    SCRAPER_CIRCUIT_FAILURE_THRESHOLD: int = 3
+    SCRAPER_CIRCUIT_COOLDOWN: float = 300.0
+    SCRAPER_CIRCUIT_MAX_COOLDOWN: float = 3600.0
+
+    # Extracción (lxml + trafilatura) fuera del event loop
+    SCRAPER_EXTRACTION_EXECUTOR: str = "process"  # process | thread
+    SCRAPER_EXTRACTION_WORKERS: int = 2
+    SCRAPER_EXTRACTION_TIMEOUT: float = 20.0
+    SCRAPER_EXTRACTION_MAX_TASKS_PER_CHILD: int = 200
+
     # FIX: Mantener como str + @property para evitar que pydantic-settings
     # intente deserializar como JSON antes de que el validator pueda actuar.
     # pydantic-settings v2 falla con List[str] + validation_alias cuando el
@@ -39,6 +141,20 @@ class Settings(BaseSettings):
     # --- Configuración de IA y Agentes ---
     EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
     EMBEDDING_MODEL_NAME: str = "sentence-transformers/all-MiniLM-L6-v2"
+    # Micro-batching (EmbeddingService.embed): las peticiones concurrentes se
+    # agrupan hasta BATCH_MAX_SIZE textos o BATCH_MAX_WAIT_MS de espera
+    EMBEDDING_BATCH_MAX_SIZE: int = 32
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = 5.0
+    # Inferencia en un executor propio (nunca en el event loop): hilos del
+    # executor e hilos de torch por forward (0 = los que decida torch)
+    EMBEDDING_WORKERS: int = 1
+    EMBEDDING_TORCH_THREADS: int = 0
+
+    # Monitor del event loop (app/services/loop_monitor.py): cada cuánto se
+    # mide el retraso y a partir de cuántos ms cuenta como bloqueo
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL_MS: float = 100.0
+    LOOP_MONITOR_STALL_MS: float = 50.0
     LLM_MODEL_NAME: str = "llama-3.1-8b-instant"
     GROQ_MODEL: str = "llama-3.1-8b-instant"
     CHUNK_SIZE: int = 1000
@@ -49,6 +165,13 @@ class Settings(BaseSettings):
     # pydantic-settings intentando JSON-decode en campos List[str].
     NSFW_KEYWORDS: str = "porn,sex,xxx,nude,casino,gambling"
     NSFW_DOMAINS: str = "pornhub.com,xvideos.com"
+    # Blocklist adicional (un dominio por línea o formato hosts); también
+    # cubre subdominios
+    NSFW_DOMAINS_FILE: str = ""
+    # Reclasificación en bloque (scripts/reclassify.py): procesos (0 = todos
+    # los núcleos) y filas leídas de la base de datos por bloque
+    CLASSIFIER_WORKERS: int = 0
+    CLASSIFIER_BATCH_SIZE: int = 2000
     ENABLE_SAFETY_FILTER: bool = True
 
     # --- Pydantic V2 Config ---
@@ -72,6 +195,17 @@ class Settings(BaseSettings):
     def nsfw_domains_list(self) -> List[str]:
         return [x.strip().lower() for x in self.NSFW_DOMAINS.split(",") if x.strip()]
 
+    @property
+    def domain_rate_limits(self) -> Dict[str, Tuple[float, int]]:
+        limits = {}
+        for item in self.SCRAPER_DOMAIN_RATE_LIMITS.split(","):
+            if "=" not in item:
+                continue
+            domain, spec = item.split("=", 1)
+            rate, _, burst = spec.partition("/")
+            limits[domain.strip().lower()] = (float(rate), int(burst or 1))
+        return limits
+
     @property
     def is_production(self) -> bool:
         return getattr(self, "ENVIRONMENT", "development").lower() == "production"
@@ -3,6 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, or_, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from typing import List, Optional
 from datetime import datetime
 from loguru import logger
@@ -14,7 +15,7 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
 from app.config import get_settings
-from app.database import get_db, init_db, close_db
+from app.database import get_db, get_db_context, init_db, close_db
 from app.models import Bookmark, SearchHistory, ProcessingLog
 from app.schemas import (
     BookmarkResponse,
@@ -26,7 +27,10 @@ from app.schemas import (
     HealthResponse,
 )
 from app.services.embeddings import get_embedding_service
+from app.services.loop_monitor import loop_monitor
+from app.services.scraper import scraper
 from app.agents import orchestrator
+from app.services.canonicalizer import canonicalizer
 from app.utils.validators import URLValidator
 
 # Configurar logging
@@ -70,8 +74,12 @@ async def startup_event():
     try:
         await init_db()
         logger.info("✅ Base de datos inicializada")
+        async with get_db_context() as db:
+            await scraper.learn_strategies(db)
+        if settings.LOOP_MONITOR_ENABLED:
+            loop_monitor.start()
         embedding_service = get_embedding_service()
-        _ = embedding_service.model
+        await embedding_service.warmup()
         logger.info("✅ Modelo de embeddings cargado")
         logger.info("🎉 Sistema listo!")
     except Exception as e:
@@ -82,6 +90,10 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("👋 Cerrando Neural Bookmark Brain...")
+    await loop_monitor.stop()
+    await get_embedding_service().aclose()
+    await scraper.aclose()
+    canonicalizer.flush_stats()
     await close_db()
     logger.info("✅ Conexiones cerradas")
 
@@ -117,6 +129,7 @@ async def health_check(db: AsyncSession = Depends(get_db)):
 DEFAULT_BOOKMARK_LIMIT = 50
 MAX_BOOKMARK_LIMIT = 100
 MAX_EXPORT_LIMIT = 10_000
+REEMBED_CHUNK_SIZE = 256
 
 
 @app.post("/bookmarks", response_model=BookmarkResponse, status_code=status.HTTP_201_CREATED, tags=["Bookmarks"])
@@ -137,22 +150,28 @@ async def create_bookmark(
         if not is_valid:
             raise HTTPException(status_code=400, detail=f"URL inválida: {error_msg}")
 
-        # 2. Verificar duplicados
-        existing = await db.execute(select(Bookmark).where(Bookmark.url == normalized_url))
-        if existing.scalar_one_or_none():
-            raise HTTPException(status_code=409, detail="El bookmark ya existe")
-
-        # 3. Crear en DB
-        new_bookmark = Bookmark(
-            url=normalized_url,
-            original_title=bookmark_in.original_title or "Pendiente de procesar",
-            status="pending"
+        # 2. Crear en DB: con la misma URL canónica (url_hash) no se inserta nada
+        canonical = canonicalizer.canonicalize(normalized_url)
+        result = await db.execute(
+            pg_insert(Bookmark)
+            .values(
+                url=normalized_url,
+                original_title=bookmark_in.original_title or "Pendiente de procesar",
+                status="pending",
+                **canonical.columns(),
+            )
+            .on_conflict_do_nothing()
+            .returning(Bookmark.id)
         )
-        db.add(new_bookmark)
+        bookmark_id = result.scalar_one_or_none()
+        if bookmark_id is None:
+            await db.rollback()
+            raise HTTPException(status_code=409, detail="El bookmark ya existe")
         await db.commit()
-        await db.refresh(new_bookmark)
+        canonicalizer.record(canonical)
+        new_bookmark = await db.get(Bookmark, bookmark_id)
 
-        # 4. Trigger procesamiento en background (simulado vía reprocess endpoint logic)
+        # 3. Trigger procesamiento en background (simulado vía reprocess endpoint logic)
         # En producción real, esto iría a una cola (Celery/Redis), aquí llamamos directo
         # o dejamos que el cron/job lo recoja. Para UX inmediata, lanzamos background task.
         background_tasks.add_task(process_bookmark_background, new_bookmark.id)
@@ -187,7 +206,7 @@ async def semantic_search(
         logger.info(f"🔍 Búsqueda: '{search_request.query}' (limit: {search_request.limit})")
         
         embedding_service = get_embedding_service()
-        query_embedding = embedding_service.generate_query_embedding(search_request.query)
+        query_embedding = await embedding_service.embed_query(search_request.query)
         
         query_stmt = select(Bookmark).where(Bookmark.status == "completed")
         
@@ -326,6 +345,42 @@ async def get_processing_stats(db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Error obteniendo estadísticas")
 
 
+@app.get("/stats/scraper", tags=["Statistics"])
+async def get_scraper_stats():
+    """Estadísticas del scraper (pool de conexiones, etc.)"""
+    return scraper.get_stats()
+
+
+@app.get("/stats/scraper/hosts", tags=["Statistics"])
+async def get_scraper_host_health(state: Optional[str] = Query(None, pattern="^(open|half_open|closed)$")):
+    """Estado del circuit breaker por dominio: qué sitios nos están bloqueando"""
+    return {
+        "summary": scraper.circuits.get_stats(),
+        "hosts": scraper.circuits.hosts(state),
+    }
+
+
+@app.get("/stats/embeddings", tags=["Statistics"])
+async def get_embedding_stats():
+    """Micro-batching de embeddings: tamaño de lote, llenado y espera en cola"""
+    return get_embedding_service().get_stats()
+
+
+@app.get("/stats/event-loop", tags=["Statistics"])
+async def get_event_loop_stats(reset: bool = False):
+    """Retraso del event loop (tiempo bloqueado por código síncrono); reset=true pone a cero"""
+    stats = loop_monitor.get_stats()
+    if reset:
+        loop_monitor.reset()
+    return stats
+
+
+@app.get("/stats/tracking", tags=["Statistics"])
+async def get_tracking_stats(top: int = Query(10, ge=1, le=100)):
+    """Tracking quitado de las URLs guardadas y reglas de canonicalización aplicadas"""
+    return canonicalizer.report(top)
+
+
 @app.get("/stats/categories", tags=["Statistics"])
 async def get_category_stats(db: AsyncSession = Depends(get_db)):
     try:
@@ -412,7 +467,8 @@ async def reprocess_bookmark(request: Request, bookmark_id: int, db: AsyncSessio
         bookmark.status = "processing"
         await db.commit()
         
-        result = await orchestrator.process_bookmark(bookmark.url, bookmark.original_title)
+        scraped = await scraper.scrape_url(bookmark.url)
+        result = await orchestrator.process_bookmark(bookmark.url, bookmark.original_title, scraped)
         
         bookmark.clean_title = result.get("clean_title")
         bookmark.summary = result.get("summary")
@@ -424,11 +480,22 @@ async def reprocess_bookmark(request: Request, bookmark_id: int, db: AsyncSessio
         bookmark.is_local = result.get("is_local", False)
         bookmark.domain = result.get("domain")
         bookmark.language = result.get("language")
+        bookmark.favicon_url = result.get("favicon_url")
         bookmark.word_count = result.get("word_count", 0)
         bookmark.embedding = result.get("embedding")
         bookmark.status = result.get("status", "failed")
         bookmark.error_message = result.get("error")
         
+        # 429, timeouts, 5xx...: se reprograma para reprocess_failed.py
+        retry_count = bookmark.retry_count or 0
+        if scraped.get("success"):
+            bookmark.next_attempt_at = None
+            bookmark.retry_count = 0
+        else:
+            bookmark.next_attempt_at = scraper.retry_policy.next_attempt_at(scraped, retry_count)
+            if bookmark.next_attempt_at is not None:
+                bookmark.retry_count = retry_count + 1
+        
         await db.commit()
         
         log = ProcessingLog(
@@ -446,6 +513,7 @@ async def reprocess_bookmark(request: Request, bookmark_id: int, db: AsyncSessio
             "success": True,
             "bookmark_id": bookmark.id,
             "status": bookmark.status,
+            "next_attempt_at": bookmark.next_attempt_at,
             "processing_time": result.get("processing_time", 0)
         }
     
@@ -467,14 +535,21 @@ async def reembed_all_bookmarks(db: AsyncSession = Depends(get_db)):
         )
         
         embedding_service = get_embedding_service()
+        bookmarks = bookmarks.scalars().all()
         count = 0
-        for bookmark in bookmarks.scalars():
+        # Por bloques en el executor de embeddings: el loop sigue atendiendo peticiones
+        for start in range(0, len(bookmarks), REEMBED_CHUNK_SIZE):
+            chunk = bookmarks[start:start + REEMBED_CHUNK_SIZE]
+            texts = [f"{bookmark.clean_title}. {bookmark.summary}" for bookmark in chunk]
             try:
-                text = f"{bookmark.clean_title}. {bookmark.summary}"
-                bookmark.embedding = embedding_service.generate_embedding(text)
-                count += 1
+                embeddings = await embedding_service.embed_many(texts)
             except Exception:
-                logger.exception("Error generando embedding para bookmark %s", bookmark.id)
+                # El bloque conserva sus embeddings actuales
+                logger.exception(f"Error generando embeddings para {len(chunk)} bookmarks")
+                continue
+            for bookmark, embedding in zip(chunk, embeddings):
+                bookmark.embedding = embedding
+            count += len(chunk)
         await db.commit()
         return {"status": "success", "count": count}
     except HTTPException:
@@ -489,7 +564,7 @@ async def hybrid_search(query: str, db: AsyncSession = Depends(get_db)):
     try:
         # Búsqueda semántica
         embedding_service = get_embedding_service()
-        embedding = embedding_service.generate_query_embedding(query)
+        embedding = await embedding_service.embed_query(query)
         semantic_results = await db.execute(
             select(Bookmark)
             .order_by(Bookmark.embedding.cosine_distance(embedding))
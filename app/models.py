@@ -1,7 +1,7 @@
 # app/models.py - VERSIÓN ACTUALIZADA CON RESILIENCIA
 
 from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Float, Index
-from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.sql import func
 from pgvector.sqlalchemy import Vector
 from datetime import datetime
@@ -22,6 +22,12 @@ class Bookmark(Base):
     url = Column(String(2048), unique=True, nullable=False, index=True)
     original_title = Column(String(512), nullable=False)
     
+    # Deduplicación (URLCleaner.bookmark_keys): URL canónica sin tracking, su
+    # SHA-256 (índice único, ancho fijo) y los parámetros de tracking quitados
+    url_clean = Column(String(2048))
+    url_hash = Column(String(64))
+    tracking_params = Column(JSONB)
+    
     # Contenido procesado
     clean_title = Column(String(512))
     summary = Column(Text)
@@ -36,6 +42,11 @@ class Bookmark(Base):
     is_local = Column(Boolean, default=False, index=True)
     nsfw_reason = Column(String(256))
     
+    # Índice invertido para reclasificar (app/services/reclassify.py): tokens
+    # de URL, título y muestra de texto, y cuándo se calcularon
+    classifier_tokens = Column(ARRAY(String))
+    classified_at = Column(DateTime(timezone=True))
+    
     # ========== NUEVO: Estados de Resiliencia ==========
     
     # Estado general (mantiene compatibilidad)
@@ -53,16 +64,25 @@ class Bookmark(Base):
     # Valores: pending, success, partial, failed, skipped
     
     scraping_strategy = Column(String(50))
-    # Valores: trafilatura, trafilatura_retry, beautifulsoup, 
-    #          archive_org, none
+    # Valores: trafilatura_retry, html_text, pdf (ver app/services/strategies.py),
+    #          trafilatura, beautifulsoup (legacy), none
+    # Los éxitos alimentan la preferencia de estrategia por dominio del scraper
     
     scraping_error_type = Column(String(50))
     # Valores: bot_detection, timeout, connection_refused, 
-    #          rate_limited, dns_error, ssl_error, unknown
+    #          rate_limited, dns_error, ssl_error, non_html_content,
+    #          content_too_large, unknown
     
     scraping_attempts = Column(Integer, default=0)
     # Número de intentos de scraping realizados
     
+    next_attempt_at = Column(DateTime(timezone=True))
+    # Próximo intento de un fallo transitorio (rate_limited, timeout, 5xx,
+    # circuit_open); NULL si no hay reintento programado
+    
+    retry_count = Column(Integer, default=0)
+    # Reprogramaciones consecutivas (se pone a 0 al scrapear con éxito)
+    
     # Estado de Curación IA
     curation_status = Column(String(50))
     # Valores: pending, success, fallback, failed
@@ -101,13 +121,19 @@ class Bookmark(Base):
     # Índices para búsqueda
     __table_args__ = (
         Index('ix_bookmarks_embedding_cosine', 'embedding', postgresql_using='ivfflat'),
+        Index('ix_bookmarks_url_hash', 'url_hash', unique=True),
         Index('ix_bookmarks_tags_gin', 'tags', postgresql_using='gin'),
+        Index('ix_bookmarks_classifier_tokens_gin', 'classifier_tokens', postgresql_using='gin'),
         Index('ix_bookmarks_category', 'category'),
         Index('ix_bookmarks_domain', 'domain'),
         Index('ix_bookmarks_created_at_desc', created_at.desc()),
         # Nuevos índices
         Index('ix_bookmarks_scraping_status', 'scraping_status'),
         Index('ix_bookmarks_confidence_score', confidence_score.desc()),
+        Index(
+            'ix_bookmarks_next_attempt_at', 'next_attempt_at',
+            postgresql_where=next_attempt_at.isnot(None),
+        ),
     )
     
     def __repr__(self):
@@ -134,6 +160,7 @@ class Bookmark(Base):
             "scraping_status": self.scraping_status,
             "scraping_strategy": self.scraping_strategy,
             "curation_mode": self.curation_mode,
+            "next_attempt_at": self.next_attempt_at.isoformat() if self.next_attempt_at else None,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
         }
@@ -0,0 +1,556 @@
+# app/services/canonicalizer.py - URL canónica con reglas por sitio compiladas una vez
+
+import hashlib
+import json
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+from urllib.parse import unquote_plus, urlsplit, urlunsplit
+
+from loguru import logger
+
+from app.config import get_settings
+from app.services.domain_parser import domain_parser
+from app.utils.domain_set import DomainSuffixSet
+
+settings = get_settings()
+
+
+# Parámetros de tracking que se quitan en cualquier sitio (en minúsculas)
+TRACKING_PARAMS = frozenset({
+    # Google Analytics
+    '_gl', '_ga', '_gid', '_gat', 'ga',
+    # Facebook
+    'fbclid', 'ref', 'fb_source', 'fb_action_ids', 'fb_action_types',
+    # Google Ads
+    'gclid', 'gclsrc', 'dclid', 'wbraid', 'gbraid',
+    # Microsoft
+    'msclkid',
+    # Twitter
+    'twclid',
+    # LinkedIn
+    'li_fat_id', 'trk',
+    # Outbrain
+    'ob_click_id',
+    # Taboola
+    'taboola',
+    # Reddit
+    'rdt_cid',
+    # Mailchimp / HubSpot / Yandex
+    'mc_cid', 'mc_eid', '_hsenc', '_hsmi', 'yclid',
+    # Otros comunes
+    'ref_src', 'ref_url', 'cmpid', 'ncid', '_bta_tid', '_bta_c',
+    'pk_campaign', 'pk_kwd', 'piwik_campaign', 'piwik_kwd',
+    'mtm_campaign', 'mtm_keyword', 'mtm_source', 'mtm_medium',
+})
+# utm_source, utm_medium, utm_campaign, utm_term, utm_content, utm_id...
+TRACKING_PARAM_PREFIXES = ("utm_",)
+
+# Un fragmento "#/ruta" o "#!/ruta" es la página en una SPA: no se quita
+SPA_FRAGMENT_PREFIXES = ("/", "!")
+
+# Etiquetas de subdominio de las versiones móvil/AMP: m.example.com,
+# en.m.wikipedia.org, amp.example.com
+MOBILE_LABELS = frozenset({"m", "mobile", "amp"})
+
+# (clave decodificada, par "clave=valor" tal cual venía en la query)
+Param = Tuple[str, str]
+# (esquema, host original, path, params) -> nuevos valores, o None si no aplica
+Rewrite = Callable[[str, str, str, List[Param]], Optional[Tuple[str, str, str, List[Param]]]]
+
+
+# Esquema y "www." inicial (sólo si queda un dominio detrás: www.com se mantiene)
+_HASH_PREFIX = re.compile(r"^(?:https?://)?(?:www\.(?=[^/?#:]+\.))?", re.IGNORECASE)
+
+
+def url_hash(canonical_url: str) -> str:
+    """
+    SHA-256 (64 caracteres hex) de una URL canónica
+
+    Ni el esquema http/https ni un "www." inicial entran en el hash:
+    http://x/a, https://x/a y https://www.x/a son la misma página, igual que
+    m.x/a, que se pliega a x/a (url_clean sí conserva esquema y host).
+    """
+    return hashlib.sha256(_HASH_PREFIX.sub("", canonical_url, count=1).encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class RulePack:
+    """Reglas de canonicalización de un sitio (y sus subdominios)"""
+    name: str
+    domains: Tuple[str, ...]
+    host: Optional[str] = None                       # host canónico (youtu.be -> www.youtube.com)
+    drop_params: FrozenSet[str] = frozenset()        # tracking propio del sitio
+    drop_param_prefixes: Tuple[str, ...] = ()
+    keep_params: Optional[FrozenSet[str]] = None     # si se define, sólo sobreviven éstos
+    keep_params_paths: Tuple[str, ...] = ()          # paths donde aplica keep_params (vacío: todos)
+    keep_fragment: bool = False                      # el fragmento identifica la página
+    rewrite: Optional[Rewrite] = field(default=None, compare=False)
+
+
+@dataclass(frozen=True)
+class CanonicalURL:
+    """Resultado de canonicalizar una URL"""
+    url: str
+    tracking_params: Dict[str, Any]
+    rules: Tuple[str, ...] = ()   # reglas aplicadas: amp, mobile, youtube...
+
+    @property
+    def url_hash(self) -> str:
+        return url_hash(self.url)
+
+    def columns(self) -> Dict[str, Any]:
+        """Columnas de deduplicación de Bookmark (url_clean, url_hash, tracking_params)"""
+        return {
+            "url_clean": self.url,
+            "url_hash": self.url_hash,
+            "tracking_params": self.tracking_params or None,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Reescrituras por sitio
+# ---------------------------------------------------------------------------
+
+_YOUTUBE_PATH = re.compile(r"^/(?:shorts|embed|live|v)/([\w-]{11})")
+
+
+def _youtube(scheme: str, host: str, path: str, params: List[Param]):
+    """youtu.be/ID, /shorts/ID, /embed/ID -> www.youtube.com/watch?v=ID"""
+    if host == "youtu.be":
+        video = path.lstrip("/").split("/", 1)[0]
+    else:
+        match = _YOUTUBE_PATH.match(path)
+        video = match.group(1) if match else None
+    if not video:
+        return None
+    params = [param for param in params if param[0] != "v"] + [("v", f"v={video}")]
+    return "https", "www.youtube.com", "/watch", params
+
+
+_AMAZON_PRODUCT = re.compile(r"/(?:dp|gp/product|gp/aw/d)/([A-Z0-9]{10})(?:[/?]|$)")
+
+
+def _amazon(scheme: str, host: str, path: str, params: List[Param]):
+    """/Titulo-del-producto/dp/ASIN/ref=... -> /dp/ASIN sin query"""
+    match = _AMAZON_PRODUCT.search(path)
+    if not match:
+        return None
+    return scheme, host, f"/dp/{match.group(1)}", []
+
+
+_GOOGLE_AMP_VIEWER = re.compile(r"^/amp/(s/)?([^/]+)(/.*)?$")
+_AMP_CACHE = re.compile(r"^/[cv]/(s/)?([^/]+)(/.*)?$")
+
+
+def _amp_viewer(scheme: str, host: str, path: str, params: List[Param]):
+    """
+    google.com/amp/s/site/... y site.cdn.ampproject.org/c/s/site/... -> https://site/...
+
+    El visor sólo sirve páginas AMP, así que aquí (y sólo aquí) se quita
+    también el sufijo AMP del path de la página: /post/amp, post.amp.html
+    """
+    pattern = _AMP_CACHE if host.endswith("cdn.ampproject.org") else _GOOGLE_AMP_VIEWER
+    match = pattern.match(path)
+    if not match:
+        return None
+    page = (match.group(3) or "").rstrip("/")
+    if page.endswith(".amp.html"):
+        page = page[:-9] + ".html"
+    elif page.endswith("/amp") and len(page) > 4:
+        page = page[:-4]
+    return ("https" if match.group(1) else "http"), match.group(2).lower(), page, params
+
+
+DEFAULT_RULE_PACKS: Tuple[RulePack, ...] = (
+    RulePack(
+        name="youtube",
+        domains=("youtube.com", "youtu.be", "youtube-nocookie.com"),
+        host="www.youtube.com",
+        keep_params=frozenset({"v", "list"}),
+        keep_params_paths=("/watch",),
+        rewrite=_youtube,
+    ),
+    RulePack(
+        name="amp_viewer",
+        domains=("google.com", "cdn.ampproject.org"),
+        rewrite=_amp_viewer,
+    ),
+    RulePack(
+        name="amazon",
+        domains=(
+            "amazon.com", "amazon.es", "amazon.co.uk", "amazon.de", "amazon.fr",
+            "amazon.it", "amazon.ca", "amazon.com.mx", "amazon.co.jp",
+        ),
+        drop_params=frozenset({"psc", "th", "qid", "sr", "crid", "sprefix", "keywords", "ref_", "tag", "linkcode", "creative", "camp"}),
+        drop_param_prefixes=("pd_rd_", "pf_rd_"),
+        rewrite=_amazon,
+    ),
+    RulePack(
+        name="x",
+        domains=("twitter.com", "x.com"),
+        host="x.com",
+        drop_params=frozenset({"s", "t"}),
+    ),
+    RulePack(
+        name="reddit",
+        domains=("reddit.com",),
+        host="www.reddit.com",
+        drop_params=frozenset({"share_id", "rdt"}),
+    ),
+    RulePack(
+        name="instagram",
+        domains=("instagram.com",),
+        host="www.instagram.com",
+        drop_params=frozenset({"igshid", "igsh", "img_index"}),
+    ),
+    RulePack(
+        name="spotify",
+        domains=("spotify.com",),
+        drop_params=frozenset({"si", "nd", "context"}),
+    ),
+    RulePack(
+        name="tiktok",
+        domains=("tiktok.com",),
+        drop_params=frozenset({"is_from_webapp", "sender_device", "_r", "_t", "web_id"}),
+    ),
+    RulePack(
+        name="linkedin",
+        domains=("linkedin.com",),
+        host="www.linkedin.com",
+        drop_params=frozenset({"trackingid", "refid", "lipi", "midtoken", "midsig", "trkemail"}),
+    ),
+    RulePack(
+        name="medium",
+        domains=("medium.com",),
+        drop_params=frozenset({"source", "sk"}),
+    ),
+)
+
+
+def _split_query(query: str) -> List[Param]:
+    """Pares de la query sin decodificar ni re-codificar (sólo la clave, para compararla)"""
+    params = []
+    for pair in query.split("&"):
+        if not pair:
+            continue
+        key = pair.split("=", 1)[0]
+        if "%" in key or "+" in key:
+            key = unquote_plus(key)
+        params.append((key, pair))
+    return params
+
+
+def _param_value(pair: str) -> str:
+    return unquote_plus(pair.split("=", 1)[1]) if "=" in pair else ""
+
+
+def _is_amp_param(key: str, pair: str) -> bool:
+    """?amp, ?amp=1 y ?outputType=amp piden la versión AMP de la misma página"""
+    if key == "amp":
+        return _param_value(pair) in ("", "1")
+    return key.lower() == "outputtype" and _param_value(pair) == "amp"
+
+
+def _strip_amp(params: List[Param]) -> Tuple[List[Param], bool]:
+    """
+    Quita de la query la señal AMP explícita
+
+    El path no se toca: /amp, /amp/... o .amp también son nombres de
+    repositorio, paquete o fichero (github.com/ampproject/amp). Los sufijos
+    AMP del path sólo se quitan detrás del visor/caché de AMP (_amp_viewer).
+    """
+    kept = [(key, pair) for key, pair in params if not _is_amp_param(key, pair)]
+    return kept, len(kept) != len(params)
+
+
+class URLCanonicalizer:
+    """
+    Motor de canonicalización de URLs para deduplicar bookmarks.
+
+    Una URL canónica:
+      - no lleva parámetros de tracking (TRACKING_PARAMS, utm_*, y los de
+        cada pack) y el resto de la query va ordenada, sin re-codificar
+      - tiene esquema y host en minúsculas, sin puerto por defecto ni "/" final
+      - no lleva fragmento, salvo rutas de SPA ("#/ruta", "#!/ruta")
+      - apunta a la página normal en lugar de a la versión AMP (visor/caché
+        de AMP o ?amp=1), y al host de escritorio en lugar de
+        m./mobile./amp. (URL_FOLD_MOBILE_HOSTS)
+      - aplica el pack de reglas del sitio (RulePack): youtu.be y /shorts/ ->
+        /watch?v=, /dp/ASIN de Amazon, host canónico de x.com, reddit...
+
+    Los packs se compilan una vez (tracking global + el del sitio) y la
+    resolución host -> (host canónico, pack) se memoiza, así que cada URL sólo
+    se parte con un `urlsplit`. `clean_many` procesa una columna entera.
+
+    Lleva contadores de lo que quita (parámetros, dominios, reglas) para los
+    informes de tracking (`report`, scripts/analyze_tracking.py); sólo cuentan
+    las URLs que se pasan a `record` (las de bookmarks guardados).
+    """
+
+    def __init__(
+        self,
+        packs: Iterable[RulePack] = DEFAULT_RULE_PACKS,
+        packs_file: Optional[str] = None,
+        fold_mobile: Optional[bool] = None,
+        stats_file: Optional[str] = None,
+    ):
+        self.fold_mobile = settings.URL_FOLD_MOBILE_HOSTS if fold_mobile is None else fold_mobile
+        self.stats_file = settings.URL_STATS_FILE if stats_file is None else stats_file
+
+        self._domains = DomainSuffixSet()
+        self._packs: Dict[str, RulePack] = {}
+        self._default = self._compile(RulePack(name="default", domains=()))
+        for pack in packs:
+            self.add_pack(pack)
+
+        packs_file = settings.URL_RULE_PACKS_FILE if packs_file is None else packs_file
+        if packs_file:
+            self.load_packs_file(packs_file)
+
+        self._resolve_host = lru_cache(maxsize=settings.DOMAIN_PARSER_CACHE_SIZE)(self._resolve)
+        self._counters = self._empty_counters()
+
+    # ------------------------------------------------------------------
+    # Packs
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _compile(pack: RulePack) -> RulePack:
+        """Une el tracking global con el del pack (una sola búsqueda por parámetro)"""
+        return replace(
+            pack,
+            drop_params=TRACKING_PARAMS | {param.lower() for param in pack.drop_params},
+            drop_param_prefixes=TRACKING_PARAM_PREFIXES + tuple(p.lower() for p in pack.drop_param_prefixes),
+        )
+
+    def add_pack(self, pack: RulePack):
+        """Añade (o reemplaza) las reglas de un sitio"""
+        compiled = self._compile(pack)
+        for domain in pack.domains:
+            self._domains.add(domain)
+            self._packs[self._domains.match(domain)] = compiled
+        if hasattr(self, "_resolve_host"):
+            self._resolve_host.cache_clear()
+
+    def load_packs_file(self, path: str) -> int:
+        """
+        Carga packs desde JSON: lista de objetos con name, domains y
+        opcionalmente host, drop_params, drop_param_prefixes, keep_params,
+        keep_params_paths, keep_fragment
+
+        Returns:
+            Número de packs cargados
+        """
+        try:
+            with open(path, encoding="utf-8") as handle:
+                entries = json.load(handle)
+        except (OSError, ValueError) as e:
+            logger.warning(f"No se pudieron cargar los packs de URL de {path}: {e}")
+            return 0
+
+        for entry in entries:
+            keep = entry.get("keep_params")
+            self.add_pack(RulePack(
+                name=entry["name"],
+                domains=tuple(entry["domains"]),
+                host=entry.get("host"),
+                drop_params=frozenset(entry.get("drop_params", ())),
+                drop_param_prefixes=tuple(entry.get("drop_param_prefixes", ())),
+                keep_params=frozenset(keep) if keep is not None else None,
+                keep_params_paths=tuple(entry.get("keep_params_paths", ())),
+                keep_fragment=bool(entry.get("keep_fragment", False)),
+            ))
+        logger.info(f"📐 {len(entries)} packs de URL cargados de {path}")
+        return len(entries)
+
+    def _resolve(self, host: str) -> Tuple[str, RulePack, Tuple[str, ...]]:
+        """host -> (host canónico, pack compilado, reglas aplicadas al host)"""
+        matched = self._domains.match(host)
+        pack = self._packs[matched] if matched else self._default
+        if pack.host:
+            return pack.host, pack, (("host",) if pack.host != host else ())
+
+        if self.fold_mobile and ":" not in host and not host.replace(".", "").isdigit():
+            parts = domain_parser.parse(host)
+            labels = parts.subdomain.split(".") if parts.subdomain else []
+            if any(label in MOBILE_LABELS for label in labels):
+                # m.example.com -> example.com: la misma clave que la URL de escritorio
+                labels = [label for label in labels if label not in MOBILE_LABELS]
+                return ".".join(labels + [parts.registered_domain]), pack, ("mobile",)
+        return host, pack, ()
+
+    # ------------------------------------------------------------------
+    # Canonicalización
+    # ------------------------------------------------------------------
+
+    def canonicalize(self, url: str) -> CanonicalURL:
+        """URL canónica y parámetros de tracking quitados"""
+        if not url or not isinstance(url, str):
+            return CanonicalURL(url, {})
+        try:
+            parts = urlsplit(url.strip())
+            port = parts.port
+        except ValueError:
+            return CanonicalURL(url, {})
+
+        host = (parts.hostname or "").rstrip(".")
+        if not host:
+            return CanonicalURL(url.strip(), {})
+
+        scheme = parts.scheme.lower()
+        path = parts.path.rstrip("/")
+        params = _split_query(parts.query) if parts.query else []
+
+        canonical_host, pack, rules = self._resolve_host(host)
+        if pack.rewrite is not None:
+            rewritten = pack.rewrite(scheme, host, path, params)
+            if rewritten is not None:
+                scheme, new_host, path, params = rewritten
+                rules += (pack.name,)
+                if new_host != canonical_host:
+                    port = None
+                    canonical_host, pack, host_rules = self._resolve_host(new_host)
+                    rules += host_rules
+
+        params, amp = _strip_amp(params)
+        if amp:
+            rules += ("amp",)
+
+        keep_params = pack.keep_params
+        if keep_params is not None and pack.keep_params_paths and path not in pack.keep_params_paths:
+            keep_params = None
+
+        kept, tracking = [], {}
+        for key, pair in params:
+            lowered = key.lower()
+            if (
+                lowered in pack.drop_params
+                or lowered.startswith(pack.drop_param_prefixes)
+                or (keep_params is not None and key not in keep_params)
+            ):
+                value = _param_value(pair)
+                if key in tracking:
+                    previous = tracking[key]
+                    tracking[key] = (previous if isinstance(previous, list) else [previous]) + [value]
+                else:
+                    tracking[key] = value
+            else:
+                kept.append(pair)
+        kept.sort()
+
+        fragment = parts.fragment
+        if fragment and not (pack.keep_fragment or fragment.startswith(SPA_FRAGMENT_PREFIXES)):
+            fragment = ""
+
+        netloc = f"[{canonical_host}]" if ":" in canonical_host else canonical_host
+        if port and (scheme, port) not in (("http", 80), ("https", 443)):
+            netloc = f"{netloc}:{port}"
+        if "@" in parts.netloc:
+            netloc = f"{parts.netloc.rsplit('@', 1)[0]}@{netloc}"
+
+        canonical = urlunsplit((scheme, netloc, path, "&".join(kept), fragment))
+        return CanonicalURL(canonical, tracking, rules)
+
+    def clean_many(self, urls: Iterable[str]) -> List[CanonicalURL]:
+        """
+        `canonicalize` para una columna entera (ej: df["url"] de un CSV)
+
+        Las URLs repetidas se canonicalizan una sola vez y los hosts salen del
+        memo, así que el coste es por URL distinta.
+
+        Returns:
+            Un CanonicalURL por URL, en el mismo orden
+        """
+        urls = list(urls)
+        unique: Dict[str, CanonicalURL] = {}
+        results = []
+        for url in urls:
+            try:
+                result = unique[url]
+            except KeyError:
+                result = unique[url] = self.canonicalize(url)
+            except TypeError:
+                result = self.canonicalize(url)  # NaN de pandas y otros no hashables
+            results.append(result)
+        return results
+
+    def has_tracking(self, url: str) -> bool:
+        return bool(self.canonicalize(url).tracking_params)
+
+    # ------------------------------------------------------------------
+    # Contadores
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _empty_counters() -> Dict[str, Any]:
+        return {"urls": 0, "with_tracking": 0, "params": Counter(), "domains": Counter(), "rules": Counter()}
+
+    def record(self, result: CanonicalURL):
+        """Cuenta una URL guardada (tracking quitado, dominio y reglas aplicadas)"""
+        counters = self._counters
+        counters["urls"] += 1
+        counters["rules"].update(result.rules)
+        if result.tracking_params:
+            counters["with_tracking"] += 1
+            counters["params"].update(result.tracking_params.keys())
+            counters["domains"][domain_parser.registered_domain(result.url)] += 1
+
+    def _load_stats(self) -> Dict[str, Any]:
+        counters = self._empty_counters()
+        if not self.stats_file or not os.path.exists(self.stats_file):
+            return counters
+        try:
+            with open(self.stats_file, encoding="utf-8") as handle:
+                saved = json.load(handle)
+        except (OSError, ValueError) as e:
+            logger.warning(f"No se pudieron leer los contadores de URL de {self.stats_file}: {e}")
+            return counters
+        counters["urls"] = saved.get("urls", 0)
+        counters["with_tracking"] = saved.get("with_tracking", 0)
+        for key in ("params", "domains", "rules"):
+            counters[key].update(saved.get(key, {}))
+        return counters
+
+    def _merged(self) -> Dict[str, Any]:
+        merged = self._load_stats()
+        merged["urls"] += self._counters["urls"]
+        merged["with_tracking"] += self._counters["with_tracking"]
+        for key in ("params", "domains", "rules"):
+            merged[key].update(self._counters[key])
+        return merged
+
+    def flush_stats(self):
+        """Suma los contadores en memoria a URL_STATS_FILE y los pone a cero"""
+        if not self.stats_file or not self._counters["urls"]:
+            return
+        merged = self._merged()
+        path = Path(self.stats_file)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps({key: (dict(value) if isinstance(value, Counter) else value)
+                                   for key, value in merged.items()}), encoding="utf-8")
+        os.replace(tmp, path)
+        self._counters = self._empty_counters()
+
+    def report(self, top: int = 10) -> Dict[str, Any]:
+        """Contadores acumulados (fichero + memoria): lo que se ha quitado de las URLs guardadas"""
+        merged = self._merged()
+        urls = merged["urls"]
+        return {
+            "urls": urls,
+            "with_tracking": merged["with_tracking"],
+            "tracking_ratio": round(merged["with_tracking"] / urls, 3) if urls else 0.0,
+            "top_params": merged["params"].most_common(top),
+            "top_domains": merged["domains"].most_common(top),
+            "rules": dict(merged["rules"].most_common()),
+            "packs": sorted({pack.name for pack in self._packs.values()}),
+        }
+
+
+# Singleton
+canonicalizer = URLCanonicalizer()
@@ -0,0 +1,187 @@
+# app/services/circuit_breaker.py - Circuit breaker por dominio para el scraper
+
+import time
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+from app.config import get_settings
+
+settings = get_settings()
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class HostCircuit:
+    """Estado del circuito de un dominio"""
+
+    def __init__(self, domain: str):
+        self.domain = domain
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.last_error_type: Optional[str] = None
+        self.opened_at: Optional[float] = None
+        self.open_until: Optional[float] = None
+        self.cooldown = 0.0
+        self.probe_started: Optional[float] = None
+
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.errors: Dict[str, int] = {}
+
+    def to_dict(self) -> Dict:
+        return {
+            "domain": self.domain,
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error_type": self.last_error_type,
+            "open_until": self.open_until,
+            "retry_in_seconds": (
+                max(round(self.open_until - time.time(), 1), 0.0)
+                if self.state == OPEN and self.open_until else None
+            ),
+            "successes": self.successes,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "errors": dict(self.errors),
+        }
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por dominio (closed → open → half_open → closed).
+
+    Se alimenta con los error_type que ya produce el scraper. Sólo cuentan los
+    que indican que el host nos está bloqueando o no responde; un 404 o un
+    contenido insuficiente demuestran que el host contesta y cuentan como éxito.
+
+    - closed: se deja pasar todo. Tras `threshold` fallos consecutivos se abre
+      (un 429 abre al primero; un 403 al segundo, tras rotar el User-Agent).
+    - open: se rechaza sin tocar la red durante el cool-down.
+    - half_open: pasado el cool-down se deja pasar una única petición de prueba.
+      Si va bien se cierra; si falla se reabre con el doble de cool-down
+      (hasta SCRAPER_CIRCUIT_MAX_COOLDOWN).
+    """
+
+    def __init__(self):
+        self.failure_threshold = settings.SCRAPER_CIRCUIT_FAILURE_THRESHOLD
+        self.base_cooldown = settings.SCRAPER_CIRCUIT_COOLDOWN
+        self.max_cooldown = settings.SCRAPER_CIRCUIT_MAX_COOLDOWN
+
+        # Fallos consecutivos que abren el circuito según el tipo de error
+        self.trip_thresholds = {
+            "rate_limited": 1,
+            "bot_detection": 2,
+            "timeout": self.failure_threshold,
+            "connection_refused": self.failure_threshold,
+            "network_error": self.failure_threshold,
+        }
+        # Fallos de un subdominio concreto que no dicen nada del sitio
+        # (los hosts que no resuelven ya los cubre la caché negativa)
+        self.ignored = {"dns_error", "ssl_error"}
+        self._circuits: Dict[str, HostCircuit] = {}
+
+    def _circuit(self, domain: str) -> HostCircuit:
+        circuit = self._circuits.get(domain)
+        if circuit is None:
+            circuit = HostCircuit(domain)
+            self._circuits[domain] = circuit
+        return circuit
+
+    def allow(self, domain: str) -> bool:
+        """¿Se puede hacer una petición al dominio ahora?"""
+        if not self.failure_threshold:
+            return True
+
+        circuit = self._circuits.get(domain)
+        if circuit is None:
+            return True
+        now = time.time()
+
+        if circuit.state == OPEN and now >= circuit.open_until:
+            circuit.state = HALF_OPEN
+            circuit.probe_started = None
+
+        if circuit.state == HALF_OPEN:
+            # Una sola prueba a la vez; si se perdió (cancelada), se permite otra
+            if circuit.probe_started is None or now - circuit.probe_started > circuit.cooldown:
+                circuit.probe_started = now
+                return True
+
+        if circuit.state == CLOSED:
+            return True
+
+        circuit.rejected += 1
+        return False
+
+    def record(self, domain: str, error_type: Optional[str] = None):
+        """Registra el resultado de una petición (error_type=None si fue bien)"""
+        if not self.failure_threshold:
+            return
+
+        if error_type in self.ignored:
+            return
+
+        circuit = self._circuit(domain)
+        threshold = self.trip_thresholds.get(error_type)
+
+        if threshold is None:
+            # El host respondió (aunque sea con un 404): no nos está bloqueando
+            circuit.successes += 1
+            circuit.consecutive_failures = 0
+            if circuit.state != CLOSED:
+                logger.info(f"[Circuit] {domain}: cerrado de nuevo")
+            circuit.state = CLOSED
+            circuit.cooldown = 0.0
+            circuit.probe_started = None
+            return
+
+        circuit.failures += 1
+        circuit.consecutive_failures += 1
+        circuit.last_error_type = error_type
+        circuit.errors[error_type] = circuit.errors.get(error_type, 0) + 1
+
+        if circuit.state == HALF_OPEN:
+            self._open(circuit, min(max(circuit.cooldown, self.base_cooldown) * 2, self.max_cooldown))
+        elif circuit.state == CLOSED and circuit.consecutive_failures >= threshold:
+            self._open(circuit, self.base_cooldown)
+
+    def _open(self, circuit: HostCircuit, cooldown: float):
+        now = time.time()
+        circuit.state = OPEN
+        circuit.cooldown = cooldown
+        circuit.opened_at = now
+        circuit.open_until = now + cooldown
+        circuit.probe_started = None
+        logger.warning(
+            f"[Circuit] {circuit.domain}: abierto {cooldown:.0f}s "
+            f"({circuit.last_error_type} x{circuit.consecutive_failures})"
+        )
+
+    def status(self, domain: str) -> Optional[Dict]:
+        circuit = self._circuits.get(domain)
+        return circuit.to_dict() if circuit else None
+
+    def hosts(self, state: Optional[str] = None) -> List[Dict]:
+        """Tabla de salud por dominio: primero los abiertos, luego por fallos"""
+        circuits = [
+            c for c in self._circuits.values()
+            if state is None or c.state == state
+        ]
+        order = {OPEN: 0, HALF_OPEN: 1, CLOSED: 2}
+        circuits.sort(key=lambda c: (order[c.state], -c.failures, c.domain))
+        return [c.to_dict() for c in circuits]
+
+    def get_stats(self) -> Dict:
+        states = {CLOSED: 0, OPEN: 0, HALF_OPEN: 0}
+        for circuit in self._circuits.values():
+            states[circuit.state] += 1
+        return {
+            "hosts_tracked": len(self._circuits),
+            "open": states[OPEN],
+            "half_open": states[HALF_OPEN],
+            "rejected": sum(c.rejected for c in self._circuits.values()),
+        }
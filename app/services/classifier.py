@@ -1,19 +1,116 @@
-from typing import Tuple, Optional
+from typing import Dict, Iterable, List, Set, Tuple, Optional
 from loguru import logger
 from urllib.parse import urlparse
 import re
+import threading
 
 from app.config import get_settings
+from app.utils.domain_set import DomainSuffixSet
 
 settings = get_settings()
 
+_WORD_BOUNDARY = re.compile(r"\b")
+_TOKEN = re.compile(r"\w+")
+
+# Caracteres del texto que se analizan (classify y el índice de tokens)
+TEXT_SAMPLE_CHARS = 1000
+
+
+def tokenize(text: str) -> Set[str]:
+    """
+    Tokens (\\w+) en minúsculas. Si una keyword casa como palabra completa,
+    todos sus tokens están en los del texto: sirve de índice invertido.
+    """
+    return set(_TOKEN.findall(text.lower())) if text else set()
+
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    """
+    Alternativa regex con forma de trie: ["sex", "sexy", "spam"] ->
+    "s(?:ex(?:y)?|pam)". En cada posición el motor sigue un solo camino
+    en lugar de probar todas las keywords una a una.
+    """
+    trie: Dict = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}  # fin de keyword
+
+    def emit(node: Dict) -> str:
+        ends_here = "" in node
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if len(branches) == 1 and not ends_here:
+            return branches[0]
+        # `?` voraz: primero la keyword más larga, después la más corta
+        return "(?:" + "|".join(branches) + ")" + ("?" if ends_here else "")
+
+    return emit(trie)
+
+
+class KeywordMatcher:
+    """
+    Conjunto de keywords compilado una sola vez en una regex.
+
+    `find_all` recorre el texto una vez y devuelve todas las keywords que
+    aparecen como palabra completa (mismo criterio que `\\b<keyword>\\b`),
+    incluidas las que se solapan ("sex" y "sex toys"). Es inmutable: para
+    cambiar las keywords se crea otro matcher.
+    """
+    
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = tuple(dict.fromkeys(k for k in keywords if k))
+        self._rank = {keyword: i for i, keyword in enumerate(self.keywords)}
+        self._pattern = None
+        if self.keywords:
+            # Lookahead de ancho cero: se prueba en cada inicio de palabra y
+            # las coincidencias pueden solaparse
+            self._pattern = re.compile(r"\b(?=(" + _trie_pattern(self.keywords) + r")\b)")
+    
+    def find_all(self, text: str) -> List[str]:
+        """Keywords presentes en el texto, en el orden de la lista original"""
+        if self._pattern is None:
+            return []
+        
+        found = set()
+        for match in self._pattern.finditer(text):
+            longest = match.group(1)
+            found.add(longest)
+            # Keywords más cortas que empiezan en la misma posición
+            start = match.start()
+            for end in range(1, len(longest)):
+                prefix = longest[:end]
+                if prefix in self._rank and _WORD_BOUNDARY.match(text, start + end):
+                    found.add(prefix)
+        return sorted(found, key=self._rank.__getitem__)
+
 
 class SafetyClassifier:
     """Clasificador de contenido NSFW/Adult basado en keywords y dominios"""
     
-    def __init__(self):
-        self.nsfw_keywords = settings.nsfw_keywords_list
-        self.nsfw_domains = settings.nsfw_domains_list
+    def __init__(
+        self,
+        keywords: Optional[List[str]] = None,
+        domains: Optional[List[str]] = None,
+        domains_file: Optional[str] = None,
+    ):
+        """Sin argumentos usa NSFW_KEYWORDS, NSFW_DOMAINS y NSFW_DOMAINS_FILE"""
+        self.nsfw_keywords = list(keywords) if keywords is not None else settings.nsfw_keywords_list
+        self.nsfw_domains = list(domains) if domains is not None else settings.nsfw_domains_list
+        self._keywords = KeywordMatcher(self.nsfw_keywords)
+        self._lock = threading.Lock()
+        
+        # Dominios de NSFW_DOMAINS más la blocklist de NSFW_DOMAINS_FILE
+        self._domains = DomainSuffixSet(self.nsfw_domains)
+        domains_file = settings.NSFW_DOMAINS_FILE if domains_file is None else domains_file
+        if domains_file:
+            try:
+                loaded = self._domains.load_file(domains_file)
+                logger.info(f"Blocklist NSFW: {loaded} dominios de {domains_file}")
+            except OSError as e:
+                logger.error(f"No se pudo leer NSFW_DOMAINS_FILE: {e}")
     
     def classify(
         self,
@@ -51,23 +148,44 @@ class SafetyClassifier:
         # 4. Verificar texto (sample)
         if text:
             # Solo analizar primeros 1000 caracteres para eficiencia
-            text_sample = text[:1000]
+            text_sample = text[:TEXT_SAMPLE_CHARS]
             is_nsfw_text, text_reason = self._check_text(text_sample, "contenido")
             if is_nsfw_text:
                 return True, text_reason
         
         return False, None
     
+    def classify_many(
+        self,
+        rows: Iterable[Tuple[str, Optional[str], Optional[str]]],
+    ) -> List[Tuple[bool, Optional[str]]]:
+        """classify sobre muchas filas (url, título, texto), en orden"""
+        return [self.classify(url, title or "", text or "") for url, title, text in rows]
+    
+    @staticmethod
+    def index_tokens(url: str, title: Optional[str] = "", text: Optional[str] = "") -> List[str]:
+        """Tokens de lo que analiza classify (URL, título y muestra de texto)"""
+        tokens = tokenize(url) | tokenize(title or "") | tokenize((text or "")[:TEXT_SAMPLE_CHARS])
+        return sorted(tokens)
+    
+    @staticmethod
+    def rule_tokens(rule: str) -> List[str]:
+        """
+        Tokens que debe tener una fila para que la keyword o el dominio pueda
+        casar; lista vacía si la regla no tiene ninguno (hay que mirar todo)
+        """
+        return sorted(tokenize(rule))
+    
     def _check_domain(self, url: str) -> Tuple[bool, Optional[str]]:
-        """Verifica si el dominio está en la lista NSFW"""
+        """Verifica si el dominio (o un dominio padre) está en la lista NSFW"""
         try:
             parsed = urlparse(url.lower())
             hostname = parsed.hostname or parsed.netloc
             
-            for nsfw_domain in self.nsfw_domains:
-                if nsfw_domain in hostname:
-                    logger.warning(f"Dominio NSFW detectado: {hostname}")
-                    return True, f"Dominio NSFW: {nsfw_domain}"
+            nsfw_domain = self._domains.match(hostname)
+            if nsfw_domain:
+                logger.warning(f"Dominio NSFW detectado: {hostname}")
+                return True, f"Dominio NSFW: {nsfw_domain}"
             
             return False, None
         
@@ -77,48 +195,47 @@ class SafetyClassifier:
     
     def _check_url(self, url: str) -> Tuple[bool, Optional[str]]:
         """Verifica si la URL contiene keywords NSFW"""
-        url_lower = url.lower()
+        # Keywords como palabra completa (no substring), en una sola pasada
+        found_keywords = self._keywords.find_all(url.lower())
         
-        for keyword in self.nsfw_keywords:
-            # Buscar keyword como palabra completa (no substring)
-            pattern = r'\b' + re.escape(keyword) + r'\b'
-            if re.search(pattern, url_lower):
-                logger.warning(f"Keyword NSFW en URL: {keyword}")
-                return True, f"Keyword NSFW en URL: {keyword}"
+        if found_keywords:
+            keyword = found_keywords[0]
+            logger.warning(f"Keyword NSFW en URL: {keyword}")
+            return True, f"Keyword NSFW en URL: {keyword}"
         
         return False, None
     
     def _check_text(self, text: str, source: str) -> Tuple[bool, Optional[str]]:
         """Verifica si el texto contiene keywords NSFW"""
-        text_lower = text.lower()
-        
-        # Contador de coincidencias
-        matches = 0
-        found_keywords = []
-        
-        for keyword in self.nsfw_keywords:
-            # Buscar keyword como palabra completa
-            pattern = r'\b' + re.escape(keyword) + r'\b'
-            if re.search(pattern, text_lower):
-                matches += 1
-                found_keywords.append(keyword)
+        # Keywords distintas encontradas como palabra completa
+        found_keywords = self._keywords.find_all(text.lower())
         
         # Umbral: si hay 2+ keywords, marcar como NSFW
-        if matches >= 2:
+        if len(found_keywords) >= 2:
             logger.warning(f"Keywords NSFW en {source}: {found_keywords}")
             return True, f"Keywords NSFW en {source}: {', '.join(found_keywords[:3])}"
         
         return False, None
     
     def add_keyword(self, keyword: str):
-        """Añade keyword NSFW en runtime"""
-        if keyword.lower() not in self.nsfw_keywords:
-            self.nsfw_keywords.append(keyword.lower())
-            logger.info(f"Keyword NSFW añadida: {keyword}")
+        """
+        Añade keyword NSFW en runtime
+        
+        El matcher nuevo se compila aparte y se sustituye de una vez: una
+        clasificación en curso usa el anterior o el nuevo, nunca uno a medias.
+        """
+        keyword = keyword.lower()
+        with self._lock:
+            if keyword in self.nsfw_keywords:
+                return
+            keywords = [*self.nsfw_keywords, keyword]
+            matcher = KeywordMatcher(keywords)
+            self.nsfw_keywords, self._keywords = keywords, matcher
+        logger.info(f"Keyword NSFW añadida: {keyword}")
     
     def add_domain(self, domain: str):
         """Añade dominio NSFW en runtime"""
-        if domain.lower() not in self.nsfw_domains:
+        if self._domains.add(domain):
             self.nsfw_domains.append(domain.lower())
             logger.info(f"Dominio NSFW añadido: {domain}")
 
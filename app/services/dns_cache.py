@@ -0,0 +1,299 @@
+# app/services/dns_cache.py - Caché DNS y caché negativa de hosts caídos
+
+import asyncio
+import itertools
+import json
+import os
+import socket
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpcore
+from loguru import logger
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Errores de getaddrinfo que no se arreglan reintentando (el dominio no existe)
+_PERMANENT_DNS_ERRORS = {
+    code for code in (
+        getattr(socket, "EAI_NONAME", None),
+        getattr(socket, "EAI_NODATA", None),
+        getattr(socket, "EAI_FAIL", None),
+    )
+    if code is not None
+}
+
+
+def error_chain(error: BaseException):
+    """Recorre la cadena de causas (httpx -> httpcore -> socket)"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def dns_failure(error: BaseException) -> Optional[str]:
+    """
+    Detecta un fallo de resolución DNS en la cadena de excepciones
+
+    Returns:
+        "permanent" (NXDOMAIN y similares), "transient" o None si no es DNS
+    """
+    for cause in error_chain(error):
+        if isinstance(cause, socket.gaierror):
+            return "permanent" if cause.errno in _PERMANENT_DNS_ERRORS else "transient"
+    return None
+
+
+class DNSCache:
+    """
+    Resolver asíncrono con caché por TTL.
+
+    Las resoluciones concurrentes del mismo host se agrupan en una sola
+    llamada a getaddrinfo; los fallos no se cachean aquí (de eso se encarga
+    DeadHostCache, que sí distingue fallos permanentes).
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = settings.SCRAPER_DNS_TTL if ttl is None else ttl
+        self._cache: Dict[str, Tuple[float, List[str]]] = {}
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+        self._hits = 0
+        self._misses = 0
+        self._failures = 0
+
+    async def resolve(self, host: str, port: int) -> List[str]:
+        """
+        Direcciones IP del host (desde caché si no ha caducado)
+
+        Raises:
+            httpcore.ConnectError: si el host no se puede resolver
+        """
+        key = host.lower()
+        cached = self._cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            self._hits += 1
+            return cached[1]
+
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self._hits += 1
+            return await asyncio.shield(pending)
+
+        self._misses += 1
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._in_flight[key] = future
+
+        try:
+            infos = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+            addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        except socket.gaierror as e:
+            self._failures += 1
+            error = httpcore.ConnectError(f"No se pudo resolver {host}: {e}")
+            error.__cause__ = e
+            future.set_exception(error)
+            future.exception()  # evita el aviso de excepción no recogida
+            raise error
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            if len(self._cache) > 10000:
+                self._prune()
+            self._cache[key] = (time.monotonic() + self.ttl, addresses)
+            future.set_result(addresses)
+            return addresses
+        finally:
+            self._in_flight.pop(key, None)
+
+    def pin(self, host: str, addresses: List[str]):
+        """Fija las direcciones de un host sin caducidad (fixtures, benchmarks)"""
+        self._cache[host.lower()] = (float("inf"), list(addresses))
+
+    def _prune(self):
+        now = time.monotonic()
+        for key in [k for k, (expires, _) in self._cache.items() if expires <= now]:
+            del self._cache[key]
+
+    def get_stats(self) -> Dict:
+        total = self._hits + self._misses
+        return {
+            "entries": len(self._cache),
+            "hits": self._hits,
+            "misses": self._misses,
+            "failures": self._failures,
+            "hit_ratio": round(self._hits / total, 3) if total else 0.0,
+        }
+
+
+class CachingNetworkBackend(httpcore.AsyncNetworkBackend):
+    """
+    Backend de red de httpcore que resuelve con DNSCache
+
+    Conecta a la IP ya resuelta; httpcore sigue usando el hostname original
+    para SNI y la verificación del certificado.
+
+    Con varias direcciones hace happy eyeballs (RFC 8305): alterna IPv6 e
+    IPv4 y, si una conexión no termina en `attempt_delay` segundos, lanza la
+    siguiente en paralelo; gana la primera que conecta. Una dirección muerta
+    sólo retrasa la conexión `attempt_delay`, no el timeout entero.
+    """
+
+    def __init__(
+        self,
+        resolver: DNSCache,
+        backend: Optional[httpcore.AsyncNetworkBackend] = None,
+        attempt_delay: Optional[float] = None,
+    ):
+        self._resolver = resolver
+        self._backend = backend or httpcore.AnyIOBackend()
+        self.attempt_delay = settings.SCRAPER_CONNECT_ATTEMPT_DELAY if attempt_delay is None else attempt_delay
+
+    @staticmethod
+    def _interleave(addresses: List[str]) -> List[str]:
+        """Alterna familias (IPv6, IPv4, IPv6...) empezando por la de la primera dirección"""
+        first_family = ":" in addresses[0]
+        first = [address for address in addresses if (":" in address) == first_family]
+        other = [address for address in addresses if (":" in address) != first_family]
+        return [address for pair in itertools.zip_longest(first, other) for address in pair if address is not None]
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        addresses = await self._resolver.resolve(host, port)
+
+        def connect(address: str):
+            return self._backend.connect_tcp(
+                address,
+                port,
+                timeout=timeout,
+                local_address=local_address,
+                socket_options=socket_options,
+            )
+
+        if len(addresses) == 1:
+            return await connect(addresses[0])
+
+        candidates = iter(self._interleave(addresses))
+        pending = set()
+        last_error = None
+        try:
+            while True:
+                address = next(candidates, None)
+                if address is not None:
+                    pending.add(asyncio.ensure_future(connect(address)))
+                elif not pending:
+                    break
+                # Con direcciones por probar, sólo se espera attempt_delay a
+                # la siguiente; un fallo rápido la lanza al momento
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=self.attempt_delay if address is not None else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                stream = None
+                for task in done:
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                    elif stream is None:
+                        stream = task.result()
+                    else:
+                        await task.result().aclose()
+                if stream is not None:
+                    return stream
+        finally:
+            for task in pending:
+                task.cancel()
+            for result in await asyncio.gather(*pending, return_exceptions=True):
+                if not isinstance(result, BaseException):
+                    await result.aclose()
+        raise last_error
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._backend.connect_unix_socket(
+            path, timeout=timeout, socket_options=socket_options
+        )
+
+    async def sleep(self, seconds: float):
+        await self._backend.sleep(seconds)
+
+
+class DeadHostCache:
+    """
+    Caché negativa de hosts que no resuelven o rechazan conexiones.
+
+    Un host marcado falla al instante durante SCRAPER_DEAD_HOST_COOLDOWN
+    segundos en lugar de repetir DNS, conexión y reintentos. Se guarda en
+    SCRAPER_DEAD_HOSTS_FILE para que sobreviva entre ejecuciones de
+    scripts/reprocess_failed.py.
+    """
+
+    def __init__(self, path: Optional[str] = None, cooldown: Optional[float] = None):
+        self.path = Path(path or settings.SCRAPER_DEAD_HOSTS_FILE)
+        self.cooldown = settings.SCRAPER_DEAD_HOST_COOLDOWN if cooldown is None else cooldown
+        self._hosts: Optional[Dict[str, Dict]] = None
+        self._fast_failures = 0
+
+    def _entries(self) -> Dict[str, Dict]:
+        if self._hosts is None:
+            self._hosts = {}
+            if self.path.exists():
+                try:
+                    self._hosts = json.loads(self.path.read_text(encoding="utf-8"))
+                except (OSError, ValueError) as e:
+                    logger.warning(f"No se pudo leer {self.path}: {e}")
+        return self._hosts
+
+    def _save(self):
+        now = time.time()
+        self._hosts = {host: e for host, e in self._entries().items() if e["until"] > now}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self._entries(), indent=1), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar {self.path}: {e}")
+
+    def check(self, host: str) -> Optional[Dict]:
+        """Entrada vigente del host (error_type, message, until) o None"""
+        if not self.cooldown:
+            return None
+        entry = self._entries().get(host.lower())
+        if entry is None:
+            return None
+        if entry["until"] <= time.time():
+            return None
+        self._fast_failures += 1
+        return entry
+
+    def mark(self, host: str, error_type: str, message: str):
+        host = host.lower()
+        self._entries()[host] = {
+            "error_type": error_type,
+            "message": message,
+            "until": time.time() + self.cooldown,
+        }
+        self._save()
+        logger.info(f"Host marcado como caído ({error_type}) durante {self.cooldown:.0f}s: {host}")
+
+    def clear(self, host: str):
+        """El host ha vuelto a responder"""
+        if self._entries().pop(host.lower(), None) is not None:
+            self._save()
+
+    def clear_all(self):
+        self._hosts = {}
+        self._save()
+
+    def get_stats(self) -> Dict:
+        now = time.time()
+        return {
+            "dead_hosts": sum(1 for e in self._entries().values() if e["until"] > now),
+            "cooldown_seconds": self.cooldown,
+            "fast_failures": self._fast_failures,
+        }
@@ -0,0 +1,140 @@
+# app/services/domain_parser.py - Dominio registrado de una URL, sin red y con memo
+
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import tldextract
+from loguru import logger
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class DomainParts:
+    """Host descompuesto con la Public Suffix List: blog.example.co.uk"""
+    host: str         # blog.example.co.uk
+    subdomain: str    # blog
+    domain: str       # example
+    suffix: str       # co.uk
+
+    @property
+    def registered_domain(self) -> str:
+        """example.co.uk; para IPs y hosts sin sufijo (localhost), el host"""
+        if self.domain and self.suffix:
+            return f"{self.domain}.{self.suffix}"
+        return self.domain or self.host
+
+
+class DomainParser:
+    """
+    Único punto de parseo de dominios de la aplicación.
+
+    - Nunca usa la red: la Public Suffix List es la copia incluida en el
+      paquete tldextract fijado en requirements.txt (su versión identifica el
+      snapshot), o el fichero DOMAIN_SUFFIX_LIST_FILE si se configura.
+      `tldextract.extract` a secas intenta descargarla en el primer uso, lo
+      que cuelga los workers sin salida a internet.
+    - Memo LRU por host (DOMAIN_PARSER_CACHE_SIZE): las URLs del mismo sitio
+      sólo se parsean una vez.
+    - `parse_many` / `registered_domains` para lotes (importador).
+    """
+
+    def __init__(self, suffix_list_file: Optional[str] = None, cache_size: Optional[int] = None):
+        suffix_list_file = suffix_list_file if suffix_list_file is not None else settings.DOMAIN_SUFFIX_LIST_FILE
+        if suffix_list_file:
+            urls = (Path(suffix_list_file).resolve().as_uri(),)
+            self.psl_version = f"file:{Path(suffix_list_file).name}"
+        else:
+            urls = ()
+            self.psl_version = f"tldextract-{getattr(tldextract, '__version__', 'unknown')}"
+
+        self._extractor = tldextract.TLDExtract(
+            cache_dir=None,
+            suffix_list_urls=urls,
+            fallback_to_snapshot=True,
+        )
+        self.cache_size = cache_size or settings.DOMAIN_PARSER_CACHE_SIZE
+        self._parse_host = lru_cache(maxsize=self.cache_size)(self._extract_host)
+
+    def _extract_host(self, host: str) -> DomainParts:
+        extracted = self._extractor(host)
+        return DomainParts(
+            host=host,
+            subdomain=extracted.subdomain,
+            domain=extracted.domain,
+            suffix=extracted.suffix,
+        )
+
+    @staticmethod
+    def hostname(url: str) -> str:
+        """Host en minúsculas, sin puerto ni credenciales ("" si no hay)"""
+        if not url:
+            return ""
+        if "://" not in url and not url.startswith("//"):
+            url = "//" + url  # "example.com/path" también tiene host
+        try:
+            return (urlsplit(url).hostname or "").rstrip(".")
+        except ValueError:
+            return ""
+
+    @classmethod
+    def netloc(cls, url: str) -> str:
+        """Host con el puerto si lo hay (ej: "localhost:8080")"""
+        host = cls.hostname(url)
+        if not host:
+            return ""
+        try:
+            port = urlsplit(url if "://" in url else "//" + url).port
+        except ValueError:
+            port = None
+        if ":" in host:
+            host = f"[{host}]"  # IPv6
+        return f"{host}:{port}" if port else host
+
+    def parse(self, url: str) -> DomainParts:
+        """Partes del dominio de una URL (o de un host)"""
+        return self._parse_host(self.hostname(url))
+
+    def registered_domain(self, url: str) -> str:
+        """Dominio registrado (ej: docs.python.org -> python.org)"""
+        return self.parse(url).registered_domain
+
+    def parse_many(self, urls: Iterable[str]) -> List[DomainParts]:
+        """
+        `parse` para un lote: cada host distinto se parsea una sola vez
+
+        Returns:
+            Las partes de cada URL, en el mismo orden
+        """
+        hosts = [self.hostname(url) for url in urls]
+        parsed: Dict[str, DomainParts] = {host: self._parse_host(host) for host in set(hosts)}
+        return [parsed[host] for host in hosts]
+
+    def registered_domains(self, urls: Iterable[str]) -> List[str]:
+        """`registered_domain` para un lote, en el mismo orden"""
+        return [parts.registered_domain for parts in self.parse_many(urls)]
+
+    def get_stats(self) -> Dict:
+        info = self._parse_host.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            "psl": self.psl_version,
+            "cached_hosts": info.currsize,
+            "max_hosts": info.maxsize,
+            "hits": info.hits,
+            "misses": info.misses,
+            "hit_ratio": round(info.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def clear(self):
+        self._parse_host.cache_clear()
+        logger.info("Memo de dominios vaciado")
+
+
+# Singleton
+domain_parser = DomainParser()
@@ -1,5 +1,10 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
 from sentence_transformers import SentenceTransformer
-from typing import List
+from typing import Callable, Dict, List, Optional, Tuple
 import numpy as np
 from loguru import logger
 from functools import lru_cache
@@ -9,28 +14,195 @@ from app.config import get_settings
 settings = get_settings()
 
 
+class EmbeddingBatcher:
+    """
+    Micro-batcher asíncrono delante del modelo.
+    
+    Las peticiones concurrentes (búsquedas, curación) se encolan; un único
+    worker las agrupa hasta `max_batch_size` textos o `max_wait_ms` desde la
+    primera, las codifica con una sola llamada a `encode` fuera del event loop
+    y resuelve el future de cada una con su vector. En CPU un encode de N
+    textos cuesta bastante menos que N encodes de uno.
+    """
+    
+    def __init__(
+        self,
+        encode: Callable[[List[str]], List[List[float]]],
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+        window: int = 1000,
+        executor: Optional[Executor] = None,
+    ):
+        self._encode = encode
+        self.executor = executor
+        self.max_batch_size = max_batch_size or settings.EMBEDDING_BATCH_MAX_SIZE
+        self.max_wait = (settings.EMBEDDING_BATCH_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000
+        
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        
+        # Métricas: totales y ventana de los últimos lotes / esperas
+        self._batches = 0
+        self._items = 0
+        self._errors = 0
+        self._batch_sizes: deque = deque(maxlen=window)
+        self._queue_waits: deque = deque(maxlen=window)
+    
+    def _ensure_worker(self) -> asyncio.Queue:
+        """Cola y worker del event loop actual (scripts y tests crean loops nuevos)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+        return self._queue
+    
+    async def submit(self, text: str) -> List[float]:
+        """Encola un texto y espera su vector"""
+        queue = self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        queue.put_nowait((text, future, time.perf_counter()))
+        return await future
+    
+    async def _collect(self, queue: asyncio.Queue) -> List[Tuple[str, asyncio.Future, float]]:
+        batch = [await queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+    
+    async def _run(self):
+        queue = self._queue
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect(queue)
+            # Las peticiones canceladas mientras esperaban no se codifican
+            batch = [item for item in batch if not item[1].done()]
+            if not batch:
+                continue
+            
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                self._queue_waits.append(started - enqueued)
+            self._batches += 1
+            self._items += len(batch)
+            self._batch_sizes.append(len(batch))
+            
+            try:
+                vectors = await loop.run_in_executor(self.executor, self._encode, [text for text, _, _ in batch])
+                if len(vectors) != len(batch):
+                    # Con zip, los textos sin vector se quedarían esperando para siempre
+                    raise RuntimeError(f"El encode devolvió {len(vectors)} vectores para {len(batch)} textos")
+            except Exception as e:
+                self._errors += 1
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            
+            for (_, future, _), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+    
+    async def aclose(self):
+        """Para el worker; las peticiones que quedaban en cola se cancelan"""
+        worker, queue = self._worker, self._queue
+        self._worker = self._queue = self._loop = None
+        if worker is not None and not worker.done():
+            worker.cancel()
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+        while queue is not None and not queue.empty():
+            _, future, _ = queue.get_nowait()
+            future.cancel()
+    
+    def get_stats(self) -> Dict:
+        sizes = list(self._batch_sizes)
+        waits = sorted(self._queue_waits)
+        
+        def wait_ms(quantile: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(int(quantile * len(waits)), len(waits) - 1)] * 1000, 2)
+        
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self._batches,
+            "items": self._items,
+            "errors": self._errors,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "avg_batch_size": round(sum(sizes) / len(sizes), 2) if sizes else 0.0,
+            "fill_ratio": round(sum(sizes) / (len(sizes) * self.max_batch_size), 3) if sizes else 0.0,
+            "queue_wait_ms_p50": wait_ms(0.5),
+            "queue_wait_ms_p95": wait_ms(0.95),
+            "queue_wait_ms_max": round(waits[-1] * 1000, 2) if waits else 0.0,
+        }
+
+
 class EmbeddingService:
-    """Servicio de generación de embeddings semánticos"""
+    """
+    Servicio de generación de embeddings semánticos
+    
+    Desde código async se usan `embed`, `embed_query`, `embed_many` y
+    `warmup`: la inferencia corre en un executor propio de EMBEDDING_WORKERS
+    hilos, con EMBEDDING_TORCH_THREADS hilos de torch, y no bloquea el event
+    loop. Los métodos `generate_*` síncronos quedan para scripts y tests.
+    """
     
     def __init__(self):
         self.model_name = settings.EMBEDDING_MODEL
         self.dimension = settings.EMBEDDING_DIMENSION
+        self.torch_threads = settings.EMBEDDING_TORCH_THREADS
         self._model = None
+        self._model_lock = threading.Lock()
+        self.workers = max(settings.EMBEDDING_WORKERS, 1)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.workers,
+            thread_name_prefix="embeddings",
+        )
+        self.batcher = EmbeddingBatcher(self._encode_batch, executor=self.executor)
     
     @property
     def model(self) -> SentenceTransformer:
         """Lazy loading del modelo"""
         if self._model is None:
-            try:
-                logger.info(f"Cargando modelo de embeddings: {self.model_name}")
-                self._model = SentenceTransformer(self.model_name)
-                logger.info(f"Modelo cargado exitosamente")
-            except Exception as e:
-                print(f"Error cargando modelo de embeddings: {e}")
-                logger.error(f"Error cargando modelo de embeddings: {e}")
-                raise
+            with self._model_lock:
+                if self._model is None:
+                    try:
+                        logger.info(f"Cargando modelo de embeddings: {self.model_name}")
+                        if self.torch_threads > 0:
+                            import torch
+                            torch.set_num_threads(self.torch_threads)
+                        self._model = SentenceTransformer(self.model_name)
+                        logger.info(f"Modelo cargado exitosamente")
+                    except Exception as e:
+                        print(f"Error cargando modelo de embeddings: {e}")
+                        logger.error(f"Error cargando modelo de embeddings: {e}")
+                        raise
         return self._model
     
+    async def _run(self, func: Callable, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+    
+    async def warmup(self):
+        """Carga el modelo en el executor (el arranque no bloquea el loop)"""
+        await self._run(lambda: self.model)
+    
     def generate_embedding(self, text: str) -> List[float]:
         """
         Genera embedding para un texto
@@ -86,6 +258,73 @@ class EmbeddingService:
         
         return self.generate_embedding(query_clean)
     
+    async def embed(self, text: str) -> List[float]:
+        """
+        `generate_embedding` asíncrono: las llamadas concurrentes se agrupan en
+        un solo encode (EmbeddingBatcher) que corre en el executor del servicio
+        """
+        if not text or not text.strip():
+            logger.warning("Texto vacío para embedding, retornando vector cero")
+            return [0.0] * self.dimension
+        
+        try:
+            return await self.batcher.submit(text[:2000])
+        except Exception as e:
+            logger.error(f"Error generando embedding: {e}")
+            return [0.0] * self.dimension
+    
+    async def embed_query(self, query: str) -> List[float]:
+        """`generate_query_embedding` asíncrono (micro-batching)"""
+        return await self.embed(query.strip().lower())
+    
+    async def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeddings de muchos textos en el executor (re-embeddings masivos)
+        
+        A diferencia de `generate_batch_embeddings`, un fallo del encode se
+        propaga en lugar de devolver vectores cero, para que el llamador no
+        sobrescriba embeddings buenos.
+        """
+        if not texts:
+            return []
+        return await self._run(self._encode_many, texts)
+    
+    def _encode_batch(self, texts: List[str]) -> List[List[float]]:
+        """Un encode para todo el lote del batcher; vectores normalizados"""
+        embeddings = self.model.encode(
+            texts,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+            batch_size=len(texts)
+        )
+        return [self._normalize(emb.tolist()) for emb in embeddings]
+    
+    async def aclose(self):
+        """Para el micro-batcher (cierre de la API)"""
+        await self.batcher.aclose()
+    
+    def _encode_many(self, texts: List[str]) -> List[List[float]]:
+        """Encode de `embed_many`: sin barra de progreso y sin tragarse errores"""
+        embeddings = self.model.encode(
+            [text[:2000] if text else "" for text in texts],
+            convert_to_numpy=True,
+            show_progress_bar=False,
+            batch_size=32
+        )
+        vectors = [self._normalize(emb.tolist()) for emb in embeddings]
+        if len(vectors) != len(texts):
+            raise RuntimeError(f"El encode devolvió {len(vectors)} vectores para {len(texts)} textos")
+        return vectors
+    
+    def get_stats(self) -> Dict:
+        return {
+            "model": self.model_name,
+            "loaded": self._model is not None,
+            "workers": self.workers,
+            "torch_threads": self.torch_threads or "default",
+            "batcher": self.batcher.get_stats(),
+        }
+    
     def generate_batch_embeddings(self, texts: List[str]) -> List[List[float]]:
         """
         Genera embeddings para múltiples textos (más eficiente)
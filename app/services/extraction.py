@@ -0,0 +1,411 @@
+# app/services/extraction.py - Extracción de contenido fuera del event loop
+
+import asyncio
+import codecs
+import itertools
+import multiprocessing
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urljoin
+
+from loguru import logger
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class ExtractionTimeoutError(Exception):
+    """La extracción superó SCRAPER_EXTRACTION_TIMEOUT"""
+    pass
+
+
+def decode_html(content: bytes, encoding: Optional[str]) -> str:
+    """Decodifica con el charset indicado; si es desconocido, UTF-8 tolerante"""
+    try:
+        return content.decode(encoding or "utf-8", errors="replace")
+    except LookupError:
+        return content.decode("utf-8", errors="replace")
+
+
+# ---------------------------------------------------------------------------
+# Funciones de extracción
+#
+# Se ejecutan dentro del pool (posiblemente en otro proceso), así que deben ser
+# funciones de módulo, recibir bytes y devolver tipos simples (picklables).
+# ---------------------------------------------------------------------------
+
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)""", re.IGNORECASE)
+
+
+def _lxml_encoding(content: bytes, encoding: Optional[str]) -> str:
+    """
+    Charset para el parser de lxml: cabecera HTTP, <meta charset> o UTF-8.
+
+    Sin charset explícito libxml2 asume ISO-8859-1, que rompe la mayoría de
+    páginas modernas, así que por defecto se asume UTF-8.
+    """
+    candidates = [encoding]
+    match = _META_CHARSET.search(content[:4096])
+    if match:
+        candidates.append(match.group(1).decode("ascii", errors="ignore"))
+
+    for candidate in candidates:
+        if not candidate:
+            continue
+        try:
+            codecs.lookup(candidate)
+            return candidate
+        except LookupError:
+            continue
+    return "utf-8"
+
+
+def _visible_text(tree) -> str:
+    """Texto visible del <body> (sin scripts/styles), como el antiguo fallback de BeautifulSoup"""
+    body = tree.find("body")
+    if body is None:
+        body = tree
+    texts = body.xpath(
+        ".//text()[not(ancestor::script) and not(ancestor::style) "
+        "and not(ancestor::noscript) and not(ancestor::template)]"
+    )
+    return " ".join(t.strip() for t in texts if t.strip())
+
+
+def _document_language(tree) -> Optional[str]:
+    """Idioma desde <html lang> o <meta http-equiv="content-language">"""
+    lang = tree.get("lang") or tree.get("{http://www.w3.org/XML/1998/namespace}lang")
+    if not lang:
+        values = tree.xpath(
+            '//meta[translate(@http-equiv, "CONTENT-LANGUAGE", "content-language")'
+            '="content-language"]/@content'
+        )
+        lang = values[0] if values else None
+    if not lang:
+        return None
+    # "es-ES" / "en_US, en" -> "es" / "en"
+    primary = lang.split(",")[0].strip().replace("_", "-").split("-")[0].lower()
+    return primary[:10] or None
+
+
+def _favicon_url(tree, base_url: Optional[str]) -> Optional[str]:
+    """URL absoluta del favicon declarado en <link rel="icon">"""
+    hrefs = tree.xpath(
+        '//link[contains(concat(" ", translate(@rel, "ICON", "icon"), " "), " icon ")]/@href'
+    )
+    if not hrefs:
+        return None
+    href = hrefs[0].strip()
+    favicon = urljoin(base_url, href) if base_url else href
+    return favicon[:512]
+
+
+def extract_document(
+    content: bytes,
+    encoding: Optional[str] = None,
+    url: Optional[str] = None,
+    with_main_content: bool = True,
+) -> Dict:
+    """
+    Extrae todo lo necesario de una página parseándola una sola vez
+
+    El HTML se parsea desde los bytes con lxml (la codificación sale de la
+    cabecera o del <meta charset>, sin pasar por `response.text`) y del mismo
+    árbol se obtienen título, idioma, favicon, el texto visible para el
+    fallback y, por último, el texto principal con Trafilatura.
+
+    Args:
+        content: Cuerpo HTTP sin decodificar
+        encoding: Charset de la cabecera Content-Type, si lo había
+        url: URL final de la respuesta (para resolver el favicon)
+        with_main_content: Si False no se ejecuta Trafilatura
+
+    Returns:
+        Dict con: text, fallback_text, title, language, favicon_url
+    """
+    import trafilatura
+    from lxml import etree
+    from lxml import html as lxml_html
+
+    result = {
+        "text": None,
+        "fallback_text": "",
+        "title": None,
+        "language": None,
+        "favicon_url": None,
+    }
+
+    if not content or not content.strip():
+        return result
+
+    try:
+        parser = lxml_html.HTMLParser(
+            encoding=_lxml_encoding(content, encoding),
+            remove_comments=True,
+        )
+    except LookupError:
+        # Charset válido para Python pero desconocido para libxml2
+        parser = lxml_html.HTMLParser(encoding="utf-8", remove_comments=True)
+
+    try:
+        tree = lxml_html.document_fromstring(content, parser=parser)
+    except (etree.ParserError, ValueError):
+        return result
+
+    title = tree.findtext(".//title")
+    if not title or not title.strip():
+        og_titles = tree.xpath('//meta[@property="og:title"]/@content')
+        title = og_titles[0] if og_titles else None
+    result["title"] = " ".join(title.split()) if title else None
+
+    result["language"] = _document_language(tree)
+    result["favicon_url"] = _favicon_url(tree, url)
+    result["fallback_text"] = _visible_text(tree)
+
+    # Trafilatura limpia el árbol in-place: va al final, cuando ya no se necesita
+    if with_main_content:
+        result["text"] = trafilatura.extract(
+            tree,
+            url=url,
+            include_comments=False,
+            include_tables=True,
+            no_fallback=False,
+        )
+
+    return result
+
+
+def extract_pdf(content: bytes, max_pages: int = 50) -> Dict:
+    """
+    Extractor para documentos PDF (hook de tipos no HTML)
+
+    Returns:
+        Dict con las mismas claves que extract_document
+    """
+    from io import BytesIO
+    from pypdf import PdfReader
+
+    result = {
+        "text": None,
+        "fallback_text": "",
+        "title": None,
+        "language": None,
+        "favicon_url": None,
+    }
+
+    try:
+        reader = PdfReader(BytesIO(content))
+        pages = [page.extract_text() or "" for page in reader.pages[:max_pages]]
+        metadata_title = reader.metadata.title if reader.metadata else None
+    except Exception:
+        # pypdf lanza excepciones muy variadas con PDFs corruptos o cifrados
+        return result
+
+    text = "\n".join(p.strip() for p in pages if p.strip())
+    result["text"] = text or None
+    result["title"] = " ".join(metadata_title.split()) if metadata_title else None
+    return result
+
+
+# Cola por la que el worker avisa de que empieza un trabajo. La fija el
+# initializer del pool; thread-local para que dos pools de hilos no se pisen
+_worker = threading.local()
+
+
+def _init_worker(started_queue):
+    _worker.started = started_queue
+
+
+def _timed_call(job: int, func: Callable[..., Any], *args) -> Tuple[Any, float]:
+    """Ejecuta func en el worker y devuelve también su tiempo de CPU"""
+    started_queue = getattr(_worker, "started", None)
+    if started_queue is not None:
+        started_queue.put(job)
+    started = time.thread_time()
+    result = func(*args)
+    return result, time.thread_time() - started
+
+
+class ExtractionExecutor:
+    """
+    Ejecuta la extracción (CPU intensiva) en un pool.
+
+    - `process` (defecto): ProcessPoolExecutor; los workers se reciclan cada
+      SCRAPER_EXTRACTION_MAX_TASKS_PER_CHILD trabajos para acotar la memoria.
+    - `thread`: ThreadPoolExecutor; más ligero pero comparte el GIL.
+
+    El número de trabajos pendientes está acotado, así que los bytes de páginas
+    en cola no crecen sin límite durante imports grandes.
+
+    El timeout de cada trabajo empieza cuando un worker lo recoge (el worker
+    lo avisa por una cola), no al encolarlo: la espera en cola o a que arranque
+    un proceso nuevo no cuenta. Un trabajo colgado reinicia el pool de
+    procesos; los trabajos vecinos que se pierden con él se repiten una vez en
+    el pool nuevo.
+    """
+
+    def __init__(self):
+        self.kind = settings.SCRAPER_EXTRACTION_EXECUTOR.lower()
+        self.max_workers = settings.SCRAPER_EXTRACTION_WORKERS
+        self.timeout = settings.SCRAPER_EXTRACTION_TIMEOUT
+        self.max_tasks_per_child = settings.SCRAPER_EXTRACTION_MAX_TASKS_PER_CHILD
+
+        self._executor: Optional[Executor] = None
+        self._started_queue = None
+        self._pending = asyncio.Semaphore(self.max_workers * 4)
+        self._job_ids = itertools.count(1)
+        self._started: Dict[int, Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = {}
+
+        self._jobs = 0
+        self._timeouts = 0
+        self._restarts = 0
+        self._retries = 0
+        self._cpu_seconds = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "thread":
+                self._started_queue = queue.SimpleQueue()
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="extraction",
+                    initializer=_init_worker,
+                    initargs=(self._started_queue,),
+                )
+            else:
+                # El mismo contexto que elegiría ProcessPoolExecutor (fork no
+                # admite max_tasks_per_child); la cola de avisos debe ser suya
+                context = multiprocessing.get_context("spawn" if self.max_tasks_per_child else None)
+                self._started_queue = context.SimpleQueue()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(self._started_queue,),
+                    max_tasks_per_child=self.max_tasks_per_child or None,
+                )
+            threading.Thread(
+                target=self._watch_started,
+                args=(self._started_queue,),
+                name="extraction-started",
+                daemon=True,
+            ).start()
+            logger.info(f"Pool de extracción creado ({self.kind}, workers={self.max_workers})")
+        return self._executor
+
+    def _watch_started(self, started_queue):
+        """Hilo que pasa al event loop los avisos de inicio de los workers"""
+        while True:
+            job = started_queue.get()
+            if job is None:
+                return
+            entry = self._started.get(job)
+            if entry is None:
+                continue
+            loop, event = entry
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # loop ya cerrado
+
+    def _stop_watcher(self):
+        if self._started_queue is not None:
+            # En otro hilo: un worker terminado a mitad de put() puede dejar
+            # bloqueada la cola de procesos, y el event loop no debe esperarla
+            threading.Thread(target=self._started_queue.put, args=(None,), daemon=True).start()
+            self._started_queue = None
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """
+        Ejecuta `func(*args)` en el pool con timeout por trabajo
+
+        Raises:
+            ExtractionTimeoutError: si el trabajo supera el timeout
+        """
+        async with self._pending:
+            self._jobs += 1
+            try:
+                return await self._run_once(func, args)
+            except BrokenProcessPool:
+                # El pool se reinició por el timeout de otro trabajo (o murió
+                # un worker): este trabajo no tiene la culpa, se repite una vez
+                self._retries += 1
+                logger.info(f"Pool de extracción reiniciado, repitiendo {func.__name__}")
+                return await self._run_once(func, args)
+
+    async def _run_once(self, func: Callable[..., Any], args: Tuple) -> Any:
+        loop = asyncio.get_running_loop()
+        job = next(self._job_ids)
+        started = asyncio.Event()
+        self._started[job] = (loop, started)
+        executor = self._get_executor()
+        try:
+            future = loop.run_in_executor(executor, _timed_call, job, func, *args)
+            # El timeout cuenta desde que un worker recoge el trabajo
+            waiter = loop.create_task(started.wait())
+            try:
+                await asyncio.wait({future, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                waiter.cancel()
+
+            try:
+                result, cpu_seconds = await asyncio.wait_for(future, timeout=self.timeout)
+            except asyncio.TimeoutError:
+                self._timeouts += 1
+                logger.warning(f"Extracción cancelada tras {self.timeout}s ({func.__name__})")
+                self._restart()
+                raise ExtractionTimeoutError(f"Extracción superó {self.timeout}s")
+            self._cpu_seconds += cpu_seconds
+            return result
+        except BrokenProcessPool:
+            if self._executor is executor:
+                # Roto sin pasar por _restart (un worker murió): pool nuevo
+                self._restart()
+            raise
+        finally:
+            self._started.pop(job, None)
+
+    def _restart(self):
+        """
+        Descarta el pool tras un timeout: un worker colgado en lxml no se puede
+        interrumpir, así que se terminan los procesos y se crea un pool nuevo.
+        """
+        if self.kind == "thread" or self._executor is None:
+            return
+
+        executor = self._executor
+        self._executor = None
+        self._stop_watcher()
+        self._restarts += 1
+
+        # ProcessPoolExecutor no expone sus procesos públicamente. Sin
+        # cancel_futures: los trabajos vecinos fallan con BrokenProcessPool
+        # (no con una cancelación) y run() los repite en el pool nuevo
+        for process in list(getattr(executor, "_processes", {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False)
+
+    def shutdown(self):
+        """Cierra el pool (llamar al cerrar la aplicación)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._stop_watcher()
+            logger.info("Pool de extracción cerrado")
+
+    def get_stats(self) -> Dict:
+        return {
+            "executor": self.kind,
+            "workers": self.max_workers,
+            "jobs": self._jobs,
+            "timeouts": self._timeouts,
+            "restarts": self._restarts,
+            "retries": self._retries,
+            "cpu_seconds": round(self._cpu_seconds, 3),
+        }
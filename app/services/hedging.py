@@ -0,0 +1,106 @@
+# app/services/hedging.py - Peticiones "hedged" para hosts con cola lenta
+
+import asyncio
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class RequestProgress:
+    """Marcas de una petición en curso: enviada y con headers recibidos"""
+
+    def __init__(self):
+        self.sent = asyncio.Event()
+        self.headers = asyncio.Event()
+
+    async def headers_within(self, task: asyncio.Task, delay: float) -> bool:
+        """
+        Espera a que la petición reciba headers, como mucho `delay` segundos
+        contados desde que se envió (la espera del rate limiter no cuenta)
+
+        Returns:
+            True si llegaron los headers (o la tarea ya terminó) a tiempo
+        """
+        for event, timeout in ((self.sent, None), (self.headers, delay)):
+            waiter = asyncio.ensure_future(event.wait())
+            try:
+                await asyncio.wait(
+                    {task, waiter}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+            finally:
+                waiter.cancel()
+            if task.done():
+                return True
+        return self.headers.is_set()
+
+
+class HedgePolicy:
+    """
+    Umbral adaptativo por host para lanzar una segunda petición.
+
+    Guarda el tiempo hasta los headers de las últimas respuestas de cada host.
+    Si una petición tarda más que el percentil SCRAPER_HEDGE_PERCENTILE de su
+    host, el scraper lanza otra con headers distintos y se queda con la que
+    termine antes. Sin SCRAPER_HEDGE_MIN_SAMPLES muestras no se hace hedging.
+    """
+
+    def __init__(self, window: int = 50):
+        self.enabled = settings.SCRAPER_HEDGING
+        self.percentile = settings.SCRAPER_HEDGE_PERCENTILE
+        self.min_samples = settings.SCRAPER_HEDGE_MIN_SAMPLES
+        self.min_delay = settings.SCRAPER_HEDGE_MIN_DELAY
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+
+        self._hedged = 0
+        self._wins = 0
+        self._skipped = 0
+
+    def record(self, host: str, seconds: float):
+        """Tiempo hasta headers de una petición al host"""
+        if not self.enabled:
+            return
+        samples = self._samples.get(host)
+        if samples is None:
+            samples = deque(maxlen=self.window)
+            self._samples[host] = samples
+        samples.append(seconds)
+
+    def delay(self, host: str) -> Optional[float]:
+        """
+        Segundos sin headers tras los que lanzar la segunda petición
+
+        Returns:
+            Umbral del host (nunca menor que SCRAPER_HEDGE_MIN_DELAY), o None
+            si el hedging está desactivado o aún no hay muestras suficientes
+        """
+        if not self.enabled:
+            return None
+        samples = self._samples.get(host)
+        if samples is None or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        index = min(int(round(self.percentile / 100 * (len(ordered) - 1))), len(ordered) - 1)
+        return max(ordered[index], self.min_delay)
+
+    def hedged(self):
+        self._hedged += 1
+
+    def won(self):
+        self._wins += 1
+
+    def skipped(self):
+        """No había capacidad (token del dominio o conexión al host) sin esperar"""
+        self._skipped += 1
+
+    def get_stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "hosts_tracked": len(self._samples),
+            "hedged": self._hedged,
+            "hedge_wins": self._wins,
+            "skipped_no_capacity": self._skipped,
+        }
@@ -0,0 +1,237 @@
+# app/services/http_pool.py - Cliente HTTP compartido para el scraper
+
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import urlparse
+
+import httpcore
+import httpx
+from loguru import logger
+
+from app.config import get_settings
+from app.services.dns_cache import CachingNetworkBackend, DNSCache
+
+settings = get_settings()
+
+
+def _http2_available() -> bool:
+    """HTTP/2 requiere el extra `httpx[http2]` (paquete h2)"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+# Excepciones de httpcore -> httpx, la más específica primero (el scraper
+# clasifica los fallos por las clases de httpx)
+_HTTPCORE_ERRORS = tuple(
+    (getattr(httpcore, name), getattr(httpx, name))
+    for name in (
+        "ConnectTimeout", "ReadTimeout", "WriteTimeout", "PoolTimeout", "TimeoutException",
+        "ConnectError", "ReadError", "WriteError", "NetworkError",
+        "ProxyError", "UnsupportedProtocol",
+        "LocalProtocolError", "RemoteProtocolError", "ProtocolError",
+    )
+)
+
+
+@contextmanager
+def _httpx_errors():
+    try:
+        yield
+    except Exception as e:
+        for core_error, httpx_error in _HTTPCORE_ERRORS:
+            if isinstance(e, core_error):
+                raise httpx_error(str(e)) from e
+        raise
+
+
+class _ResponseStream(httpx.AsyncByteStream):
+    """Cuerpo de httpcore como stream de httpx (con sus excepciones)"""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        with _httpx_errors():
+            async for part in self._stream:
+                yield part
+
+    async def aclose(self):
+        if hasattr(self._stream, "aclose"):
+            await self._stream.aclose()
+
+
+class DNSCachingTransport(httpx.AsyncBaseTransport):
+    """
+    Transporte de httpx sobre un pool de httpcore con CachingNetworkBackend
+
+    httpx.AsyncHTTPTransport no deja elegir el backend de red, pero
+    httpcore.AsyncConnectionPool sí (`network_backend`), así que el pool se
+    crea aquí y este transporte sólo traduce peticiones, respuestas y
+    excepciones entre httpx y httpcore.
+    """
+
+    def __init__(self, dns_cache: DNSCache, http2: bool, limits: httpx.Limits):
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            http1=True,
+            http2=http2,
+            network_backend=CachingNetworkBackend(dns_cache),
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path,
+            ),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions,
+        )
+        with _httpx_errors():
+            response = await self._pool.handle_async_request(core_request)
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_ResponseStream(response.stream),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self):
+        await self._pool.aclose()
+
+
+class HTTPClientPool:
+    """
+    Pool de conexiones HTTP de larga duración.
+
+    Un único `httpx.AsyncClient` se reutiliza entre peticiones, de modo que
+    DNS + TCP + TLS se pagan una vez por host mientras la conexión siga viva.
+    Además limita las conexiones concurrentes por host, resuelve DNS con caché
+    (DNSCache) y lleva estadísticas de reutilización para monitoreo.
+    """
+
+    def __init__(self):
+        self.timeout = settings.SCRAPER_TIMEOUT
+        self.max_redirects = settings.SCRAPER_MAX_REDIRECTS
+        self.max_connections = settings.SCRAPER_MAX_CONNECTIONS
+        self.max_connections_per_host = settings.SCRAPER_MAX_CONNECTIONS_PER_HOST
+        self.keepalive_expiry = settings.SCRAPER_KEEPALIVE_EXPIRY
+        self.http2 = settings.SCRAPER_HTTP2
+
+        if self.http2 and not _http2_available():
+            logger.warning("SCRAPER_HTTP2 activo pero falta el paquete 'h2' - usando HTTP/1.1")
+            self.http2 = False
+
+        self.dns_cache = DNSCache()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+
+        # Contadores para estadísticas
+        self._requests = 0
+        self._connections_opened = 0
+
+    def get_client(self) -> httpx.AsyncClient:
+        """Devuelve el cliente compartido (lo crea en el primer uso)"""
+        if self._client is None or self._client.is_closed:
+            transport = DNSCachingTransport(
+                self.dns_cache,
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+            )
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                max_redirects=self.max_redirects,
+                transport=transport,
+                event_hooks={"request": [self._on_request]},
+            )
+            logger.info(
+                f"Cliente HTTP compartido creado (max_conn={self.max_connections}, "
+                f"por_host={self.max_connections_per_host}, http2={self.http2})"
+            )
+        return self._client
+
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        host = (urlparse(url).hostname or "").lower()
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = asyncio.Semaphore(self.max_connections_per_host)
+            self._host_slots[host] = slot
+        return slot
+
+    @asynccontextmanager
+    async def host_slot(self, url: str):
+        """Limita las peticiones concurrentes contra un mismo host"""
+        async with self._host_slot(url):
+            yield
+
+    @asynccontextmanager
+    async def try_host_slot(self, url: str):
+        """Como host_slot() pero sin esperar: produce False si el host está al límite"""
+        slot = self._host_slot(url)
+        if slot.locked():
+            yield False
+            return
+        async with slot:
+            yield True
+
+    async def aclose(self):
+        """Cierra el cliente y todas sus conexiones"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            logger.info("Cliente HTTP compartido cerrado")
+        self._client = None
+
+    async def _on_request(self, request: httpx.Request):
+        """Hook de httpx: cuenta peticiones y engancha el trace de conexiones"""
+        self._requests += 1
+        request.extensions["trace"] = self._trace
+
+    async def _trace(self, event_name: str, info: Dict):
+        """Trace de httpcore: detecta cuándo se abre una conexión nueva"""
+        if event_name == "connection.connect_tcp.complete":
+            self._connections_opened += 1
+
+    def get_stats(self) -> Dict:
+        """Estadísticas del pool: conexiones activas/ociosas y ratio de reutilización"""
+        active = 0
+        idle = 0
+
+        # httpx no expone el pool de httpcore públicamente
+        transport = getattr(self._client, "_transport", None)
+        pool = getattr(transport, "_pool", None)
+        for connection in getattr(pool, "connections", []):
+            if connection.is_closed():
+                continue
+            if connection.is_idle():
+                idle += 1
+            else:
+                active += 1
+
+        reused = max(self._requests - self._connections_opened, 0)
+
+        return {
+            "http2": self.http2,
+            "active_connections": active,
+            "idle_connections": idle,
+            "requests": self._requests,
+            "connections_opened": self._connections_opened,
+            "reuse_ratio": round(reused / self._requests, 3) if self._requests else 0.0,
+            "hosts_tracked": len(self._host_slots),
+            "dns": self.dns_cache.get_stats(),
+        }
@@ -0,0 +1,107 @@
+# app/services/loop_monitor.py - Cuánto tiempo está bloqueado el event loop
+
+import asyncio
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from loguru import logger
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class LoopLagMonitor:
+    """
+    Mide el retraso del event loop: una tarea duerme `interval` y anota cuánto
+    tarde despierta de más. Ese retraso es tiempo en el que el loop estuvo
+    ocupado con código síncrono (un encode de embeddings, un parseo...) y
+    ninguna otra petición avanzó.
+
+    Las esperas de más de `stall_ms` cuentan como bloqueos: su número y el
+    tiempo total bloqueado permiten comparar antes/después de sacar trabajo
+    del loop.
+    """
+
+    def __init__(
+        self,
+        interval_ms: Optional[float] = None,
+        stall_ms: Optional[float] = None,
+        window: int = 3000,
+    ):
+        self.interval = (interval_ms or settings.LOOP_MONITOR_INTERVAL_MS) / 1000
+        self.stall = (stall_ms or settings.LOOP_MONITOR_STALL_MS) / 1000
+        self._lags: deque = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+        self._reset_totals()
+
+    def _reset_totals(self):
+        self._samples = 0
+        self._stalls = 0
+        self._blocked = 0.0
+        self._max_lag = 0.0
+        self._since = time.time()
+
+    def start(self):
+        """Arranca el muestreo en el event loop actual"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(f"⏱️  Monitor del event loop activo (cada {self.interval * 1000:.0f}ms)")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.record(time.perf_counter() - started - self.interval)
+
+    def record(self, lag: float):
+        lag = max(lag, 0.0)
+        self._lags.append(lag)
+        self._samples += 1
+        self._max_lag = max(self._max_lag, lag)
+        if lag >= self.stall:
+            self._stalls += 1
+            self._blocked += lag
+
+    def reset(self):
+        """Pone a cero las métricas (para medir un antes/después)"""
+        self._lags.clear()
+        self._reset_totals()
+
+    def get_stats(self) -> Dict:
+        lags = sorted(self._lags)
+
+        def lag_ms(quantile: float) -> float:
+            if not lags:
+                return 0.0
+            return round(lags[min(int(quantile * len(lags)), len(lags) - 1)] * 1000, 2)
+
+        elapsed = time.time() - self._since
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval_ms": self.interval * 1000,
+            "stall_ms": self.stall * 1000,
+            "samples": self._samples,
+            "lag_ms_p50": lag_ms(0.5),
+            "lag_ms_p95": lag_ms(0.95),
+            "lag_ms_p99": lag_ms(0.99),
+            "lag_ms_max": round(self._max_lag * 1000, 2),
+            "stalls": self._stalls,
+            "blocked_seconds": round(self._blocked, 3),
+            "blocked_ratio": round(self._blocked / elapsed, 4) if elapsed > 0 else 0.0,
+            "since": self._since,
+        }
+
+
+# Singleton
+loop_monitor = LoopLagMonitor()
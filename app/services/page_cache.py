@@ -0,0 +1,290 @@
+# app/services/page_cache.py - Caché de páginas en disco con revalidación HTTP
+
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from loguru import logger
+
+from app.config import get_settings
+from app.services.url_cleaner import URLCleaner
+
+settings = get_settings()
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url_key TEXT PRIMARY KEY,
+    final_url TEXT,
+    body_hash TEXT NOT NULL,
+    status_code INTEGER,
+    content_type TEXT,
+    encoding TEXT,
+    truncated INTEGER DEFAULT 0,
+    etag TEXT,
+    last_modified TEXT,
+    extraction TEXT,
+    fetched_at REAL,
+    accessed_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_pages_accessed_at ON pages (accessed_at);
+CREATE INDEX IF NOT EXISTS ix_pages_body_hash ON pages (body_hash);
+CREATE TABLE IF NOT EXISTS bodies (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL
+);
+"""
+
+
+def normalize_cache_key(url: str) -> str:
+    """
+    Clave de caché: la URL canónica de URLCleaner (sin tracking, esquema/host
+    en minúsculas, sin fragmento ni puerto por defecto y con la query ordenada)
+    """
+    return URLCleaner.canonical_url(url)[0]
+
+
+class PageCache:
+    """
+    Caché local de páginas descargadas.
+
+    - Índice SQLite con una entrada por URL normalizada (ETag, Last-Modified,
+      resultado de la extracción y último acceso).
+    - Cuerpos comprimidos con gzip y direccionados por su SHA-256: dos URLs con
+      el mismo contenido comparten un único fichero.
+    - Cuando el tamaño de los cuerpos supera SCRAPER_CACHE_MAX_BYTES se
+      eliminan las entradas menos usadas recientemente (LRU) hasta bajar al 90%.
+
+    SQLite y el disco son síncronos: los métodos públicos se ejecutan en un
+    thread para no bloquear el event loop.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.directory = Path(directory or settings.SCRAPER_CACHE_DIR)
+        self.max_bytes = settings.SCRAPER_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._revalidated = 0
+        self._stores = 0
+        self._evictions = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            (self.directory / "bodies").mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(
+                str(self.directory / "index.sqlite3"),
+                check_same_thread=False,
+                isolation_level=None,  # autocommit
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            logger.info(f"Caché de páginas en {self.directory}")
+        return self._conn
+
+    def _body_path(self, body_hash: str) -> Path:
+        return self.directory / "bodies" / body_hash[:2] / f"{body_hash}.gz"
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict]) -> Dict[str, str]:
+        """Headers If-None-Match / If-Modified-Since para revalidar una entrada"""
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    # ------------------------------------------------------------------
+    # API asíncrona
+    # ------------------------------------------------------------------
+
+    async def get(self, url: str) -> Optional[Dict]:
+        """
+        Entrada cacheada para la URL
+
+        Returns:
+            Dict con las mismas claves que una página descargada (url,
+            status_code, content_type, encoding, content, truncated, etag,
+            last_modified) más `extraction`, o None si no está
+        """
+        return await asyncio.to_thread(self._get, url)
+
+    async def put(self, url: str, page: Dict, extraction: Optional[Dict] = None):
+        """Guarda (o reemplaza) la página descargada y su extracción"""
+        await asyncio.to_thread(self._put, url, page, extraction)
+
+    async def refresh(self, url: str, page: Dict):
+        """Tras un 304: la entrada sigue siendo válida; actualiza validadores y fechas"""
+        await asyncio.to_thread(self._refresh, url, page)
+
+    # ------------------------------------------------------------------
+    # Implementación síncrona
+    # ------------------------------------------------------------------
+
+    def _get(self, url: str) -> Optional[Dict]:
+        key = normalize_cache_key(url)
+        with self._lock:
+            db = self._db()
+            row = db.execute(
+                "SELECT final_url, body_hash, status_code, content_type, encoding, truncated, "
+                "etag, last_modified, extraction FROM pages WHERE url_key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                self._misses += 1
+                return None
+
+            try:
+                content = gzip.decompress(self._body_path(row[1]).read_bytes())
+            except (OSError, EOFError) as e:
+                # Cuerpo borrado o corrupto: la entrada ya no sirve
+                logger.warning(f"Caché: cuerpo ilegible para {key}: {e}")
+                db.execute("DELETE FROM pages WHERE url_key = ?", (key,))
+                self._misses += 1
+                return None
+
+            db.execute("UPDATE pages SET accessed_at = ? WHERE url_key = ?", (time.time(), key))
+            self._hits += 1
+
+        return {
+            "url": row[0],
+            "status_code": row[2],
+            "content_type": row[3],
+            "encoding": row[4],
+            "content": content,
+            "truncated": bool(row[5]),
+            "etag": row[6],
+            "last_modified": row[7],
+            "extraction": json.loads(row[8]) if row[8] else None,
+        }
+
+    def _put(self, url: str, page: Dict, extraction: Optional[Dict]):
+        key = normalize_cache_key(url)
+        content = page["content"]
+        body_hash = hashlib.sha256(content).hexdigest()
+        now = time.time()
+
+        with self._lock:
+            db = self._db()
+            previous = db.execute(
+                "SELECT body_hash FROM pages WHERE url_key = ?", (key,)
+            ).fetchone()
+            path = self._body_path(body_hash)
+            if not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                compressed = gzip.compress(content, compresslevel=6)
+                tmp = path.with_suffix(".tmp")
+                tmp.write_bytes(compressed)
+                os.replace(tmp, path)
+                db.execute(
+                    "INSERT OR REPLACE INTO bodies (hash, size) VALUES (?, ?)",
+                    (body_hash, len(compressed)),
+                )
+
+            db.execute(
+                "INSERT OR REPLACE INTO pages (url_key, final_url, body_hash, status_code, "
+                "content_type, encoding, truncated, etag, last_modified, extraction, "
+                "fetched_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    page.get("url"),
+                    body_hash,
+                    page.get("status_code"),
+                    page.get("content_type"),
+                    page.get("encoding"),
+                    int(bool(page.get("truncated"))),
+                    page.get("etag"),
+                    page.get("last_modified"),
+                    json.dumps(extraction) if extraction is not None else None,
+                    now,
+                    now,
+                ),
+            )
+            self._stores += 1
+            if previous and previous[0] != body_hash:
+                self._release_body(db, previous[0])
+            self._evict(db)
+
+    def _refresh(self, url: str, page: Dict):
+        key = normalize_cache_key(url)
+        now = time.time()
+        with self._lock:
+            # Un 304 puede traer validadores nuevos; si no, se conservan los anteriores
+            self._db().execute(
+                "UPDATE pages SET etag = COALESCE(?, etag), "
+                "last_modified = COALESCE(?, last_modified), "
+                "fetched_at = ?, accessed_at = ? WHERE url_key = ?",
+                (page.get("etag"), page.get("last_modified"), now, now, key),
+            )
+            self._revalidated += 1
+
+    def _release_body(self, db: sqlite3.Connection, body_hash: str):
+        """Borra el cuerpo si ya no lo referencia ninguna entrada"""
+        in_use = db.execute(
+            "SELECT 1 FROM pages WHERE body_hash = ? LIMIT 1", (body_hash,)
+        ).fetchone()
+        if in_use:
+            return
+        try:
+            self._body_path(body_hash).unlink()
+        except FileNotFoundError:
+            pass
+        db.execute("DELETE FROM bodies WHERE hash = ?", (body_hash,))
+
+    def _total_bytes(self, db: sqlite3.Connection) -> int:
+        return db.execute("SELECT COALESCE(SUM(size), 0) FROM bodies").fetchone()[0]
+
+    def _evict(self, db: sqlite3.Connection):
+        """Expulsión LRU hasta dejar la caché al 90% de SCRAPER_CACHE_MAX_BYTES"""
+        if not self.max_bytes or self._total_bytes(db) <= self.max_bytes:
+            return
+
+        target = int(self.max_bytes * 0.9)
+        while self._total_bytes(db) > target:
+            oldest = db.execute(
+                "SELECT url_key, body_hash FROM pages ORDER BY accessed_at ASC LIMIT 20"
+            ).fetchall()
+            if not oldest:
+                break
+            db.executemany("DELETE FROM pages WHERE url_key = ?", [(key,) for key, _ in oldest])
+            self._evictions += len(oldest)
+            for body_hash in {body_hash for _, body_hash in oldest}:
+                self._release_body(db, body_hash)
+
+        logger.info(f"Caché de páginas: expulsadas entradas hasta {target} bytes")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def get_stats(self) -> Dict:
+        entries = 0
+        total_bytes = 0
+        with self._lock:
+            if self._conn is not None:
+                entries = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+                total_bytes = self._total_bytes(self._conn)
+        return {
+            "entries": entries,
+            "bytes": total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self._hits,
+            "misses": self._misses,
+            "revalidated": self._revalidated,
+            "stores": self._stores,
+            "evictions": self._evictions,
+        }
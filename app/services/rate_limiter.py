@@ -0,0 +1,139 @@
+# app/services/rate_limiter.py - Rate limiting por dominio (token bucket)
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Tuple
+
+from loguru import logger
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class TokenBucket:
+    """Token bucket clásico: `rate` tokens por segundo con ráfaga máxima `burst`"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        # Serializa a los que esperan en el mismo dominio (orden FIFO)
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> bool:
+        """Consume un token si hay uno disponible, sin esperar"""
+        if self.rate <= 0:
+            return True
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    async def acquire(self) -> float:
+        """
+        Consume un token, esperando lo necesario
+
+        Returns:
+            Segundos esperados
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        async with self._lock:
+            self._refill()
+            wait_time = 0.0
+            if self.tokens < 1:
+                wait_time = (1 - self.tokens) / self.rate
+                await asyncio.sleep(wait_time)
+                self._refill()
+            self.tokens -= 1
+            return wait_time
+
+
+class DomainRateLimiter:
+    """
+    Rate limiter por dominio registrado + límite global de concurrencia.
+
+    Cada dominio tiene su propio token bucket, así que las peticiones a hosts
+    distintos no se esperan entre sí; sólo el semáforo global las acota.
+    """
+
+    def __init__(self):
+        delay = settings.SCRAPER_DELAY_BETWEEN_REQUESTS
+        self.default_rate = 1.0 / delay if delay > 0 else 0.0
+        self.default_burst = settings.SCRAPER_DOMAIN_BURST
+        self.max_concurrency = settings.SCRAPER_MAX_CONCURRENCY
+        self.overrides: Dict[str, Tuple[float, int]] = settings.domain_rate_limits
+
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._global_slots = asyncio.Semaphore(self.max_concurrency)
+        self._in_flight = 0
+        self._total_wait = 0.0
+
+    def bucket(self, domain: str) -> TokenBucket:
+        """Obtiene (o crea) el bucket del dominio"""
+        domain = (domain or "").lower()
+        bucket = self._buckets.get(domain)
+        if bucket is None:
+            rate, burst = self.overrides.get(domain, (self.default_rate, self.default_burst))
+            bucket = TokenBucket(rate, burst)
+            self._buckets[domain] = bucket
+        return bucket
+
+    async def acquire(self, domain: str) -> float:
+        """Espera turno en el bucket del dominio (sin ocupar slot global)"""
+        wait_time = await self.bucket(domain).acquire()
+        if wait_time > 0:
+            self._total_wait += wait_time
+            logger.debug(f"Rate limiting [{domain}]: esperado {wait_time:.2f}s")
+        return wait_time
+
+    @asynccontextmanager
+    async def slot(self, domain: str):
+        """
+        Turno del dominio + slot global durante toda la petición.
+
+        El token se consume antes de pedir el slot global para que un dominio
+        lento no acapare la concurrencia mientras espera su turno.
+        """
+        await self.acquire(domain)
+        async with self._global_slots:
+            self._in_flight += 1
+            try:
+                yield
+            finally:
+                self._in_flight -= 1
+
+    @asynccontextmanager
+    async def try_slot(self, domain: str):
+        """
+        Como slot() pero sin esperar: produce False si el dominio no tiene
+        token disponible o no queda slot global (peticiones opcionales)
+        """
+        if self._global_slots.locked() or not self.bucket(domain).try_acquire():
+            yield False
+            return
+        async with self._global_slots:
+            self._in_flight += 1
+            try:
+                yield True
+            finally:
+                self._in_flight -= 1
+
+    def get_stats(self) -> Dict:
+        return {
+            "domains_tracked": len(self._buckets),
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "default_rate_per_second": round(self.default_rate, 3),
+            "total_wait_seconds": round(self._total_wait, 2),
+        }
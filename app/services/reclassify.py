@@ -0,0 +1,215 @@
+# app/services/reclassify.py - Reclasificación NSFW en bloque de los bookmarks guardados
+
+import asyncio
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+from sqlalchemy import func, or_, select, update
+
+from app.config import get_settings
+from app.models import Bookmark
+from app.services.classifier import TEXT_SAMPLE_CHARS, SafetyClassifier, classifier
+
+settings = get_settings()
+
+# (is_nsfw, nsfw_reason, classifier_tokens)
+Verdict = Tuple[bool, Optional[str], List[str]]
+
+
+# ---------------------------------------------------------------------------
+# Workers del pool: cada proceso compila las keywords una vez al arrancar.
+# Los dominios se comprueban en el proceso principal (la blocklist puede ser
+# enorme y la búsqueda es barata).
+# ---------------------------------------------------------------------------
+
+_worker: Optional[SafetyClassifier] = None
+
+
+def _init_worker(keywords: Sequence[str]):
+    global _worker
+    logger.disable("app.services.classifier")
+    _worker = SafetyClassifier(keywords=list(keywords), domains=[], domains_file="")
+
+
+def _classify_chunk(rows: Sequence[Tuple[str, Optional[str], Optional[str]]]) -> List[Verdict]:
+    verdicts = []
+    for url, title, text in rows:
+        is_nsfw, reason = _worker.classify(url, title or "", text or "")
+        verdicts.append((is_nsfw, reason, _worker.index_tokens(url, title, text)))
+    return verdicts
+
+
+class BulkReclassifier:
+    """
+    Reclasifica is_nsfw / nsfw_reason de los bookmarks ya guardados.
+
+    - Lee url, título y los primeros TEXT_SAMPLE_CHARS de full_text en
+      bloques de CLASSIFIER_BATCH_SIZE (paginación por id), reparte la
+      clasificación entre CLASSIFIER_WORKERS procesos y escribe el resultado
+      con un UPDATE masivo por bloque.
+    - Cada fila guarda sus tokens (classifier_tokens, con índice GIN). Al
+      añadir una keyword o un dominio sólo se vuelven a mirar las filas que
+      contienen todos sus tokens, no la tabla entera.
+    """
+
+    def __init__(
+        self,
+        safety_classifier: SafetyClassifier = classifier,
+        workers: Optional[int] = None,
+        batch_size: Optional[int] = None,
+    ):
+        self.classifier = safety_classifier
+        self.workers = workers if workers is not None else (settings.CLASSIFIER_WORKERS or os.cpu_count() or 1)
+        self.batch_size = batch_size or settings.CLASSIFIER_BATCH_SIZE
+        self.chunk_size = 250
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_keywords: Optional[Tuple[str, ...]] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Pool con las keywords actuales (se recrea si han cambiado)"""
+        keywords = tuple(self.classifier.nsfw_keywords)
+        if self._executor is not None and keywords != self._executor_keywords:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(keywords,),
+            )
+            self._executor_keywords = keywords
+            logger.info(f"Pool de clasificación creado (workers={self.workers}, keywords={len(keywords)})")
+        return self._executor
+
+    async def classify_many(
+        self,
+        rows: Sequence[Tuple[str, Optional[str], Optional[str]]],
+    ) -> List[Verdict]:
+        """
+        Clasifica filas (url, título, texto) en paralelo
+
+        Returns:
+            (is_nsfw, nsfw_reason, classifier_tokens) por fila, en orden
+        """
+        if self.workers <= 1 or len(rows) <= self.chunk_size:
+            verdicts = [
+                (*self.classifier.classify(url, title or "", text or ""),
+                 self.classifier.index_tokens(url, title, text))
+                for url, title, text in rows
+            ]
+            return verdicts
+
+        executor = self._get_executor()
+        loop = asyncio.get_running_loop()
+        chunks = await asyncio.gather(*(
+            loop.run_in_executor(executor, _classify_chunk, rows[start:start + self.chunk_size])
+            for start in range(0, len(rows), self.chunk_size)
+        ))
+        verdicts = [verdict for chunk in chunks for verdict in chunk]
+
+        # Los workers no tienen la lista de dominios: el dominio va primero
+        for index, (url, _, _) in enumerate(rows):
+            is_nsfw_domain, domain_reason = self.classifier._check_domain(url)
+            if is_nsfw_domain:
+                verdicts[index] = (True, domain_reason, verdicts[index][2])
+        return verdicts
+
+    async def reclassify(self, db, where=None) -> Dict[str, int]:
+        """
+        Reclasifica las filas que cumplen `where` (todas si es None)
+
+        Returns:
+            Dict con scanned, changed, flagged, cleared
+        """
+        stats = Counter()
+        last_id = 0
+
+        while True:
+            query = (
+                select(
+                    Bookmark.id,
+                    Bookmark.url,
+                    func.coalesce(Bookmark.clean_title, Bookmark.original_title),
+                    func.left(Bookmark.full_text, TEXT_SAMPLE_CHARS),
+                    Bookmark.is_nsfw,
+                    Bookmark.nsfw_reason,
+                    Bookmark.updated_at,
+                )
+                .where(Bookmark.id > last_id)
+                .order_by(Bookmark.id)
+                .limit(self.batch_size)
+            )
+            if where is not None:
+                query = query.where(where)
+            rows = (await db.execute(query)).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            verdicts = await self.classify_many([(url, title, text) for _, url, title, text, *_ in rows])
+
+            now = datetime.now(timezone.utc)
+            params = []
+            for (bookmark_id, _, _, _, was_nsfw, old_reason, updated_at), (is_nsfw, reason, tokens) in zip(rows, verdicts):
+                reason = reason[:256] if reason else None
+                if bool(was_nsfw) != is_nsfw or (is_nsfw and old_reason != reason):
+                    stats["changed"] += 1
+                    if bool(was_nsfw) != is_nsfw:
+                        stats["flagged" if is_nsfw else "cleared"] += 1
+                params.append({
+                    "id": bookmark_id,
+                    "is_nsfw": is_nsfw,
+                    "nsfw_reason": reason,
+                    "classifier_tokens": tokens,
+                    "classified_at": now,
+                    # No es un cambio del bookmark: updated_at se conserva
+                    "updated_at": updated_at,
+                })
+
+            await db.execute(update(Bookmark), params)
+            await db.commit()
+            stats["scanned"] += len(rows)
+            logger.info(f"  {stats['scanned']} filas reclasificadas, {stats['changed']} cambios")
+
+        return {key: stats[key] for key in ("scanned", "changed", "flagged", "cleared")}
+
+    async def refresh_index(self, db) -> Dict[str, int]:
+        """Filas nunca indexadas o modificadas desde la última clasificación"""
+        return await self.reclassify(db, or_(
+            Bookmark.classified_at.is_(None),
+            Bookmark.updated_at > Bookmark.classified_at,
+        ))
+
+    async def add_keyword(self, db, keyword: str) -> Dict[str, int]:
+        """Añade la keyword y reclasifica sólo las filas que pueden contenerla"""
+        self.classifier.add_keyword(keyword)
+        return await self._apply_rule(db, self.classifier.rule_tokens(keyword))
+
+    async def add_domain(self, db, domain: str) -> Dict[str, int]:
+        """Añade el dominio y reclasifica sólo las filas que pueden ser de él"""
+        self.classifier.add_domain(domain)
+        # Una red CIDR no se puede buscar por tokens de la URL
+        tokens = [] if "/" in domain else self.classifier.rule_tokens(domain)
+        return await self._apply_rule(db, tokens)
+
+    async def _apply_rule(self, db, tokens: List[str]) -> Dict[str, int]:
+        # El índice tiene que estar al día antes de buscar candidatos en él
+        await self.refresh_index(db)
+
+        # Una regla nueva sólo puede marcar filas, no desmarcarlas
+        where = or_(Bookmark.is_nsfw.is_(None), Bookmark.is_nsfw.is_(False))
+        if tokens:
+            where = where & Bookmark.classifier_tokens.contains(tokens)
+        else:
+            logger.warning("La regla no tiene tokens indexables: se revisan todas las filas")
+        return await self.reclassify(db, where)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,210 @@
+# app/services/redirect_cache.py - Mapa persistente de redirecciones y acortadores
+
+import asyncio
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from loguru import logger
+
+from app.config import get_settings
+from app.services.page_cache import normalize_cache_key
+
+settings = get_settings()
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS redirects (
+    source_key TEXT PRIMARY KEY,
+    source_url TEXT NOT NULL,
+    final_url TEXT NOT NULL,
+    final_key TEXT NOT NULL,
+    hops INTEGER NOT NULL,
+    permanent INTEGER NOT NULL,
+    created_at REAL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_redirects_final_key ON redirects (final_key);
+"""
+
+# Límite de parámetros por consulta de SQLite
+_CHUNK = 500
+
+
+class RedirectCache:
+    """
+    URL de origen -> URL final tras seguir las redirecciones (t.co, bit.ly,
+    http -> https...).
+
+    - El fetcher salta directamente a la URL final en lugar de recorrer la
+      cadena en cada pasada.
+    - Las cadenas sólo con 301/308 duran SCRAPER_REDIRECT_TTL; si hay algún
+      302/307 (pueden cambiar), SCRAPER_REDIRECT_TEMP_TTL.
+    - `lookup_many` y `sources_many` permiten al importador agrupar los
+      bookmarks que acaban en la misma página.
+
+    Las claves son URLs normalizadas como en la caché de páginas (sin
+    tracking, query ordenada, sin fragmento).
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.enabled = settings.SCRAPER_REDIRECT_CACHE
+        self.path = Path(path or settings.SCRAPER_REDIRECT_CACHE_FILE)
+        self.ttl = settings.SCRAPER_REDIRECT_TTL
+        self.temp_ttl = settings.SCRAPER_REDIRECT_TEMP_TTL
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._invalidations = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(
+                str(self.path),
+                check_same_thread=False,
+                isolation_level=None,  # autocommit
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    # ------------------------------------------------------------------
+    # API asíncrona
+    # ------------------------------------------------------------------
+
+    async def lookup(self, url: str) -> Optional[Dict]:
+        """
+        Redirección vigente para la URL
+
+        Returns:
+            Dict con final_url y hops, o None
+        """
+        found = await asyncio.to_thread(self._lookup_many, [url])
+        if url in found:
+            self._hits += 1
+            return found[url]
+        self._misses += 1
+        return None
+
+    async def record(self, url: str, final_url: str, hops: int, permanent: bool):
+        """Guarda la cadena url -> final_url (no hace nada si no hubo redirección)"""
+        if not hops or normalize_cache_key(final_url) == normalize_cache_key(url):
+            return
+        await asyncio.to_thread(self._record, url, final_url, hops, permanent)
+
+    async def invalidate(self, url: str):
+        """La URL final ya no sirve: la próxima pasada recorre la cadena de nuevo"""
+        await asyncio.to_thread(self._invalidate, url)
+
+    async def lookup_many(self, urls: Iterable[str]) -> Dict[str, Dict]:
+        """Redirecciones vigentes para muchas URLs: {url: {final_url, hops}}"""
+        return await asyncio.to_thread(self._lookup_many, list(urls))
+
+    async def sources_many(self, final_urls: Iterable[str]) -> Dict[str, List[str]]:
+        """Inverso de lookup_many: {final_url: [URLs de origen que llevan a ella]}"""
+        return await asyncio.to_thread(self._sources_many, list(final_urls))
+
+    # ------------------------------------------------------------------
+    # Implementación síncrona
+    # ------------------------------------------------------------------
+
+    def _lookup_many(self, urls: List[str]) -> Dict[str, Dict]:
+        keys = {}
+        for url in urls:
+            keys.setdefault(normalize_cache_key(url), []).append(url)
+
+        found = {}
+        now = time.time()
+        key_list = list(keys)
+        with self._lock:
+            db = self._db()
+            for start in range(0, len(key_list), _CHUNK):
+                chunk = key_list[start:start + _CHUNK]
+                rows = db.execute(
+                    f"SELECT source_key, final_url, hops FROM redirects "
+                    f"WHERE source_key IN ({','.join('?' * len(chunk))}) AND expires_at > ?",
+                    (*chunk, now),
+                ).fetchall()
+                for source_key, final_url, hops in rows:
+                    for url in keys[source_key]:
+                        found[url] = {"final_url": final_url, "hops": hops}
+        return found
+
+    def _sources_many(self, final_urls: List[str]) -> Dict[str, List[str]]:
+        keys = {}
+        for url in final_urls:
+            keys.setdefault(normalize_cache_key(url), []).append(url)
+
+        found: Dict[str, List[str]] = {}
+        now = time.time()
+        key_list = list(keys)
+        with self._lock:
+            db = self._db()
+            for start in range(0, len(key_list), _CHUNK):
+                chunk = key_list[start:start + _CHUNK]
+                rows = db.execute(
+                    f"SELECT final_key, source_url FROM redirects "
+                    f"WHERE final_key IN ({','.join('?' * len(chunk))}) AND expires_at > ?",
+                    (*chunk, now),
+                ).fetchall()
+                for final_key, source_url in rows:
+                    for url in keys[final_key]:
+                        found.setdefault(url, []).append(source_url)
+        return found
+
+    def _record(self, url: str, final_url: str, hops: int, permanent: bool):
+        now = time.time()
+        ttl = self.ttl if permanent else self.temp_ttl
+        with self._lock:
+            self._db().execute(
+                "INSERT OR REPLACE INTO redirects (source_key, source_url, final_url, final_key, "
+                "hops, permanent, created_at, expires_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    normalize_cache_key(url),
+                    url,
+                    final_url,
+                    normalize_cache_key(final_url),
+                    hops,
+                    int(permanent),
+                    now,
+                    now + ttl,
+                ),
+            )
+            self._stores += 1
+
+    def _invalidate(self, url: str):
+        with self._lock:
+            self._db().execute(
+                "DELETE FROM redirects WHERE source_key = ?", (normalize_cache_key(url),)
+            )
+            self._invalidations += 1
+        logger.info(f"Redirección olvidada: {url}")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def get_stats(self) -> Dict:
+        entries = 0
+        with self._lock:
+            if self._conn is not None:
+                entries = self._conn.execute(
+                    "SELECT COUNT(*) FROM redirects WHERE expires_at > ?", (time.time(),)
+                ).fetchone()[0]
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "hits": self._hits,
+            "misses": self._misses,
+            "stores": self._stores,
+            "invalidations": self._invalidations,
+        }
@@ -0,0 +1,214 @@
+# app/services/retry_policy.py - Política única de reintentos por URL
+
+import random
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import Deque, Dict, Optional
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Header Retry-After en segundos (acepta segundos o una fecha HTTP)
+
+    Returns:
+        Segundos a esperar (>= 0), o None si no hay header o no se entiende
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class RetryBudget:
+    """
+    Presupuesto de una URL: intentos y tiempo total compartidos por todas las
+    capas (descarga, bot detection, rate limiting...).
+
+    Sustituye a los reintentos anidados (tenacity dentro del bucle de
+    estrategias, más los sleeps de 429): una URL nunca hace más de
+    `max_attempts` peticiones ni ocupa a un worker más de `deadline` segundos.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int,
+        deadline: float,
+        backoff_base: float,
+        backoff_max: float,
+        request_timeout: float,
+    ):
+        self.max_attempts = max(max_attempts, 1)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.request_timeout = request_timeout
+        self.started = time.monotonic()
+        self.deadline = self.started + deadline if deadline else float("inf")
+        self.attempts = 0
+
+    def remaining(self) -> float:
+        """Segundos que le quedan a la URL"""
+        return self.deadline - time.monotonic()
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def can_attempt(self) -> bool:
+        return self.attempts < self.max_attempts and self.remaining() > 0
+
+    def next_attempt(self) -> int:
+        """Consume un intento del presupuesto y devuelve su número (1, 2, ...)"""
+        self.attempts += 1
+        return self.attempts
+
+    def attempt_timeout(self) -> float:
+        """Timeout de la petición: SCRAPER_TIMEOUT, recortado al tiempo restante"""
+        return max(min(self.request_timeout, self.remaining()), 0.1)
+
+    def attempt_limit(self) -> Optional[float]:
+        """
+        Tope del intento completo (esperas del rate limiter y de los slots,
+        lectura del cuerpo y hedge): lo que queda del deadline, o None sin
+        deadline. httpx aplica attempt_timeout a cada paso por separado, así
+        que un cuerpo que llega gota a gota no lo agotaría nunca.
+        """
+        if self.deadline == float("inf"):
+            return None
+        return max(self.remaining(), 0.1)
+
+    def backoff(self, attempt: int) -> Optional[float]:
+        """
+        Espera antes del siguiente intento (backoff exponencial con full jitter)
+
+        Returns:
+            Segundos a esperar, o None si no quedan intentos o la espera (más
+            un intento mínimo) no cabe antes del deadline
+        """
+        if self.attempts >= self.max_attempts:
+            return None
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        delay = random.uniform(0, ceiling)
+        if delay + 1.0 >= self.remaining():
+            return None
+        return delay
+
+
+class RetryPolicy:
+    """
+    Crea el presupuesto de cada URL a partir de la configuración y decide
+    cuándo reprogramar un bookmark con un fallo transitorio
+    """
+
+    def __init__(self):
+        self.max_attempts = settings.SCRAPER_MAX_RETRIES
+        self.deadline = settings.SCRAPER_URL_DEADLINE
+        self.backoff_base = settings.SCRAPER_RETRY_BACKOFF_BASE
+        self.backoff_max = settings.SCRAPER_RETRY_BACKOFF_MAX
+        self.request_timeout = settings.SCRAPER_TIMEOUT
+        self.requeue_base_delay = settings.SCRAPER_REQUEUE_BASE_DELAY
+        self.requeue_max_delay = settings.SCRAPER_REQUEUE_MAX_DELAY
+        self.requeue_max_retries = settings.SCRAPER_REQUEUE_MAX_RETRIES
+
+    def start(self) -> RetryBudget:
+        return RetryBudget(
+            max_attempts=self.max_attempts,
+            deadline=self.deadline,
+            backoff_base=self.backoff_base,
+            backoff_max=self.backoff_max,
+            request_timeout=self.request_timeout,
+        )
+
+    def requeue_delay(self, retry_count: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """
+        Segundos hasta el próximo intento de un bookmark reprogramado
+
+        Se respeta el Retry-After del servidor (o el cool-down del circuito);
+        si no lo hay, backoff exponencial desde SCRAPER_REQUEUE_BASE_DELAY con
+        jitter. Siempre limitado a SCRAPER_REQUEUE_MAX_DELAY.
+
+        Args:
+            retry_count: reprogramaciones previas del bookmark
+
+        Returns:
+            Segundos, o None si ya se agotaron las SCRAPER_REQUEUE_MAX_RETRIES
+        """
+        if retry_count >= self.requeue_max_retries:
+            return None
+        if retry_after is not None:
+            delay = retry_after
+        else:
+            delay = self.requeue_base_delay * (2 ** retry_count) * random.uniform(0.5, 1.0)
+        return min(delay, self.requeue_max_delay)
+
+    def next_attempt_at(self, scraped: Optional[Dict], retry_count: int) -> Optional[datetime]:
+        """
+        Fecha del próximo intento para un resultado de scrape_url
+
+        Returns:
+            datetime (UTC) si el fallo es transitorio y quedan reprogramaciones;
+            None si fue bien, el fallo es definitivo o se agotaron
+        """
+        if not scraped or scraped.get("success") or not scraped.get("retryable"):
+            return None
+        delay = self.requeue_delay(retry_count, scraped.get("retry_after"))
+        if delay is None:
+            return None
+        return datetime.now(timezone.utc) + timedelta(seconds=delay)
+
+
+class LatencyTracker:
+    """
+    Tiempo total por URL (descarga + reintentos + extracción).
+
+    Guarda las últimas `window` muestras y calcula p50/p95/p99 al pedirlas;
+    los scripts lo muestran al terminar cada ejecución.
+    """
+
+    def __init__(self, window: int = 10000):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._count = 0
+        self._failures = 0
+
+    def record(self, seconds: float, success: bool = True):
+        self._samples.append(seconds)
+        self._count += 1
+        if not success:
+            self._failures += 1
+
+    @staticmethod
+    def _percentile(ordered, pct: float) -> float:
+        index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+        return ordered[index]
+
+    def summary(self) -> Dict:
+        ordered = sorted(self._samples)
+        if not ordered:
+            return {"count": 0, "failures": 0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+        return {
+            "count": self._count,
+            "failures": self._failures,
+            "p50": round(self._percentile(ordered, 50), 3),
+            "p95": round(self._percentile(ordered, 95), 3),
+            "p99": round(self._percentile(ordered, 99), 3),
+            "max": round(ordered[-1], 3),
+        }
+
+    def format_summary(self) -> str:
+        s = self.summary()
+        return (
+            f"⏱️  Tiempo por URL ({s['count']} URLs, {s['failures']} fallidas): "
+            f"p50={s['p50']:.2f}s p95={s['p95']:.2f}s p99={s['p99']:.2f}s max={s['max']:.2f}s"
+        )
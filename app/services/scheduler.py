@@ -0,0 +1,70 @@
+# app/services/scheduler.py - Cola de URLs con reparto justo entre hosts
+
+import asyncio
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, Iterable, Optional
+
+
+class HostFairQueue:
+    """
+    Cola de URLs agrupadas por dominio que se reparten en round-robin.
+
+    Un dominio nunca tiene más de `per_host_limit` URLs en vuelo, de modo que
+    500 bookmarks de github.com no acaparan a todos los workers mientras el
+    resto de hosts espera.
+    """
+
+    def __init__(
+        self,
+        urls: Iterable[str],
+        key_func: Callable[[str], str],
+        per_host_limit: int,
+    ):
+        self.per_host_limit = max(per_host_limit, 1)
+        self._pending: "OrderedDict[str, Deque[str]]" = OrderedDict()
+        self._in_flight: Dict[str, int] = {}
+        self._cond = asyncio.Condition()
+        self.total = 0
+
+        for url in urls:
+            key = key_func(url)
+            self._pending.setdefault(key, deque()).append(url)
+            self.total += 1
+
+    def _pop_ready(self) -> Optional[tuple]:
+        """Siguiente (dominio, url) de un dominio con hueco libre, rotando"""
+        for key in list(self._pending.keys()):
+            if self._in_flight.get(key, 0) >= self.per_host_limit:
+                continue
+            urls = self._pending[key]
+            url = urls.popleft()
+            if urls:
+                # Al final de la rotación para alternar con el resto de dominios
+                self._pending.move_to_end(key)
+            else:
+                del self._pending[key]
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+            return key, url
+        return None
+
+    async def get(self) -> Optional[tuple]:
+        """
+        Espera hasta que haya una URL disponible
+
+        Returns:
+            (dominio, url) o None cuando la cola se ha vaciado
+        """
+        async with self._cond:
+            while True:
+                if not self._pending:
+                    return None
+                item = self._pop_ready()
+                if item is not None:
+                    return item
+                await self._cond.wait()
+
+    async def done(self, key: str):
+        """Marca una URL del dominio como terminada y despierta a los workers"""
+        async with self._cond:
+            self._in_flight[key] -= 1
+            self._cond.notify_all()
@@ -1,23 +1,41 @@
 # app/services/scraper.py - VERSIÓN RESILIENTE ACTUALIZADA
 
-import trafilatura
 import httpx
-from typing import Optional, Dict, Tuple
+from typing import Optional, Dict, Tuple, Iterable, AsyncIterator, Callable
 from loguru import logger
 from datetime import datetime
-import tldextract
 from urllib.parse import urlparse
 import random
 import asyncio
-from tenacity import (
-    retry,
-    stop_after_attempt,
-    wait_exponential,
-    retry_if_exception_type,
-    RetryError
-)
+import ssl
+import time
 
 from app.config import get_settings
+from app.services.domain_parser import domain_parser
+from app.services.http_pool import HTTPClientPool
+from app.services.rate_limiter import DomainRateLimiter
+from app.services.scheduler import HostFairQueue
+from app.services.page_cache import PageCache
+from app.services.redirect_cache import RedirectCache
+from app.services.dns_cache import DeadHostCache, dns_failure, error_chain
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.hedging import HedgePolicy, RequestProgress
+from app.services.warc import WARCWriter
+from app.services.strategies import DomainStrategyPreferences, StrategyRegistry
+from app.utils.domain_set import DomainSuffixSet
+from app.services.retry_policy import (
+    LatencyTracker,
+    RetryBudget,
+    RetryPolicy,
+    parse_retry_after,
+)
+from app.services.extraction import (
+    ExtractionExecutor,
+    ExtractionTimeoutError,
+    decode_html,
+    extract_document,
+    extract_pdf,
+)
 
 settings = get_settings()
 
@@ -33,8 +51,11 @@ class BotDetectionError(ScrapingError):
 
 
 class RateLimitError(ScrapingError):
-    """Error 429 - Rate limited"""
-    pass
+    """Error 429 - Rate limited (con el Retry-After del servidor, si lo envió)"""
+    
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
 
 
 class TimeoutError(ScrapingError):
@@ -42,6 +63,18 @@ class TimeoutError(ScrapingError):
     pass
 
 
+class ContentRejectedError(ScrapingError):
+    """Respuesta descartada antes de descargarla entera (tipo o tamaño)"""
+    
+    def __init__(self, error_type: str, message: str):
+        super().__init__(message)
+        self.error_type = error_type
+
+
+def _is_tls_failure(error: BaseException) -> bool:
+    return any(isinstance(cause, ssl.SSLError) for cause in error_chain(error))
+
+
 class UserAgentRotator:
     """Rotación de User-Agents realistas"""
     
@@ -70,7 +103,6 @@ class UserAgentRotator:
             "Accept-Language": "es-ES,es;q=0.9,en;q=0.8",
             "Accept-Encoding": "gzip, deflate, br",
             "DNT": "1",
-            "Connection": "keep-alive",
             "Upgrade-Insecure-Requests": "1",
             "Sec-Fetch-Dest": "document",
             "Sec-Fetch-Mode": "navigate",
@@ -83,50 +115,213 @@ class UserAgentRotator:
 class ResilientScraper:
     """Scraper con múltiples estrategias y reintentos"""
     
+    # Content-Types que pasan por la cadena de extracción HTML
+    # (sin Content-Type también se intenta como HTML)
+    HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+    
+    # Fallos transitorios que no se reintentan en línea sino que se reprograman
+    # (`retryable` + `retry_after` en el resultado; ver RetryPolicy.next_attempt_at).
+    # http_error sólo cuenta si es un 5xx
+    REQUEUE_ERROR_TYPES = ("rate_limited", "timeout", "network_error", "circuit_open", "http_error")
+    
     def __init__(self):
         self.timeout = settings.SCRAPER_TIMEOUT
         self.max_retries = settings.SCRAPER_MAX_RETRIES
         self.max_redirects = settings.SCRAPER_MAX_REDIRECTS
         self.delay_between_requests = settings.SCRAPER_DELAY_BETWEEN_REQUESTS
         self.user_agent_rotator = UserAgentRotator()
-        self.last_request_time = None
+        self.http_pool = HTTPClientPool()
+        self.rate_limiter = DomainRateLimiter()
+        self.extractor = ExtractionExecutor()
+        self.max_body_bytes = settings.SCRAPER_MAX_BODY_BYTES
+        self.max_document_bytes = settings.SCRAPER_MAX_DOCUMENT_BYTES
+        # Hooks para tipos no HTML: Content-Type -> (estrategia, función de extracción)
+        self.document_extractors: Dict[str, Tuple[str, Callable]] = {
+            "application/pdf": ("pdf", extract_pdf),
+        }
+        self.cache_mode = settings.SCRAPER_CACHE_MODE.lower()  # off | on | only
+        self.page_cache = PageCache()
+        self.dead_hosts = DeadHostCache()
+        self.circuits = CircuitBreaker()
+        self.retry_policy = RetryPolicy()
+        self.latency = LatencyTracker()
+        self.hedging = HedgePolicy()
+        self.warc = WARCWriter()
+        self.redirects = RedirectCache()
+        # Cadena de extracción HTML (ver app/services/strategies.py) y la
+        # estrategia que mejor funciona en cada dominio
+        self.strategies = StrategyRegistry()
+        self.strategy_preferences = DomainStrategyPreferences()
+        self.local_domains = DomainSuffixSet(settings.local_domains_list)
+    
+    async def aclose(self):
+        """Libera el pool de conexiones y el de extracción (llamar al cerrar la aplicación)"""
+        await self.http_pool.aclose()
+        self.extractor.shutdown()
+        self.page_cache.close()
+        self.warc.close()
+        self.redirects.close()
+    
+    def get_stats(self) -> Dict:
+        """Estadísticas del scraper para monitoreo"""
+        return {
+            "connection_pool": self.http_pool.get_stats(),
+            "rate_limiter": self.rate_limiter.get_stats(),
+            "extraction": self.extractor.get_stats(),
+            "page_cache": {"mode": self.cache_mode, **self.page_cache.get_stats()},
+            "dead_hosts": self.dead_hosts.get_stats(),
+            "circuits": self.circuits.get_stats(),
+            "latency": self.latency.summary(),
+            "hedging": self.hedging.get_stats(),
+            "warc": self.warc.get_stats(),
+            "redirects": self.redirects.get_stats(),
+            "strategy_preferences": self.strategy_preferences.get_stats(),
+            "domains": domain_parser.get_stats(),
+        }
+    
+    async def _rate_limit(self, domain: str = ""):
+        """Aplica rate limiting entre peticiones al mismo dominio"""
+        await self.rate_limiter.acquire(domain)
     
-    async def _rate_limit(self):
-        """Aplica rate limiting entre peticiones"""
-        if self.last_request_time is not None:
-            elapsed = datetime.now().timestamp() - self.last_request_time
-            if elapsed < self.delay_between_requests:
-                wait_time = self.delay_between_requests - elapsed
-                logger.debug(f"Rate limiting: esperando {wait_time:.2f}s")
-                await asyncio.sleep(wait_time)
+    @staticmethod
+    def _registered_domain(url: str) -> str:
+        """Dominio registrado (ej: docs.python.org -> python.org)"""
+        return domain_parser.registered_domain(url)
+    
+    async def scrape_many(
+        self,
+        urls: Iterable[str],
+        concurrency: Optional[int] = None,
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Scraping concurrente de muchas URLs, devolviendo resultados según terminan
+        
+        Las URLs se reparten en round-robin por dominio y ningún dominio tiene
+        más de SCRAPER_MAX_CONNECTIONS_PER_HOST URLs en vuelo. Si el consumidor
+        deja de iterar (break, excepción o cancelación) los workers pendientes
+        se cancelan.
+        
+        Args:
+            urls: URLs a scrapear
+            concurrency: Número de workers (defecto: SCRAPER_CONCURRENCY)
         
-        self.last_request_time = datetime.now().timestamp()
+        Yields:
+            Tuple: (url, resultado) con el mismo dict que devuelve scrape_url
+        """
+        # Dominios de todo el lote de una vez (cada host se parsea una sola vez)
+        urls = list(urls)
+        domains = dict(zip(urls, domain_parser.registered_domains(urls)))
+        work = HostFairQueue(
+            urls,
+            key_func=domains.__getitem__,
+            per_host_limit=self.http_pool.max_connections_per_host,
+        )
+        if work.total == 0:
+            return
+        
+        concurrency = concurrency or settings.SCRAPER_CONCURRENCY
+        results: asyncio.Queue = asyncio.Queue()
+        
+        async def worker():
+            while True:
+                item = await work.get()
+                if item is None:
+                    return
+                domain, url = item
+                try:
+                    result = await self.scrape_url(url)
+                except Exception as e:
+                    # scrape_url no debería lanzar, pero un worker caído dejaría
+                    # al consumidor esperando un resultado que nunca llega
+                    result = {
+                        "success": False,
+                        "domain": domain,
+                        "error_type": "unexpected_error",
+                        "error_message": str(e),
+                        "attempts": 0,
+                    }
+                finally:
+                    await work.done(domain)
+                await results.put((url, result))
+        
+        workers = [
+            asyncio.create_task(worker())
+            for _ in range(min(concurrency, work.total))
+        ]
+        logger.info(f"[Scraper] scrape_many: {work.total} URLs con {len(workers)} workers")
+        
+        try:
+            for _ in range(work.total):
+                yield await results.get()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
     
     async def scrape_url(self, url: str) -> Dict:
         """
         Scraping resiliente con múltiples estrategias
         
+        La página se descarga una vez y todas las estrategias de extracción
+        trabajan sobre ese mismo cuerpo; sólo se vuelve a descargar ante fallos
+        de red o bot detection. `strategy_trace` registra qué estrategia se
+        ejecutó sobre qué descarga.
+        
+        Con la caché de páginas activa se revalida la copia local (ETag /
+        Last-Modified) y un 304 reutiliza la extracción guardada. En modo
+        `only` no se usa la red.
+        
+        Cada URL tiene un único presupuesto de reintentos (RetryPolicy): un
+        número total de peticiones y un deadline de SCRAPER_URL_DEADLINE
+        segundos. El tiempo total queda en `elapsed` y en `scraper.latency`.
+        
+        Las redirecciones se recuerdan (RedirectCache): en la siguiente pasada
+        se pide directamente la URL final. `domain` es el de la página final.
+        
         Returns:
-            Dict con: success, text, title, strategy, error_type, attempts, etc.
+            Dict con: success, text, title, final_url, strategy, error_type,
+            attempts, from_cache, elapsed, strategy_trace, etc.
         """
-        result = {
+        started = time.monotonic()
+        result = await self._scrape_url(url)
+        result["elapsed"] = round(time.monotonic() - started, 3)
+        self.latency.record(result["elapsed"], result["success"])
+        return result
+    
+    @staticmethod
+    def _empty_result(trace: list) -> Dict:
+        """Resultado de scrape_url antes de descargar nada"""
+        return {
             "success": False,
             "title": None,
             "text": None,
             "html": None,
             "language": None,
+            "favicon_url": None,
             "word_count": 0,
             "domain": None,
+            "final_url": None,
             "strategy": None,
             "error_type": None,
             "error_message": None,
             "attempts": 0,
+            "content_type": None,
+            "body_truncated": False,
+            "from_cache": None,
+            "retryable": False,
+            "retry_after": None,
+            "strategy_trace": trace,
         }
+    
+    async def _scrape_url(self, url: str) -> Dict:
+        """Cuerpo de scrape_url (ver su docstring)"""
+
+        trace = []
+        result = self._empty_result(trace)
         
         try:
             # Extraer dominio
-            extracted = tldextract.extract(url)
-            result["domain"] = f"{extracted.domain}.{extracted.suffix}"
+            result["domain"] = self._registered_domain(url)
             
             # Verificar si es URL local
             if self._is_local_url(url):
@@ -134,38 +329,104 @@ class ResilientScraper:
                 result["error_message"] = "URL local detectada - requiere captura manual"
                 return result
             
-            # Estrategia 1: Trafilatura con reintentos
-            logger.info(f"[Scraper] Estrategia 1: Trafilatura con reintentos")
-            strategy_result = await self._trafilatura_with_retry(url)
-            result["attempts"] += strategy_result["attempts"]
-            
-            if strategy_result["success"]:
-                result.update(strategy_result)
-                result["strategy"] = "trafilatura_retry"
-                logger.info(f"✅ Scraping exitoso con trafilatura: {url}")
-                return result
+            cached = await self.page_cache.get(url) if self.cache_mode != "off" else None
             
-            # ========== CAMBIO CRÍTICO AQUÍ ==========
-            # Si falla con bot detection O contenido insuficiente, intentar BeautifulSoup
-            if strategy_result.get("error_type") in ["bot_detection", "insufficient_content"]:
-                logger.warning(
-                    f"[Scraper] {strategy_result.get('error_type')} - "
-                    f"Intentando estrategia 2: BeautifulSoup"
+            if self.cache_mode == "only":
+                if cached is None:
+                    result["error_type"] = "cache_miss"
+                    result["error_message"] = "Sin copia en caché (SCRAPER_CACHE_MODE=only)"
+                    return result
+                page = cached
+                result["from_cache"] = "hit"
+                trace.append({"fetch": 0, "strategy": "cache", "outcome": "hit"})
+            else:
+                budget = self.retry_policy.start()
+                conditional = PageCache.conditional_headers(cached)
+                
+                # Acortadores y http -> https: directos a la URL final conocida
+                redirect = await self.redirects.lookup(url) if self.redirects.enabled else None
+                fetch_url = url
+                if redirect is not None:
+                    fetch_url = redirect["final_url"]
+                    result["domain"] = self._registered_domain(fetch_url)
+                    trace.append({
+                        "fetch": 0,
+                        "strategy": "redirect_cache",
+                        "outcome": "hit",
+                        "hops": redirect["hops"],
+                    })
+                
+                page, fetch_status = await self._fetch_page(
+                    fetch_url, result["domain"], trace, conditional, budget
                 )
-                bs_result = await self._beautifulsoup_fallback(url)
-                result["attempts"] += 1
                 
-                if bs_result["success"]:
-                    result.update(bs_result)
-                    result["strategy"] = "beautifulsoup"
-                    logger.info(f"✅ Scraping exitoso con BeautifulSoup: {url}")
+                if (
+                    page is None
+                    and redirect is not None
+                    and fetch_status["error_type"] == "http_error"
+                    and not fetch_status["retryable"]
+                    and budget.can_attempt()
+                ):
+                    # La URL final ya no existe (4xx): se olvida y se sigue la cadena
+                    await self.redirects.invalidate(url)
+                    redirect = None
+                    fetch_url = url
+                    result["domain"] = self._registered_domain(url)
+                    page, fetch_status = await self._fetch_page(
+                        url, result["domain"], trace, conditional, budget
+                    )
+                result["attempts"] = fetch_status["attempts"]
+                
+                if page is not None and page.get("redirect_hops") and self.redirects.enabled:
+                    await self.redirects.record(
+                        url,
+                        page["url"],
+                        page["redirect_hops"] + (redirect["hops"] if redirect else 0),
+                        page["redirect_permanent"],
+                    )
+                
+                if page is None and fetch_status["error_type"] == "circuit_open" and cached is not None:
+                    # El host nos está bloqueando: mejor la copia local que nada
+                    page = cached
+                    result["from_cache"] = "stale"
+                    trace.append({"fetch": 0, "strategy": "cache", "outcome": "stale"})
+                
+                if page is None:
+                    result["error_type"] = fetch_status["error_type"] or "unknown"
+                    result["error_message"] = fetch_status["error_message"] or "No se pudo descargar la página"
+                    result["retryable"] = fetch_status["retryable"]
+                    result["retry_after"] = fetch_status["retry_after"]
+                    logger.error(f"❌ Scraping fallido: {url} - {result['error_type']}")
                     return result
-            # ==========================================
+                
+                if page["status_code"] == 304 and cached is not None:
+                    await self.page_cache.refresh(url, page)
+                    page = cached
+                    result["from_cache"] = "revalidated"
+                elif self.warc.enabled and not result["from_cache"]:
+                    # Respuesta nueva de la red: se archiva en bruto
+                    await self.warc.write(url, page)
+            
+            result["final_url"] = page.get("url") or url
+            if result["final_url"] != url:
+                result["domain"] = self._registered_domain(result["final_url"])
             
-            # Si todas las estrategias fallan
-            result["error_type"] = strategy_result.get("error_type", "unknown")
-            result["error_message"] = strategy_result.get("error_message", "Todas las estrategias fallaron")
-            logger.error(f"❌ Scraping fallido: {url} - {result['error_type']}")
+            extraction = page.get("extraction") if result["from_cache"] else None
+            if extraction is not None:
+                # Mismo cuerpo que la última vez: no hace falta volver a extraer
+                trace.append({
+                    "fetch": result["attempts"],
+                    "strategy": extraction.get("strategy") or "cache",
+                    "outcome": "cached",
+                })
+            else:
+                extraction = await self._extract(page, result["attempts"], trace, result["domain"])
+                
+                # Un timeout de extracción es transitorio: no se guarda
+                if self.cache_mode == "on" and extraction["error_type"] != "extraction_timeout":
+                    await self.page_cache.put(url, page, extraction)
+            
+            self._apply_extraction(url, page, extraction, result)
         
         except Exception as e:
             result["error_type"] = "unexpected_error"
@@ -174,35 +435,101 @@ class ResilientScraper:
         
         return result
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type((httpx.TimeoutException, httpx.ConnectError)),
-        reraise=True
-    )
-    async def _fetch_with_retry(self, url: str, headers: Dict) -> httpx.Response:
-        """Descarga HTML con reintentos automáticos para errores temporales"""
-        # Aplicar rate limiting antes de la petición
-        await self._rate_limit()
+    async def replay(self, url: str, page: Dict) -> Dict:
+        """
+        Etapa de extracción sobre una página archivada (ver app/services/warc.py)
+        
+        No usa la red ni la caché de páginas: sirve para volver a extraer todo
+        el corpus cuando cambia la extracción.
+        
+        Returns:
+            El mismo dict que scrape_url, con from_cache="warc"
+        """
+        trace = [{"fetch": 0, "strategy": "warc", "outcome": "hit"}]
+        result = self._empty_result(trace)
+        result["from_cache"] = "warc"
+        result["final_url"] = page.get("url") or url
         
         try:
-            async with httpx.AsyncClient(
-                timeout=self.timeout,
-                follow_redirects=True,
-                max_redirects=self.max_redirects,
-            ) as client:
-                response = await client.get(url, headers=headers)
-                
-                # Clasificar errores HTTP
-                if response.status_code == 403:
-                    raise BotDetectionError(f"403 Forbidden - Bot detection: {url}")
-                elif response.status_code == 429:
-                    raise RateLimitError(f"429 Too Many Requests: {url}")
-                elif response.status_code >= 500:
-                    raise httpx.HTTPStatusError(f"Server error {response.status_code}", request=response.request, response=response)
-                
-                response.raise_for_status()
-                return response
+            result["domain"] = self._registered_domain(result["final_url"])
+            extraction = await self._extract(page, 0, trace, result["domain"])
+            self._apply_extraction(url, page, extraction, result)
+        except Exception as e:
+            result["error_type"] = "unexpected_error"
+            result["error_message"] = str(e)
+            logger.error(f"❌ Error inesperado re-extrayendo {url}: {e}")
+        
+        return result
+    
+    async def _extract(self, page: Dict, fetch: int, trace: list, domain: str = "") -> Dict:
+        """Extractor propio del Content-Type (PDF) o cadena de extracción HTML"""
+        if page["content_type"] in self.document_extractors:
+            return await self._extract_with_hook(page, fetch, trace)
+        return await self._extract_with_chain(page, fetch, trace, domain)
+    
+    async def learn_strategies(self, db) -> int:
+        """
+        Carga las preferencias de estrategia por dominio desde los bookmarks
+        ya scrapeados (llamar al arrancar la aplicación o un script)
+        
+        Un fallo (tabla sin migrar, DB lenta...) no impide arrancar: se
+        registra y se sigue con la cadena por defecto.
+        
+        Returns:
+            Número de dominios con historial
+        """
+        try:
+            return await self.strategy_preferences.learn_from_bookmarks(
+                db, self._registered_domain, name_of=self.strategies.canonical_name
+            )
+        except Exception as e:
+            await db.rollback()
+            logger.warning(f"No se pudieron cargar las preferencias de extracción: {e}")
+            return 0
+    
+    def _apply_extraction(self, url: str, page: Dict, extraction: Dict, result: Dict):
+        """Vuelca la extracción (o su error) en el resultado de scrape_url"""
+        result["content_type"] = page["content_type"]
+        result["body_truncated"] = page["truncated"]
+        
+        if extraction["success"]:
+            result.update(extraction)
+            if page["content_type"] not in self.document_extractors:
+                result["html"] = self._html_sample(page)
+            logger.info(
+                f"✅ Scraping exitoso con {result['strategy']} "
+                f"(descarga {result['attempts']}): {url}"
+            )
+            return
+        
+        # Si todas las estrategias fallan sobre el cuerpo descargado
+        result["error_type"] = extraction["error_type"] or "unknown"
+        result["error_message"] = extraction["error_message"] or "Todas las estrategias fallaron"
+        logger.error(f"❌ Scraping fallido: {url} - {result['error_type']}")
+    
+    async def _fetch_once(
+        self,
+        url: str,
+        headers: Dict,
+        domain: str = "",
+        timeout: Optional[float] = None,
+        progress: Optional[RequestProgress] = None,
+    ) -> Dict:
+        """
+        Una petición HTTP (los reintentos los decide _fetch_page con su presupuesto)
+        
+        El cuerpo se lee en streaming: el Content-Type se comprueba antes de
+        descargar nada y nunca se guardan más de SCRAPER_MAX_BODY_BYTES.
+        
+        Returns:
+            Dict con: url, status_code, content_type, encoding, content,
+            truncated, etag, last_modified, headers, redirect_hops,
+            redirect_permanent (sin cuerpo si es un 304)
+        """
+        try:
+            # Turno del dominio + slot global, y límite de conexiones por host
+            async with self.rate_limiter.slot(domain), self.http_pool.host_slot(url):
+                return await self._send(url, headers, timeout, progress)
         
         except httpx.TooManyRedirects as e:
             print(f"Error: demasiadas redirecciones ({self.max_redirects}): {url}")
@@ -214,159 +541,517 @@ class ResilientScraper:
             logger.error(f"Timeout en petición a {url}: {e}")
             raise
     
-    async def _trafilatura_with_retry(self, url: str) -> Dict:
-        """Estrategia 1: Trafilatura con reintentos inteligentes"""
-        result = {
-            "success": False,
+    async def _send(
+        self,
+        url: str,
+        headers: Dict,
+        timeout: Optional[float] = None,
+        progress: Optional[RequestProgress] = None,
+    ) -> Dict:
+        """Envía la petición y lee la respuesta (el llamador ya tiene los slots)"""
+        client = self.http_pool.get_client()
+        host = (urlparse(url).hostname or "").lower()
+        request = client.build_request(
+            "GET", url, headers=headers, timeout=timeout or self.timeout
+        )
+        
+        if progress is not None:
+            progress.sent.set()
+        started = time.monotonic()
+        try:
+            response = await client.send(request, stream=True)
+        except asyncio.CancelledError:
+            # Petición adelantada por un hedge: su espera cuenta como muestra
+            # (si no, el percentil del host sólo vería las respuestas rápidas)
+            self.hedging.record(host, time.monotonic() - started)
+            raise
+        finally:
+            if progress is not None:
+                progress.headers.set()
+        self.hedging.record(host, time.monotonic() - started)
+        
+        try:
+            # Clasificar errores HTTP
+            if response.status_code == 403:
+                raise BotDetectionError(f"403 Forbidden - Bot detection: {url}")
+            elif response.status_code == 429:
+                raise RateLimitError(
+                    f"429 Too Many Requests: {url}",
+                    parse_retry_after(response.headers.get("retry-after")),
+                )
+            elif response.status_code >= 500:
+                raise httpx.HTTPStatusError(f"Server error {response.status_code}", request=response.request, response=response)
+            elif response.status_code == 304:
+                # Revalidación de la caché: el cuerpo no ha cambiado
+                return self._page_info(response, b"", False, str(response.url))
+            
+            response.raise_for_status()
+            return await self._read_body(response, str(response.url))
+        finally:
+            # Devuelve la conexión al pool aunque no se lea el cuerpo
+            await response.aclose()
+    
+    async def _fetch_hedge(
+        self, url: str, headers: Dict, domain: str, timeout: float
+    ) -> Optional[Dict]:
+        """
+        Segunda petición de un hedge: sólo si el host y el dominio tienen
+        capacidad libre sin esperar
+        
+        Returns:
+            Página descargada, o None si no había capacidad
+        """
+        async with self.http_pool.try_host_slot(url) as host_free:
+            if not host_free:
+                self.hedging.skipped()
+                return None
+            async with self.rate_limiter.try_slot(domain) as domain_free:
+                if not domain_free:
+                    self.hedging.skipped()
+                    return None
+                self.hedging.hedged()
+                logger.info(f"  Hedge: segunda petición a {url}")
+                return await self._send(url, headers, timeout)
+    
+    async def _fetch_hedged(
+        self, url: str, headers: Dict, domain: str = "", timeout: Optional[float] = None
+    ) -> Dict:
+        """
+        _fetch_once con hedging (SCRAPER_HEDGING)
+        
+        Si la petición no recibe headers en el umbral adaptativo de su host
+        (HedgePolicy), se lanza otra con otro juego de headers y gana la
+        primera que termine bien; la otra se cancela. Sin umbral (hedging
+        desactivado o host sin historial) es exactamente _fetch_once.
+        
+        Returns:
+            El mismo dict que _fetch_once, con `hedge` ("won"/"lost") si hubo
+            segunda petición
+        """
+        timeout = timeout or self.timeout
+        host = (urlparse(url).hostname or "").lower()
+        delay = self.hedging.delay(host)
+        if delay is None or delay >= timeout:
+            return await self._fetch_once(url, headers, domain, timeout)
+        
+        progress = RequestProgress()
+        primary = asyncio.create_task(self._fetch_once(url, headers, domain, timeout, progress))
+        hedge = None
+        try:
+            if await progress.headers_within(primary, delay):
+                return await primary
+            
+            # Mismos headers condicionales, otro User-Agent
+            hedge_headers = {**headers, **self.user_agent_rotator.get_realistic_headers()}
+            hedge_headers["User-Agent"] = random.choice([
+                agent for agent in self.user_agent_rotator.AGENTS
+                if agent != headers.get("User-Agent")
+            ] or self.user_agent_rotator.AGENTS)
+            hedge = asyncio.create_task(
+                self._fetch_hedge(url, hedge_headers, domain, max(timeout - delay, 0.1))
+            )
+            
+            pending = {primary, hedge}
+            errors = {}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        errors[task] = task.exception()
+                        continue
+                    page = task.result()
+                    if page is None:
+                        hedge = None  # sin capacidad: sólo queda la original
+                        continue
+                    if hedge is None:
+                        return page
+                    if task is hedge:
+                        self.hedging.won()
+                    page["hedge"] = "won" if task is hedge else "lost"
+                    return page
+            raise errors.get(primary) or errors[hedge]
+        finally:
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+            await asyncio.gather(
+                *(task for task in (primary, hedge) if task is not None),
+                return_exceptions=True,
+            )
+    
+    async def _read_body(self, response: httpx.Response, url: str = "") -> Dict:
+        """
+        Lee el cuerpo en streaming respetando el tipo de contenido y el límite
+        
+        `url` es la URL final de la respuesta (tras redirecciones); se pasa
+        aparte porque `response.url` falla si la respuesta no lleva request.
+        
+        - HTML (o sin Content-Type): se corta en SCRAPER_MAX_BODY_BYTES
+        - Tipos con extractor propio (PDF): se descartan si superan
+          SCRAPER_MAX_DOCUMENT_BYTES
+        - Cualquier otro tipo: se descarta sin leer el cuerpo
+        
+        Raises:
+            ContentRejectedError: non_html_content o content_too_large
+        """
+        content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+        
+        if not content_type or content_type in self.HTML_CONTENT_TYPES:
+            limit, truncate = self.max_body_bytes, True
+        elif content_type in self.document_extractors:
+            limit, truncate = self.max_document_bytes, False
+        else:
+            raise ContentRejectedError(
+                "non_html_content", f"Content-Type no soportado: {content_type}"
+            )
+        
+        declared = response.headers.get("content-length", "")
+        if not truncate and declared.isdigit() and int(declared) > limit:
+            raise ContentRejectedError(
+                "content_too_large", f"{content_type} de {declared} bytes (límite {limit})"
+            )
+        
+        chunks = []
+        size = 0
+        truncated = False
+        async for chunk in response.aiter_bytes():
+            if size + len(chunk) > limit:
+                if not truncate:
+                    raise ContentRejectedError(
+                        "content_too_large", f"{content_type} supera {limit} bytes"
+                    )
+                chunks.append(chunk[:limit - size])
+                size = limit
+                truncated = True
+                break
+            chunks.append(chunk)
+            size += len(chunk)
+        
+        if truncated:
+            logger.info(f"  Cuerpo truncado a {limit} bytes: {url}")
+        
+        return self._page_info(response, b"".join(chunks), truncated, url)
+    
+    @staticmethod
+    def _page_info(response: httpx.Response, content: bytes, truncated: bool, url: str = "") -> Dict:
+        """Página descargada: lo que necesitan la extracción y la caché"""
+        content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+        return {
+            "url": url,
+            "status_code": response.status_code,
+            "content_type": content_type or None,
+            "encoding": response.charset_encoding,
+            "content": content,
+            "truncated": truncated,
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "headers": response.headers.multi_items(),
+            "redirect_hops": len(response.history),
+            "redirect_permanent": all(r.status_code in (301, 308) for r in response.history),
+        }
+    
+    def _classify_fetch_error(self, error: Exception) -> Tuple[str, str, bool]:
+        """
+        Clasifica un fallo de descarga
+        
+        Returns:
+            Tuple: (error_type, mensaje, si merece volver a descargar)
+        """
+        if isinstance(error, ContentRejectedError):
+            return error.error_type, str(error), False
+        if isinstance(error, BotDetectionError):
+            return "bot_detection", str(error), True
+        if isinstance(error, RateLimitError):
+            return "rate_limited", str(error), True
+        dns = dns_failure(error)
+        if dns is not None:
+            # NXDOMAIN no cambia por reintentar; un fallo temporal del resolver sí
+            return "dns_error", str(error), dns == "transient"
+        if _is_tls_failure(error):
+            return "ssl_error", str(error), False
+        if isinstance(error, httpx.TooManyRedirects):
+            return "too_many_redirects", str(error), False
+        if isinstance(error, httpx.TimeoutException):
+            return "timeout", f"Timeout después de {self.timeout}s", True
+        if isinstance(error, asyncio.TimeoutError):
+            # asyncio.timeout del intento: se agotó SCRAPER_URL_DEADLINE
+            return "timeout", f"Deadline de la URL ({self.retry_policy.deadline}s) agotado", True
+        if isinstance(error, httpx.ConnectError):
+            return "connection_refused", "No se pudo conectar al servidor", True
+        if isinstance(error, httpx.HTTPStatusError):
+            status = error.response.status_code
+            # Un 5xx puede ser transitorio; un 404 no cambia por volver a pedirlo
+            return "http_error", f"HTTP {status}", status >= 500
+        if isinstance(error, httpx.TransportError):
+            return "network_error", str(error), True
+        return "unknown", str(error), False
+    
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        """Segundos de Retry-After de un 429 o un 5xx (None si no lo enviaron)"""
+        if isinstance(error, RateLimitError):
+            return error.retry_after
+        if isinstance(error, httpx.HTTPStatusError):
+            return parse_retry_after(error.response.headers.get("retry-after"))
+        return None
+    
+    async def _fetch_page(
+        self,
+        url: str,
+        domain: str,
+        trace: list,
+        extra_headers: Optional[Dict] = None,
+        budget: Optional[RetryBudget] = None,
+    ) -> Tuple[Optional[Dict], Dict]:
+        """
+        Descarga la página, repitiendo sólo ante fallos de red o bot detection
+        
+        Con bot detection se vuelve a intentar una única vez con otros headers;
+        el resto de fallos de red se reintentan mientras quede presupuesto
+        (SCRAPER_MAX_RETRIES peticiones y SCRAPER_URL_DEADLINE segundos), con
+        backoff exponencial con jitter entre intentos.
+        `extra_headers` lleva los headers condicionales de la caché.
+        
+        Los hosts que no resuelven o rechazan todas las conexiones se guardan
+        en la caché negativa y fallan al instante hasta que pase el cool-down.
+        Cada intento alimenta el circuit breaker del dominio; con el circuito
+        abierto no se hace la petición (`circuit_open`) ni se siguen gastando
+        reintentos y esperas.
+        
+        Un 429, o un Retry-After mayor que SCRAPER_RETRY_BACKOFF_MAX, no se
+        espera aquí: se devuelve al momento con `retryable` y `retry_after`
+        para que el bookmark se reprograme y el worker pase a otra URL.
+        
+        Returns:
+            Tuple: (página descargada o None, {attempts, error_type,
+            error_message, retryable, retry_after})
+        """
+        status = {
             "attempts": 0,
             "error_type": None,
             "error_message": None,
+            "retryable": False,
+            "retry_after": None,
         }
+        budget = budget or self.retry_policy.start()
+        bot_detections = 0
+        host = (urlparse(url).hostname or "").lower()
         
-        for attempt in range(1, self.max_retries + 1):
-            result["attempts"] = attempt
+        dead = self.dead_hosts.check(host)
+        if dead is not None:
+            until = datetime.fromtimestamp(dead["until"]).strftime("%Y-%m-%d %H:%M")
+            status["error_type"] = dead["error_type"]
+            status["error_message"] = f"{dead['message']} (host en caché negativa hasta {until})"
+            trace.append({"fetch": 0, "strategy": "fetch", "outcome": "dead_host"})
+            logger.info(f"  Host caído en caché, sin descargar: {host}")
+            return None, status
+        
+        while budget.can_attempt():
+            if not self.circuits.allow(domain):
+                if budget.attempts == 0:
+                    circuit = self.circuits.status(domain)
+                    status["error_type"] = "circuit_open"
+                    status["error_message"] = (
+                        f"Circuito abierto para {domain} ({circuit['last_error_type']}), "
+                        f"reintento en {circuit['retry_in_seconds'] or 0}s"
+                    )
+                    status["retryable"] = True
+                    status["retry_after"] = circuit["retry_in_seconds"]
+                    trace.append({"fetch": 0, "strategy": "fetch", "outcome": "circuit_open"})
+                    logger.info(f"  Circuito abierto, sin descargar: {url}")
+                # Si se abrió durante estos intentos se conserva el último error
+                break
+            
+            attempt = budget.next_attempt()
+            status["attempts"] = attempt
             
             try:
-                logger.info(f"  Intento {attempt}/{self.max_retries}: Descargando {url}")
+                logger.info(f"  Descarga {attempt}/{budget.max_attempts}: {url}")
                 
-                # Rotar headers en cada intento
+                # Rotar headers en cada descarga
                 headers = self.user_agent_rotator.get_realistic_headers()
+                headers.update(extra_headers or {})
+                async with asyncio.timeout(budget.attempt_limit()):
+                    page = await self._fetch_hedged(url, headers, domain, budget.attempt_timeout())
                 
-                # Descargar con reintentos
-                response = await self._fetch_with_retry(url, headers)
-                html = response.text
-                
-                # Extraer contenido con Trafilatura
-                text = trafilatura.extract(
-                    html,
-                    include_comments=False,
-                    include_tables=True,
-                    no_fallback=False,
+                step = {
+                    "fetch": attempt,
+                    "strategy": "fetch",
+                    "outcome": "not_modified" if page["status_code"] == 304 else "ok",
+                    "status_code": page["status_code"],
+                    "bytes": len(page["content"]),
+                }
+                if page.get("hedge"):
+                    step["hedge"] = page["hedge"]
+                trace.append(step)
+                self.dead_hosts.clear(host)
+                self.circuits.record(domain)
+                return page, status
+            
+            except Exception as e:
+                error_type, message, refetch = self._classify_fetch_error(e)
+                retry_after = self._retry_after(e)
+                status["error_type"] = error_type
+                status["error_message"] = message
+                status["retryable"] = error_type in self.REQUEUE_ERROR_TYPES and (
+                    error_type != "http_error" or refetch
                 )
+                status["retry_after"] = retry_after
+                trace.append({"fetch": attempt, "strategy": "fetch", "outcome": error_type})
+                logger.warning(f"  {error_type} en descarga {attempt}: {message}")
+                self.circuits.record(domain, error_type)
                 
-                # Extraer metadata
-                metadata = trafilatura.extract_metadata(html)
+                if error_type == "bot_detection":
+                    bot_detections += 1
+                    # Una segunda descarga con otro User-Agent; más sólo insiste
+                    refetch = bot_detections < 2
                 
-                if text and len(text.strip()) > 50:
-                    result["success"] = True
-                    result["text"] = text
-                    result["html"] = html[:10000]  # Limitar tamaño
-                    result["word_count"] = len(text.split())
-                    
-                    if metadata:
-                        result["title"] = metadata.title
-                        result["language"] = metadata.language
-                    
-                    return result
-                else:
-                    logger.warning(f"  Texto extraído muy corto ({len(text) if text else 0} chars)")
-                    result["error_type"] = "insufficient_content"
-                    result["error_message"] = "Contenido extraído insuficiente"
-            
-            except BotDetectionError as e:
-                result["error_type"] = "bot_detection"
-                result["error_message"] = str(e)
-                logger.warning(f"  Bot detection detectado en intento {attempt}")
-                # No reintentar si es bot detection - pasar a siguiente estrategia
-                break
-            
-            except RateLimitError as e:
-                result["error_type"] = "rate_limited"
-                result["error_message"] = str(e)
-                logger.warning(f"  Rate limited en intento {attempt}")
-                # Esperar más tiempo antes de siguiente intento
-                if attempt < self.max_retries:
-                    import asyncio
-                    await asyncio.sleep(10 * attempt)
-            
-            except httpx.TimeoutException as e:
-                result["error_type"] = "timeout"
-                result["error_message"] = f"Timeout después de {self.timeout}s"
-                logger.warning(f"  Timeout en intento {attempt}")
-            
-            except httpx.ConnectError as e:
-                result["error_type"] = "connection_refused"
-                result["error_message"] = "No se pudo conectar al servidor"
-                logger.warning(f"  Connection refused en intento {attempt}")
-            
-            except httpx.HTTPStatusError as e:
-                result["error_type"] = "http_error"
-                result["error_message"] = f"HTTP {e.response.status_code}"
-                logger.warning(f"  HTTP error {e.response.status_code} en intento {attempt}")
-            
-            except Exception as e:
-                result["error_type"] = "unknown"
-                result["error_message"] = str(e)
-                logger.error(f"  Error inesperado en intento {attempt}: {e}")
+                if error_type == "dns_error" and not refetch:
+                    self.dead_hosts.mark(host, error_type, message)
+                
+                if error_type == "rate_limited" or (
+                    retry_after is not None and retry_after > budget.backoff_max
+                ):
+                    # El servidor pide esperar: se reprograma en vez de dormir aquí
+                    trace.append({"fetch": attempt, "strategy": "fetch", "outcome": "deferred"})
+                    refetch = False
+                
+                if not refetch:
+                    break
+                
+                delay = budget.backoff(attempt)
+                if delay is None:
+                    if budget.attempts < budget.max_attempts:
+                        trace.append({"fetch": attempt, "strategy": "fetch", "outcome": "deadline"})
+                        logger.warning(f"  Deadline de {url} agotado tras {budget.elapsed():.1f}s")
+                    break
+                await asyncio.sleep(delay)
         
-        return result
+        if status["error_type"] == "connection_refused" and budget.attempts >= budget.max_attempts:
+            # Ningún intento pudo conectar: no insistir en las próximas pasadas
+            self.dead_hosts.mark(host, "connection_refused", status["error_message"])
+        
+        return None, status
     
-    async def _beautifulsoup_fallback(self, url: str) -> Dict:
-        """Estrategia 2: BeautifulSoup básico (menos detectable)"""
-        try:
-            from bs4 import BeautifulSoup
-            
-            # Aplicar rate limiting
-            await self._rate_limit()
-            
-            headers = self.user_agent_rotator.get_realistic_headers()
-            
-            async with httpx.AsyncClient(
-                timeout=self.timeout,
-                follow_redirects=True,
-                max_redirects=self.max_redirects
-            ) as client:
-                response = await client.get(url, headers=headers)
-                response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'lxml')
+    async def _extract_with_chain(self, page: Dict, fetch: int, trace: list, domain: str = "") -> Dict:
+        """
+        Aplica la cadena de estrategias sobre un mismo cuerpo descargado
+        
+        Un solo parseo (extract_document) produce tanto el texto de Trafilatura
+        como el texto visible, así que pasar a la siguiente estrategia no
+        cuesta ni red ni un segundo parseo. Si el dominio prefiere una
+        estrategia sin Trafilatura, el primer parseo se hace sin él y sólo se
+        repite con Trafilatura si esa estrategia no saca texto.
+        """
+        outcome = {"success": False, "error_type": None, "error_message": None}
+        content = page["content"]
+        encoding = page["encoding"]
+        final_url = page["url"]
+        
+        preferred = self.strategy_preferences.preferred(domain)
+        plan = self.strategies.plan(preferred)
+        if preferred is not None and plan[0].name == preferred:
+            trace.append({"fetch": fetch, "strategy": preferred, "outcome": "preferred"})
+        
+        document = None
+        parsed_main_content = False
+        main_content_timed_out = False
+        
+        for strategy in plan:
+            if strategy.main_content and main_content_timed_out:
+                continue
             
-            # Eliminar scripts y styles
-            for script in soup(["script", "style"]):
-                script.decompose()
+            if document is None or (strategy.main_content and not parsed_main_content):
+                try:
+                    document = await self.extractor.run(
+                        extract_document, content, encoding, final_url, strategy.main_content
+                    )
+                    parsed_main_content = strategy.main_content
+                except ExtractionTimeoutError as e:
+                    outcome["error_type"] = "extraction_timeout"
+                    outcome["error_message"] = str(e)
+                    trace.append({"fetch": fetch, "strategy": strategy.name, "outcome": "extraction_timeout"})
+                    if not strategy.main_content:
+                        # Ni siquiera el parseo barato termina: no queda nada que probar
+                        return outcome
+                    # Sin Trafilatura el parseo es mucho más barato: quedan las demás
+                    main_content_timed_out = True
+                    continue
             
-            # Extraer texto
-            text = soup.get_text(separator=' ', strip=True)
-            title = soup.find('title').text if soup.find('title') else ""
+            text = (document.get(strategy.field) or "").strip()
+            if len(text) <= strategy.min_chars:
+                logger.warning(f"  {strategy.name}: texto extraído muy corto ({len(text)} chars)")
+                trace.append({
+                    "fetch": fetch,
+                    "strategy": strategy.name,
+                    "outcome": "insufficient_content",
+                    "chars": len(text),
+                })
+                continue
             
-            # Limpiar texto
-            lines = (line.strip() for line in text.splitlines())
-            text = '\n'.join(line for line in lines if line)
+            if strategy.max_chars:
+                text = text[:strategy.max_chars]  # Limitar
             
-            return {
+            trace.append({"fetch": fetch, "strategy": strategy.name, "outcome": "ok", "chars": len(text)})
+            if strategy.min_chars > 0 or strategy.name != preferred:
+                # Sin umbral de calidad siempre "funciona": como preferida no
+                # demuestra nada y se quedaría fija en el dominio
+                self.strategy_preferences.record(domain, strategy.name)
+            outcome.update({
                 "success": True,
-                "text": text[:10000],  # Limitar
-                "title": title,
-                "html": response.text[:10000],
+                "strategy": strategy.name,
+                "text": text,
                 "word_count": len(text.split()),
-            }
+                "title": document["title"],
+                "language": document["language"],
+                "favicon_url": document["favicon_url"],
+                "error_type": None,
+                "error_message": None,
+            })
+            return outcome
         
-        except httpx.TooManyRedirects as e:
-            print(f"Error: demasiadas redirecciones en BeautifulSoup fallback: {url}")
-            logger.error(f"Demasiadas redirecciones en BeautifulSoup fallback: {e}")
-            return {
-                "success": False,
-                "error_type": "too_many_redirects",
-                "error_message": str(e),
-            }
+        if outcome["error_type"] is None:
+            outcome["error_type"] = "insufficient_content"
+            outcome["error_message"] = "Contenido extraído insuficiente"
+        return outcome
+    
+    async def _extract_with_hook(self, page: Dict, fetch: int, trace: list) -> Dict:
+        """Extracción de tipos no HTML (PDF, ...) con su extractor registrado"""
+        strategy, extract = self.document_extractors[page["content_type"]]
+        outcome = {"success": False, "error_type": None, "error_message": None}
         
-        except httpx.TimeoutException as e:
-            print(f"Error: timeout en BeautifulSoup fallback: {url}")
-            logger.error(f"Timeout en BeautifulSoup fallback: {e}")
-            return {
-                "success": False,
-                "error_type": "timeout",
-                "error_message": str(e),
-            }
+        try:
+            document = await self.extractor.run(extract, page["content"])
+        except ExtractionTimeoutError as e:
+            trace.append({"fetch": fetch, "strategy": strategy, "outcome": "extraction_timeout"})
+            outcome["error_type"] = "extraction_timeout"
+            outcome["error_message"] = str(e)
+            return outcome
         
-        except Exception as e:
-            print(f"Error en BeautifulSoup fallback: {e}")
-            logger.error(f"Error en BeautifulSoup fallback: {e}")
-            return {
-                "success": False,
-                "error_type": "beautifulsoup_failed",
-                "error_message": str(e),
-            }
+        text = (document.get("text") or "").strip()
+        if len(text) <= 50:
+            trace.append({"fetch": fetch, "strategy": strategy, "outcome": "insufficient_content", "chars": len(text)})
+            outcome["error_type"] = "insufficient_content"
+            outcome["error_message"] = f"Sin texto extraíble ({page['content_type']})"
+            return outcome
+        
+        text = text[:10000]  # Limitar
+        trace.append({"fetch": fetch, "strategy": strategy, "outcome": "ok", "chars": len(text)})
+        outcome.update({
+            "success": True,
+            "strategy": strategy,
+            "text": text,
+            "word_count": len(text.split()),
+            "title": document.get("title"),
+            "language": document.get("language"),
+            "favicon_url": document.get("favicon_url"),
+        })
+        return outcome
+    
+    @staticmethod
+    def _html_sample(page: Dict, limit: int = 10000) -> str:
+        """Primeros caracteres del HTML sin decodificar el cuerpo completo"""
+        return decode_html(page["content"][:limit], page["encoding"])
     
     def _is_local_url(self, url: str) -> bool:
         """Verifica si la URL es local (.test, .local, localhost, etc.)"""
@@ -374,12 +1059,8 @@ class ResilientScraper:
             parsed = urlparse(url.lower())
             hostname = parsed.hostname or parsed.netloc
             
-            # Verificar contra dominios locales configurados
-            for local_domain in settings.local_domains_list:
-                if local_domain in hostname:
-                    return True
-            
-            return False
+            # Dominios locales configurados (sufijo de host, prefijo de IP o red)
+            return self.local_domains.match(hostname) is not None
         
         except Exception as e:
             logger.warning(f"Error verificando URL local {url}: {e}")
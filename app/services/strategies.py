@@ -0,0 +1,220 @@
+# app/services/strategies.py - Registro de estrategias de extracción y preferencias por dominio
+
+import random
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class ExtractionStrategy:
+    """
+    Estrategia de extracción HTML sobre el resultado de extract_document
+
+    Attributes:
+        name: Nombre guardado en Bookmark.scraping_strategy
+        field: Campo de extract_document con el texto
+        cost: Coste relativo de CPU (sólo informativo: el orden es el de registro)
+        main_content: Necesita Trafilatura (el parseo caro); si ninguna
+            estrategia del plan lo necesita, se parsea sin Trafilatura
+        min_chars: Texto igual o más corto se considera insuficiente
+        max_chars: Límite de texto guardado (None = sin límite)
+        aliases: Nombres antiguos en Bookmark.scraping_strategy
+    """
+    name: str
+    field: str
+    cost: float
+    main_content: bool
+    min_chars: int = 0
+    max_chars: Optional[int] = None
+    aliases: Tuple[str, ...] = ()
+
+
+# Orden por defecto: la mejor calidad primero
+DEFAULT_STRATEGIES = (
+    ExtractionStrategy("trafilatura_retry", "text", cost=10.0, main_content=True, min_chars=50),
+    # Antes del registro de estrategias el fallback se guardaba como "beautifulsoup"
+    ExtractionStrategy(
+        "html_text", "fallback_text", cost=1.0, main_content=False, max_chars=10000,
+        aliases=("beautifulsoup",),
+    ),
+)
+
+
+class StrategyRegistry:
+    """
+    Estrategias de extracción HTML disponibles, en orden de preferencia.
+
+    `plan(preferred)` devuelve el orden a probar para una página: la
+    estrategia preferida del dominio (si la hay) primero y el resto en el
+    orden de registro.
+    """
+
+    def __init__(self, strategies: Iterable[ExtractionStrategy] = DEFAULT_STRATEGIES):
+        self._strategies: Dict[str, ExtractionStrategy] = {}
+        self._aliases: Dict[str, str] = {}
+        for strategy in strategies:
+            self.register(strategy)
+
+    def register(self, strategy: ExtractionStrategy, before: Optional[str] = None):
+        """Añade (o reemplaza) una estrategia; por defecto al final de la cadena"""
+        self._strategies.pop(strategy.name, None)
+        for alias in strategy.aliases:
+            self._aliases[alias] = strategy.name
+        if before is None or before not in self._strategies:
+            self._strategies[strategy.name] = strategy
+            return
+        items = list(self._strategies.items())
+        index = [name for name, _ in items].index(before)
+        items.insert(index, (strategy.name, strategy))
+        self._strategies = dict(items)
+
+    def canonical_name(self, name: str) -> str:
+        """Nombre actual de una estrategia (resuelve los alias antiguos)"""
+        return self._aliases.get(name, name)
+
+    def get(self, name: str) -> Optional[ExtractionStrategy]:
+        return self._strategies.get(self.canonical_name(name))
+
+    def __iter__(self) -> Iterator[ExtractionStrategy]:
+        return iter(list(self._strategies.values()))
+
+    def plan(self, preferred: Optional[str] = None) -> List[ExtractionStrategy]:
+        """Estrategias en el orden a probar"""
+        order = list(self._strategies.values())
+        first = self.get(preferred) if preferred else None
+        if first is not None:
+            order.remove(first)
+            order.insert(0, first)
+        return order
+
+
+class DomainStrategyPreferences:
+    """
+    Estrategia que suele funcionar en cada dominio, aprendida de los éxitos.
+
+    Guarda la estrategia ganadora de las últimas extracciones de cada dominio.
+    Con SCRAPER_STRATEGY_MIN_SAMPLES éxitos y una estrategia que gana al
+    menos SCRAPER_STRATEGY_MIN_SHARE de las veces, el scraper la prueba
+    primero: en un dominio donde Trafilatura nunca saca texto se parsea sin
+    Trafilatura directamente.
+
+    Una fracción SCRAPER_STRATEGY_EXPLORE_RATE de las extracciones ignora la
+    preferencia y recorre la cadena completa, para que el dominio pueda
+    volver a la estrategia cara si la página cambia.
+    """
+
+    def __init__(self, window: int = 50):
+        self.enabled = settings.SCRAPER_STRATEGY_LEARNING
+        self.min_samples = settings.SCRAPER_STRATEGY_MIN_SAMPLES
+        self.min_share = settings.SCRAPER_STRATEGY_MIN_SHARE
+        self.explore_rate = settings.SCRAPER_STRATEGY_EXPLORE_RATE
+        self.window = window
+        self._history: Dict[str, Deque[str]] = {}
+
+        self._preferred = 0
+        self._explored = 0
+
+    def record(self, domain: str, strategy: str):
+        """Estrategia que extrajo texto en una página del dominio"""
+        if not self.enabled or not domain or not strategy:
+            return
+        history = self._history.get(domain)
+        if history is None:
+            history = deque(maxlen=self.window)
+            self._history[domain] = history
+        history.append(strategy)
+
+    def preferred(self, domain: str) -> Optional[str]:
+        """
+        Estrategia a probar primero en el dominio
+
+        Returns:
+            Nombre de la estrategia dominante, o None (cadena por defecto) si
+            no hay historial suficiente o toca explorar
+        """
+        if not self.enabled:
+            return None
+        history = self._history.get(domain)
+        if not history or len(history) < self.min_samples:
+            return None
+        strategy, wins = Counter(history).most_common(1)[0]
+        if wins / len(history) < self.min_share:
+            return None
+        if random.random() < self.explore_rate:
+            self._explored += 1
+            return None
+        self._preferred += 1
+        return strategy
+
+    def seed(self, outcomes: Iterable[Tuple[str, str]]) -> int:
+        """
+        Carga éxitos pasados (dominio, estrategia), del más antiguo al más nuevo
+
+        Returns:
+            Número de dominios con historial
+        """
+        for domain, strategy in outcomes:
+            self.record(domain, strategy)
+        return len(self._history)
+
+    async def learn_from_bookmarks(
+        self,
+        db,
+        domain_of: Callable[[str], str],
+        limit: int = 50000,
+        name_of: Callable[[str], str] = lambda name: name,
+    ) -> int:
+        """
+        Aprende de Bookmark.scraping_strategy de los scrapings con éxito
+
+        Args:
+            db: Sesión async de SQLAlchemy
+            domain_of: URL -> dominio registrado (el del scraper)
+            limit: Máximo de bookmarks recientes a leer
+            name_of: Nombre guardado -> nombre actual de la estrategia
+                (StrategyRegistry.canonical_name: "beautifulsoup" -> "html_text")
+
+        Returns:
+            Número de dominios con historial
+        """
+        if not self.enabled:
+            return 0
+
+        from sqlalchemy import select
+        from app.models import Bookmark
+
+        result = await db.execute(
+            select(Bookmark.url, Bookmark.scraping_strategy)
+            .where(
+                Bookmark.scraping_status == "success",
+                Bookmark.scraping_strategy.isnot(None),
+            )
+            .order_by(Bookmark.scraped_at.desc().nullslast())
+            .limit(limit)
+        )
+        rows = result.all()
+        # La consulta trae los más recientes primero; el historial va en orden
+        domains = self.seed((domain_of(url), name_of(strategy)) for url, strategy in reversed(rows))
+        logger.info(f"Preferencias de extracción: {len(rows)} éxitos, {domains} dominios")
+        return domains
+
+    def get_stats(self) -> Dict:
+        learned = sum(
+            1 for history in self._history.values()
+            if len(history) >= self.min_samples
+            and Counter(history).most_common(1)[0][1] / len(history) >= self.min_share
+        )
+        return {
+            "enabled": self.enabled,
+            "domains_tracked": len(self._history),
+            "domains_with_preference": learned,
+            "preferred_used": self._preferred,
+            "explored": self._explored,
+        }
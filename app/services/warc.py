@@ -0,0 +1,234 @@
+# app/services/warc.py - Archivo WARC de las respuestas descargadas
+
+import asyncio
+import base64
+import gzip
+import hashlib
+import threading
+import uuid
+from datetime import datetime, timezone
+from http import HTTPStatus
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Headers que describen la transferencia, no el cuerpo que se guarda
+# (httpx ya lo ha descomprimido y des-chunkeado)
+_TRANSFER_HEADERS = {"content-encoding", "transfer-encoding", "content-length", "connection"}
+
+
+def _warc_date() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _record(warc_headers: List[Tuple[str, str]], block: bytes) -> bytes:
+    """Registro WARC/1.1 completo (cabecera + bloque + separador)"""
+    lines = ["WARC/1.1"]
+    lines += [f"{name}: {value}" for name, value in warc_headers]
+    lines.append(f"Content-Length: {len(block)}")
+    head = ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8")
+    return head + block + b"\r\n\r\n"
+
+
+def _http_block(page: Dict) -> bytes:
+    """Respuesta HTTP reconstruida: línea de estado, headers y cuerpo"""
+    status = page.get("status_code") or 200
+    try:
+        reason = HTTPStatus(status).phrase
+    except ValueError:
+        reason = ""
+    lines = [f"HTTP/1.1 {status} {reason}".rstrip()]
+    headers = page.get("headers") or []
+    if not headers and page.get("content_type"):
+        charset = f"; charset={page['encoding']}" if page.get("encoding") else ""
+        headers = [("content-type", page["content_type"] + charset)]
+    lines += [f"{name}: {value}" for name, value in headers if name.lower() not in _TRANSFER_HEADERS]
+    lines.append(f"Content-Length: {len(page['content'])}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8", "replace") + page["content"]
+
+
+class WARCWriter:
+    """
+    Archivo append-only de las respuestas en bruto (formato WARC/1.1).
+
+    Cada respuesta descargada de la red se guarda con sus headers en un
+    registro `response` comprimido con gzip por separado (.warc.gz estándar,
+    legible con warcio o wget). Los ficheros rotan al superar
+    SCRAPER_WARC_MAX_FILE_BYTES. `read_archive` las devuelve con el mismo
+    formato de página que el fetcher para volver a extraer sin red.
+
+    Opt-in con SCRAPER_WARC_ENABLED. La escritura va en un thread, como la
+    caché de páginas.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_file_bytes: Optional[int] = None):
+        self.enabled = settings.SCRAPER_WARC_ENABLED
+        self.directory = Path(directory or settings.SCRAPER_WARC_DIR)
+        self.max_file_bytes = (
+            settings.SCRAPER_WARC_MAX_FILE_BYTES if max_file_bytes is None else max_file_bytes
+        )
+
+        self._file: Optional[BinaryIO] = None
+        self._path: Optional[Path] = None
+        self._lock = threading.Lock()
+
+        self._records = 0
+        self._bytes = 0
+        self._files = 0
+
+    async def write(self, url: str, page: Dict):
+        """Archiva una página descargada (url = la del bookmark)"""
+        await asyncio.to_thread(self._write, url, page)
+
+    def _write(self, url: str, page: Dict):
+        block = _http_block(page)
+        digest = base64.b32encode(hashlib.sha1(page["content"]).digest()).decode("ascii")
+        headers = [
+            ("WARC-Type", "response"),
+            ("WARC-Record-ID", f"<urn:uuid:{uuid.uuid4()}>"),
+            ("WARC-Date", _warc_date()),
+            ("WARC-Target-URI", page.get("url") or url),
+            ("WARC-Payload-Digest", f"sha1:{digest}"),
+            ("Content-Type", "application/http; msgtype=response"),
+        ]
+        if page.get("truncated"):
+            headers.append(("WARC-Truncated", "length"))
+        if page.get("url") and page["url"] != url:
+            # URL del bookmark antes de redirecciones (campo de extensión)
+            headers.append(("X-Bookmark-URL", url))
+        data = gzip.compress(_record(headers, block), compresslevel=6)
+
+        with self._lock:
+            handle = self._open()
+            handle.write(data)
+            handle.flush()
+            self._records += 1
+            self._bytes += len(data)
+
+    def _open(self) -> BinaryIO:
+        """Fichero actual; rota si ha superado el tamaño máximo"""
+        if self._file is not None and self.max_file_bytes and self._file.tell() >= self.max_file_bytes:
+            self._file.close()
+            self._file = None
+
+        if self._file is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+            self._path = self.directory / f"bookmarks-{stamp}-{uuid.uuid4().hex[:6]}.warc.gz"
+            self._file = open(self._path, "ab")
+            self._files += 1
+            info = (
+                "software: neural-bookmark-brain\r\n"
+                "format: WARC File Format 1.1\r\n"
+            ).encode("utf-8")
+            self._file.write(gzip.compress(_record([
+                ("WARC-Type", "warcinfo"),
+                ("WARC-Record-ID", f"<urn:uuid:{uuid.uuid4()}>"),
+                ("WARC-Date", _warc_date()),
+                ("WARC-Filename", self._path.name),
+                ("Content-Type", "application/warc-fields"),
+            ], info)))
+            logger.info(f"Archivo WARC: {self._path}")
+        return self._file
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def get_stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "current_file": str(self._path) if self._path else None,
+            "files": self._files,
+            "records": self._records,
+            "bytes": self._bytes,
+        }
+
+
+# ----------------------------------------------------------------------
+# Lectura
+# ----------------------------------------------------------------------
+
+def _read_headers(stream: BinaryIO) -> List[Tuple[str, str]]:
+    headers = []
+    for line in iter(stream.readline, b""):
+        line = line.rstrip(b"\r\n")
+        if not line:
+            break
+        name, _, value = line.decode("utf-8", "replace").partition(":")
+        headers.append((name.strip(), value.strip()))
+    return headers
+
+
+def _parse_response(block: bytes) -> Tuple[int, List[Tuple[str, str]], bytes]:
+    head, _, body = block.partition(b"\r\n\r\n")
+    lines = head.decode("utf-8", "replace").split("\r\n")
+    status = int(lines[0].split()[1])
+    headers = []
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers.append((name.strip(), value.strip()))
+    return status, headers, body
+
+
+def iter_records(path: Path) -> Iterator[Dict]:
+    """
+    Registros `response` de un .warc.gz (o .warc) como páginas del fetcher
+
+    Yields:
+        Dict con: url, bookmark_url, status_code, content_type, encoding,
+        content, truncated, etag, last_modified, headers
+    """
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rb") as stream:
+        while True:
+            line = stream.readline()
+            if not line:
+                return
+            if not line.startswith(b"WARC/"):
+                continue  # separador entre registros
+            warc_headers = dict((k.lower(), v) for k, v in _read_headers(stream))
+            block = stream.read(int(warc_headers.get("content-length", 0)))
+            if warc_headers.get("warc-type") != "response":
+                continue
+
+            status, headers, body = _parse_response(block)
+            lookup = {name.lower(): value for name, value in headers}
+            content_type, _, params = lookup.get("content-type", "").partition(";")
+            encoding = None
+            for param in params.split(";"):
+                key, _, value = param.strip().partition("=")
+                if key.lower() == "charset" and value:
+                    encoding = value.strip('"').lower()
+            target = warc_headers.get("warc-target-uri")
+            yield {
+                "url": target,
+                "bookmark_url": warc_headers.get("x-bookmark-url") or target,
+                "status_code": status,
+                "content_type": content_type.strip().lower() or None,
+                "encoding": encoding,
+                "content": body,
+                "truncated": "warc-truncated" in warc_headers,
+                "etag": lookup.get("etag"),
+                "last_modified": lookup.get("last-modified"),
+                "headers": headers,
+            }
+
+
+def read_archive(paths: Iterable[Path]) -> Iterator[Dict]:
+    """Páginas de varios ficheros o directorios WARC, en orden de escritura"""
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files += sorted([*path.glob("*.warc.gz"), *path.glob("*.warc")])
+        else:
+            files.append(path)
+    for path in files:
+        yield from iter_records(path)
@@ -0,0 +1,158 @@
+# app/utils/domain_set.py - Conjunto de dominios con búsqueda por sufijo de host
+
+import ipaddress
+from pathlib import Path
+from typing import Iterable, List, Optional, Set, Union
+
+
+class DomainSuffixSet:
+    """
+    Lista de dominios que casa un host con cualquiera de sus sufijos.
+
+    "pornhub.com" casa con "pornhub.com" y "www.pornhub.com", pero no con
+    "notpornhub.com" (un `in` de substrings sí lo hacía). Cada sufijo del host
+    se busca en un set de Python, así que la búsqueda es O(etiquetas del host)
+    sea cual sea el tamaño de la lista (cientos de miles de dominios).
+
+    Entradas admitidas:
+      - Dominio: "example.com", ".local", "*.example.com" (equivalentes a sufijo)
+      - IPv4 completa o prefijo de octetos: "127.0.0.1", "192.168"
+      - Red CIDR: "10.0.0.0/8", "fc00::/7"
+      - IPv6 literal: "::1"
+    """
+
+    def __init__(self, entries: Iterable[str] = ()):
+        self._suffixes: Set[str] = set()
+        self._ip_prefixes: Set[str] = set()
+        self._networks: List[Union[ipaddress.IPv4Network, ipaddress.IPv6Network]] = []
+        self.update(entries)
+
+    @staticmethod
+    def _normalize(entry: str) -> str:
+        entry = entry.strip().lower()
+        if entry.startswith("*."):
+            entry = entry[2:]
+        return entry.strip(".")
+
+    def add(self, entry: str) -> bool:
+        """
+        Añade un dominio, IP, prefijo IPv4 o red
+
+        Returns:
+            True si la entrada es nueva
+        """
+        entry = self._normalize(entry)
+        if not entry:
+            return False
+
+        if "/" in entry:
+            try:
+                network = ipaddress.ip_network(entry, strict=False)
+            except ValueError:
+                return False
+            if network in self._networks:
+                return False
+            self._networks.append(network)
+            return True
+
+        if ":" in entry or all(label.isdigit() for label in entry.split(".")):
+            target = self._ip_prefixes
+            entry = entry.strip("[]")
+        else:
+            target = self._suffixes
+
+        if entry in target:
+            return False
+        target.add(entry)
+        return True
+
+    def update(self, entries: Iterable[str]) -> int:
+        """Añade varias entradas; devuelve cuántas eran nuevas"""
+        return sum(1 for entry in entries if self.add(entry))
+
+    def load_file(self, path: Union[str, Path]) -> int:
+        """
+        Carga una lista desde fichero: un dominio por línea, comentarios con
+        `#`, y también formato hosts ("0.0.0.0 dominio.com")
+
+        Returns:
+            Número de entradas nuevas
+        """
+        def entries():
+            with open(path, encoding="utf-8", errors="replace") as handle:
+                for line in handle:
+                    tokens = line.split("#", 1)[0].split()
+                    if not tokens:
+                        continue
+                    if len(tokens) > 1 and self._is_ip(tokens[0]):
+                        # Formato hosts: la IP de destino no es parte de la lista
+                        yield from tokens[1:]
+                    else:
+                        yield tokens[0]
+
+        return self.update(entries())
+
+    @staticmethod
+    def _is_ip(value: str) -> bool:
+        try:
+            ipaddress.ip_address(value)
+            return True
+        except ValueError:
+            return False
+
+    def match(self, host: Optional[str]) -> Optional[str]:
+        """
+        Entrada de la lista que cubre al host
+
+        Args:
+            host: Hostname (sin esquema); se ignoran puerto y punto final
+
+        Returns:
+            La entrada más general que casa (ej: "example.com" para
+            "a.b.example.com"), o None
+        """
+        if not host:
+            return None
+        host = host.strip().lower()
+        if host.startswith("["):
+            host = host[1:].split("]", 1)[0]  # IPv6 con corchetes
+        elif host.count(":") == 1:
+            host = host.split(":", 1)[0]  # puerto
+        host = host.rstrip(".")
+        if not host:
+            return None
+
+        if ":" in host or all(label.isdigit() for label in host.split(".")):
+            return self._match_ip(host)
+
+        labels = host.split(".")
+        for start in range(len(labels) - 1, -1, -1):
+            suffix = ".".join(labels[start:])
+            if suffix in self._suffixes:
+                return suffix
+        return None
+
+    def _match_ip(self, host: str) -> Optional[str]:
+        if host in self._ip_prefixes:
+            return host
+        if ":" not in host:
+            octets = host.split(".")
+            for end in range(1, len(octets)):
+                prefix = ".".join(octets[:end])
+                if prefix in self._ip_prefixes:
+                    return prefix
+        if self._networks:
+            try:
+                address = ipaddress.ip_address(host)
+            except ValueError:
+                return None
+            for network in self._networks:
+                if address in network:
+                    return str(network)
+        return None
+
+    def __contains__(self, host: str) -> bool:
+        return self.match(host) is not None
+
+    def __len__(self) -> int:
+        return len(self._suffixes) + len(self._ip_prefixes) + len(self._networks)
@@ -2,9 +2,9 @@
 
 import validators
 from typing import Optional, Tuple
-from urllib.parse import urlparse
 import re
-from loguru import logger
+
+from app.services.domain_parser import DomainParser
 
 
 class URLValidator:
@@ -32,13 +32,8 @@ class URLValidator:
     
     @staticmethod
     def extract_domain(url: str) -> Optional[str]:
-        """Extrae el dominio de una URL"""
-        try:
-            parsed = urlparse(url)
-            return parsed.netloc or parsed.hostname
-        except Exception as e:
-            logger.error(f"Error extrayendo dominio de {url}: {e}")
-            return None
+        """Extrae el dominio (host[:puerto]) de una URL"""
+        return DomainParser.netloc(url) or None
     
     @staticmethod
     def validate_and_normalize(url: str) -> Tuple[bool, str, Optional[str]]:
@@ -0,0 +1,21 @@
+-- Migration 002: Reintentos reprogramados (next_attempt_at / retry_count)
+-- Ejecutar: docker-compose exec postgres psql -U bookmark_user -d neural_bookmarks -f /tmp/migration.sql
+
+-- 1. Agregar campos de reprogramación
+ALTER TABLE bookmarks ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE bookmarks ADD COLUMN IF NOT EXISTS retry_count INTEGER DEFAULT 0;
+
+UPDATE bookmarks SET retry_count = 0 WHERE retry_count IS NULL;
+
+-- 2. Índice para la cola de reprocess_failed.py (sólo filas reprogramadas)
+CREATE INDEX IF NOT EXISTS ix_bookmarks_next_attempt_at
+    ON bookmarks(next_attempt_at) WHERE next_attempt_at IS NOT NULL;
+
+-- Verificación
+SELECT
+    scraping_error_type,
+    COUNT(*) AS scheduled,
+    MIN(next_attempt_at) AS next_due
+FROM bookmarks
+WHERE next_attempt_at IS NOT NULL
+GROUP BY scraping_error_type;
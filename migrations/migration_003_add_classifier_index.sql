@@ -0,0 +1,19 @@
+-- Migration 003: Índice invertido para reclasificar NSFW (classifier_tokens / classified_at)
+-- Ejecutar: docker-compose exec postgres psql -U bookmark_user -d neural_bookmarks -f /tmp/migration.sql
+
+-- 1. Agregar campos del índice
+ALTER TABLE bookmarks ADD COLUMN IF NOT EXISTS classifier_tokens VARCHAR[];
+ALTER TABLE bookmarks ADD COLUMN IF NOT EXISTS classified_at TIMESTAMP WITH TIME ZONE;
+
+-- 2. GIN para buscar candidatos con classifier_tokens @> ARRAY[...]
+CREATE INDEX IF NOT EXISTS ix_bookmarks_classifier_tokens_gin
+    ON bookmarks USING gin (classifier_tokens);
+
+-- Las filas se indexan con: python scripts/reclassify.py --full
+
+-- Verificación
+SELECT
+    COUNT(*) AS total,
+    COUNT(classified_at) AS indexed,
+    COUNT(*) FILTER (WHERE is_nsfw) AS nsfw
+FROM bookmarks;
@@ -0,0 +1,21 @@
+-- Migration 004: Clave canónica de deduplicación (url_clean / url_hash / tracking_params)
+-- Ejecutar: docker-compose exec postgres psql -U bookmark_user -d neural_bookmarks -f /tmp/migration.sql
+
+-- 1. Agregar campos (los scripts de estadísticas ya usaban url_clean y tracking_params)
+ALTER TABLE bookmarks ADD COLUMN IF NOT EXISTS url_clean VARCHAR(2048);
+ALTER TABLE bookmarks ADD COLUMN IF NOT EXISTS url_hash VARCHAR(64);
+ALTER TABLE bookmarks ADD COLUMN IF NOT EXISTS tracking_params JSONB;
+
+-- 2. Índice único: las inserciones usan ON CONFLICT DO NOTHING sobre él.
+--    Las filas sin url_hash (NULL) no chocan entre sí.
+CREATE UNIQUE INDEX IF NOT EXISTS ix_bookmarks_url_hash ON bookmarks (url_hash);
+
+-- Las filas existentes se rellenan con: python scripts/backfill_url_keys.py
+-- (las que resulten duplicadas de otra se quedan con url_hash NULL y se listan)
+
+-- Verificación
+SELECT
+    COUNT(*) AS total,
+    COUNT(url_hash) AS hashed,
+    COUNT(tracking_params) AS with_tracking
+FROM bookmarks;
@@ -1,44 +1,50 @@
-from app.database import get_db_context
-import asyncio
-from app.models import Bookmark
-from sqlalchemy import select, func
-
-async def tracking_stats():
-    async with get_db_context() as db:
-        # 1. Contar total con tracking
-        result = await db.execute(
-            select(Bookmark.tracking_params).where(
-                Bookmark.status == 'completed',
-                Bookmark.tracking_params.isnot(None)
-            )
-        )
-        all_tracking = result.scalars().all()
-        
-        print('\n=== ANÁLISIS DE PRIVACIDAD Y TRACKING ===')
-        print(f'Total marcadores analizados : {len(all_tracking)}')
-        
-        if all_tracking:
-            print('\nEjemplos de parámetros detectados y eliminados:')
-            for i, params in enumerate(all_tracking[:5], 1):
-                if params:
-                    keys = list(params.keys())
-                    print(f'  [{i}] {", ".join(keys[:4])}{"..." if len(keys) > 4 else ""}')
-        
-        # 2. Top dominios con más basura de tracking
-        result = await db.execute(
-            select(Bookmark.domain, func.count()).where(
-                Bookmark.status == 'completed',
-                Bookmark.tracking_params.isnot(None)
-            ).group_by(Bookmark.domain).order_by(func.count().desc()).limit(10)
-        )
-        top_domains = result.fetchall()
-        
-        if top_domains:
-            print('\nTop dominios con mayor carga de tracking:')
-            print(f'  {"Dominio":30} | {"Casos":5}')
-            print(f'  {"-"*30}-|-------')
-            for domain, count in top_domains:
-                print(f'  {domain:30} | {count:5}')
+#!/usr/bin/env python3
+"""
+Informe de tracking de las URLs guardadas
+
+Sale de los contadores del motor de canonicalización (URL_STATS_FILE, que
+actualizan el importador, backfill_url_keys.py y la API al cerrarse), no de
+recorrer la tabla. Para contar también los bookmarks anteriores a los
+contadores: python scripts/backfill_url_keys.py
+
+Uso:
+    python scripts/analyze_tracking.py [top]
+"""
+import sys
+from pathlib import Path
+
+# Añadir directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.canonicalizer import canonicalizer
+
+
+def tracking_stats(top: int = 10):
+    report = canonicalizer.report(top)
+
+    print('\n=== ANÁLISIS DE PRIVACIDAD Y TRACKING ===')
+    print(f'Total URLs analizadas       : {report["urls"]}')
+    print(f'Con parámetros de tracking  : {report["with_tracking"]} ({report["tracking_ratio"]:.1%})')
+
+    if report["top_params"]:
+        print('\nParámetros detectados y eliminados:')
+        print(f'  {"Parámetro":30} | {"Casos":5}')
+        print(f'  {"-"*30}-|-------')
+        for param, count in report["top_params"]:
+            print(f'  {param:30} | {count:5}')
+
+    if report["top_domains"]:
+        print('\nTop dominios con mayor carga de tracking:')
+        print(f'  {"Dominio":30} | {"Casos":5}')
+        print(f'  {"-"*30}-|-------')
+        for domain, count in report["top_domains"]:
+            print(f'  {domain:30} | {count:5}')
+
+    if report["rules"]:
+        print('\nReglas de canonicalización aplicadas:')
+        for rule, count in report["rules"].items():
+            print(f'  {rule:30} | {count:5}')
+
 
 if __name__ == "__main__":
-    asyncio.run(tracking_stats())
\ No newline at end of file
+    tracking_stats(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Rellena url_clean / url_hash / tracking_params de los bookmarks existentes
+
+Recorre la tabla por id en bloques y escribe cada bloque con un UPDATE masivo.
+Sin opciones sólo toca las filas sin url_hash; --full recalcula todas (por
+ejemplo tras cambiar los packs de reglas de app/services/canonicalizer.py).
+
+Si dos filas tienen la misma URL canónica, la primera (id más bajo) se queda
+el hash y las demás se quedan con url_hash NULL y se listan como duplicadas
+para revisarlas a mano.
+
+Requiere migrations/migration_004_add_url_hash.sql.
+
+Uso:
+    python scripts/backfill_url_keys.py [--full] [--batch-size 1000]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Añadir directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from loguru import logger
+from sqlalchemy import select, update
+
+from app.database import get_db_context, init_db
+from app.models import Bookmark
+from app.services.canonicalizer import canonicalizer
+
+
+async def backfill(db, full: bool = False, batch_size: int = 1000) -> dict:
+    """
+    Calcula las claves canónicas por bloques de `batch_size` filas
+
+    Returns:
+        Dict con scanned, hashed, duplicates (lista de (id, id_original))
+    """
+    stats = {"scanned": 0, "hashed": 0, "duplicates": []}
+    last_id = 0
+
+    while True:
+        query = (
+            select(Bookmark.id, Bookmark.url, Bookmark.url_hash, Bookmark.updated_at)
+            .where(Bookmark.id > last_id)
+            .order_by(Bookmark.id)
+            .limit(batch_size)
+        )
+        if not full:
+            query = query.where(Bookmark.url_hash.is_(None))
+        rows = (await db.execute(query)).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        canonical = dict(zip(
+            (bookmark_id for bookmark_id, _, _, _ in rows),
+            canonicalizer.clean_many(url for _, url, _, _ in rows),
+        ))
+        keys = {bookmark_id: result.columns() for bookmark_id, result in canonical.items()}
+
+        # Una consulta al índice único por bloque: hashes que ya tiene otra fila
+        result = await db.execute(
+            select(Bookmark.url_hash, Bookmark.id).where(
+                Bookmark.url_hash.in_({k["url_hash"] for k in keys.values()})
+            )
+        )
+        owners = {url_hash: bookmark_id for url_hash, bookmark_id in result.all()}
+
+        params = []
+        for bookmark_id, _, old_hash, updated_at in rows:
+            row_keys = dict(keys[bookmark_id])
+            owner = owners.setdefault(row_keys["url_hash"], bookmark_id)
+            if owner != bookmark_id:
+                stats["duplicates"].append((bookmark_id, owner))
+                row_keys["url_hash"] = None
+            elif row_keys["url_hash"] != old_hash:
+                stats["hashed"] += 1
+                if old_hash is None:
+                    canonicalizer.record(canonical[bookmark_id])
+            if old_hash and old_hash != row_keys["url_hash"] and owners.get(old_hash) == bookmark_id:
+                del owners[old_hash]  # --full: el hash antiguo queda libre
+            # No es un cambio del bookmark: updated_at se conserva
+            params.append({"id": bookmark_id, "updated_at": updated_at, **row_keys})
+
+        await db.execute(update(Bookmark), params)
+        await db.commit()
+        stats["scanned"] += len(rows)
+        logger.info(
+            f"  {stats['scanned']} filas, {stats['hashed']} con hash nuevo, "
+            f"{len(stats['duplicates'])} duplicadas"
+        )
+
+    return stats
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Rellenar las claves canónicas de URL")
+    parser.add_argument("--full", action="store_true", help="Recalcular todas las filas")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Filas por UPDATE")
+    args = parser.parse_args()
+
+    logger.info("🧠 Neural Bookmark Brain - Backfill de url_clean / url_hash")
+    logger.info("=" * 60)
+
+    await init_db()
+    started = time.perf_counter()
+
+    async with get_db_context() as db:
+        stats = await backfill(db, full=args.full, batch_size=args.batch_size)
+    canonicalizer.flush_stats()
+
+    for bookmark_id, owner in stats["duplicates"]:
+        logger.warning(f"🔄 Bookmark {bookmark_id} duplica a {owner}: se queda sin url_hash")
+    logger.info(
+        f"✅ {stats['scanned']} filas en {time.perf_counter() - started:.1f}s "
+        f"({stats['hashed']} hashes nuevos, {len(stats['duplicates'])} duplicadas)"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark del matcher de keywords NSFW: una regex por keyword vs. regex compilada
+
+Compara, sobre muestras de texto de 1.000 caracteres (lo que analiza
+SafetyClassifier._check_text), el tiempo de:
+  - antes: re.search(r'\\b' + re.escape(keyword) + r'\\b') por cada keyword
+  - ahora: KeywordMatcher (trie compilado una vez, una sola pasada)
+
+También mide lo que cuesta recompilar el matcher (add_keyword) y comprueba
+que ambos devuelven las mismas keywords.
+
+Uso:
+    python scripts/benchmark_classifier.py [--keywords 5000] [--samples 200] [--runs 3]
+"""
+import argparse
+import random
+import re
+import statistics
+import string
+import sys
+import time
+from pathlib import Path
+
+# Añadir directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.classifier import KeywordMatcher
+
+
+def legacy_find_all(keywords, text: str):
+    """Reproduce el _check_text anterior: una búsqueda por keyword"""
+    return [
+        keyword for keyword in keywords
+        if re.search(r"\b" + re.escape(keyword) + r"\b", text)
+    ]
+
+
+def make_keywords(count: int, rng: random.Random):
+    """Keywords sintéticas de 3-12 letras, algunas de dos palabras"""
+    keywords = set()
+    while len(keywords) < count:
+        word = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 12)))
+        if rng.random() < 0.1:
+            word += " " + "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8)))
+        keywords.add(word)
+    return sorted(keywords)
+
+
+def make_samples(count: int, keywords, rng: random.Random, length: int = 1000):
+    """Textos de `length` caracteres con alguna keyword intercalada"""
+    samples = []
+    for _ in range(count):
+        words = []
+        while sum(len(w) + 1 for w in words) < length:
+            if rng.random() < 0.02:
+                words.append(rng.choice(keywords))
+            else:
+                words.append("".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9))))
+        samples.append(" ".join(words)[:length])
+    return samples
+
+
+def time_per_sample(func, samples, runs: int):
+    """Mejor tiempo (ms) de `runs` ejecuciones para cada muestra"""
+    timings = []
+    for text in samples:
+        best = float("inf")
+        for _ in range(runs):
+            start = time.perf_counter()
+            func(text)
+            best = min(best, time.perf_counter() - start)
+        timings.append(best * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del matcher de keywords NSFW")
+    parser.add_argument("--keywords", type=int, default=5000, help="Número de keywords")
+    parser.add_argument("--samples", type=int, default=200, help="Muestras de 1.000 caracteres")
+    parser.add_argument("--runs", type=int, default=3, help="Repeticiones por muestra")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    keywords = make_keywords(args.keywords, rng)
+    samples = make_samples(args.samples, keywords, rng)
+    print(f"🔑 {len(keywords)} keywords, {len(samples)} muestras de 1.000 caracteres, {args.runs} runs\n")
+
+    start = time.perf_counter()
+    matcher = KeywordMatcher(keywords)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    mismatches = sum(
+        1 for text in samples if legacy_find_all(keywords, text) != matcher.find_all(text)
+    )
+
+    # El antiguo se mide con una sola ejecución por muestra: es muy lento
+    results = {
+        "antes (1 regex/kw)": time_per_sample(lambda t: legacy_find_all(keywords, t), samples, 1),
+        "ahora (compilada)": time_per_sample(matcher.find_all, samples, args.runs),
+    }
+
+    print(f"  {'Matcher':20} | {'media':>9} | {'mediana':>9} | {'p95':>9}")
+    print(f"  {'-' * 20}-|-----------|-----------|-----------")
+    for name, timings in results.items():
+        ordered = sorted(timings)
+        p95 = ordered[min(int(round(0.95 * (len(ordered) - 1))), len(ordered) - 1)]
+        print(
+            f"  {name:20} | {statistics.mean(timings):7.3f}ms | "
+            f"{statistics.median(timings):7.3f}ms | {p95:7.3f}ms"
+        )
+
+    before, after = results.values()
+    print(f"\n⚡ Speedup (mediana por muestra): {statistics.median(before) / statistics.median(after):.0f}x")
+    print(f"🔧 Compilar el matcher (add_keyword): {build_ms:.1f}ms")
+    if mismatches:
+        print(f"❌ {mismatches} muestras con resultados distintos")
+        sys.exit(1)
+    print("✅ Mismas keywords en todas las muestras")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark del event loop con embeddings: síncronos en el handler vs. executor
+
+Simula peticiones de búsqueda concurrentes y mide con LoopLagMonitor cuánto
+tiempo queda bloqueado el event loop:
+  - antes: generate_query_embedding() dentro de la corrutina (como hacían
+    /search, /search/hybrid y /admin/reembed-all)
+  - ahora: await embed_query() (micro-batching en el executor de embeddings)
+
+Además de las búsquedas corre una tarea "ligera" que representa el resto de
+peticiones (health checks, listados) y mide su latencia.
+
+Uso:
+    python scripts/benchmark_event_loop.py [--requests 200] [--concurrency 20]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Añadir directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.embeddings import EmbeddingService
+from app.services.loop_monitor import LoopLagMonitor
+
+QUERIES = [
+    "python async programming", "machine learning tutorial", "recetas de cocina",
+    "docker compose postgres", "vector database benchmarks", "rust ownership",
+    "historia de roma", "fastapi background tasks", "pgvector ivfflat index",
+]
+
+
+async def run(mode: str, service: EmbeddingService, requests: int, concurrency: int):
+    monitor = LoopLagMonitor(interval_ms=10, stall_ms=20)
+    monitor.start()
+    semaphore = asyncio.Semaphore(concurrency)
+    light_latencies = []
+    done = asyncio.Event()
+
+    async def search(index: int):
+        query = f"{QUERIES[index % len(QUERIES)]} {index}"
+        async with semaphore:
+            if mode == "sync":
+                service.generate_query_embedding(query)
+            else:
+                await service.embed_query(query)
+
+    async def light_requests():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0)
+            light_latencies.append((time.perf_counter() - started) * 1000)
+            await asyncio.sleep(0.005)
+
+    light = asyncio.create_task(light_requests())
+    started = time.perf_counter()
+    await asyncio.gather(*(search(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await light
+    await monitor.stop()
+
+    stats = monitor.get_stats()
+    ordered = sorted(light_latencies)
+    p99 = ordered[min(int(0.99 * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+    return {
+        "elapsed": elapsed,
+        "lag_p95": stats["lag_ms_p95"],
+        "lag_max": stats["lag_ms_max"],
+        "blocked": stats["blocked_seconds"],
+        "light_median": statistics.median(ordered) if ordered else 0.0,
+        "light_p99": p99,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark del event loop con embeddings")
+    parser.add_argument("--requests", type=int, default=200, help="Búsquedas simuladas")
+    parser.add_argument("--concurrency", type=int, default=20, help="Búsquedas en paralelo")
+    args = parser.parse_args()
+
+    service = EmbeddingService()
+    await service.warmup()
+    service.generate_query_embedding("warmup")
+
+    print(f"🔎 {args.requests} búsquedas, {args.concurrency} concurrentes, modelo {service.model_name}\n")
+    results = {
+        "antes (síncrono)": await run("sync", service, args.requests, args.concurrency),
+        "ahora (executor)": await run("async", service, args.requests, args.concurrency),
+    }
+
+    print(f"  {'Modo':18} | {'total':>7} | {'lag p95':>9} | {'lag max':>9} | {'bloqueado':>9} | {'ligera p99':>10}")
+    print(f"  {'-' * 18}-|---------|-----------|-----------|-----------|-----------")
+    for name, r in results.items():
+        print(
+            f"  {name:18} | {r['elapsed']:6.2f}s | {r['lag_p95']:7.1f}ms | {r['lag_max']:7.1f}ms | "
+            f"{r['blocked']:8.2f}s | {r['light_p99']:8.1f}ms"
+        )
+    print(f"\n📦 Batcher: {service.batcher.get_stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark de extracción HTML: pipeline anterior vs. parseo único
+
+Compara, página a página, el tiempo de parseo/extracción de:
+  - antes: trafilatura.extract + trafilatura.extract_metadata sobre response.text
+           + BeautifulSoup(..., 'lxml') del fallback (3 parseos)
+  - ahora: extract_document (1 parseo lxml desde los bytes)
+
+Uso:
+    python scripts/benchmark_extraction.py <directorio_con_html> [--runs 3]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Añadir directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import trafilatura
+from bs4 import BeautifulSoup
+
+from app.services.extraction import decode_html, extract_document
+
+
+def legacy_extraction(content: bytes) -> None:
+    """Reproduce el pipeline anterior: tres parseos de la misma página"""
+    html = decode_html(content, None)  # equivalente a response.text
+    trafilatura.extract(html, include_comments=False, include_tables=True, no_fallback=False)
+    trafilatura.extract_metadata(html)
+
+    soup = BeautifulSoup(html, "lxml")
+    for script in soup(["script", "style"]):
+        script.decompose()
+    soup.get_text(separator=" ", strip=True)
+
+
+def single_parse_extraction(content: bytes) -> None:
+    extract_document(content)
+
+
+def time_per_page(func, pages, runs: int):
+    """Mejor tiempo (ms) de `runs` ejecuciones para cada página"""
+    timings = []
+    for content in pages:
+        best = float("inf")
+        for _ in range(runs):
+            start = time.perf_counter()
+            func(content)
+            best = min(best, time.perf_counter() - start)
+        timings.append(best * 1000)
+    return timings
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de extracción HTML")
+    parser.add_argument("corpus", help="Directorio con páginas .html/.htm guardadas")
+    parser.add_argument("--runs", type=int, default=3, help="Repeticiones por página")
+    args = parser.parse_args()
+
+    corpus = Path(args.corpus)
+    files = sorted(p for p in corpus.rglob("*") if p.suffix.lower() in (".html", ".htm"))
+    if not files:
+        print(f"❌ No hay páginas .html en {corpus}")
+        sys.exit(1)
+
+    pages = [f.read_bytes() for f in files]
+    total_mb = sum(len(p) for p in pages) / 1024 / 1024
+    print(f"📄 {len(pages)} páginas ({total_mb:.1f} MB), {args.runs} runs por página\n")
+
+    results = {
+        "antes (3 parseos)": time_per_page(legacy_extraction, pages, args.runs),
+        "ahora (1 parseo)": time_per_page(single_parse_extraction, pages, args.runs),
+    }
+
+    print(f"  {'Pipeline':20} | {'media':>8} | {'mediana':>8} | {'p95':>8} | {'total':>9}")
+    print(f"  {'-' * 20}-|----------|----------|----------|-----------")
+    for name, timings in results.items():
+        print(
+            f"  {name:20} | {statistics.mean(timings):6.1f}ms | "
+            f"{statistics.median(timings):6.1f}ms | {percentile(timings, 95):6.1f}ms | "
+            f"{sum(timings) / 1000:7.2f}s"
+        )
+
+    before, after = results.values()
+    print(f"\n⚡ Speedup (mediana por página): {statistics.median(before) / statistics.median(after):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Benchmark del scraper contra un servidor HTTP local (sin red)
+
+Levanta un servidor de fixtures en 127.0.0.1 que sirve páginas guardadas (o
+sintéticas) e inyecta latencia, cola lenta, 403/429/503, cuerpos servidos
+gota a gota y cadenas de redirecciones. Los hosts de las URLs se fijan a
+127.0.0.1 en la caché DNS del scraper, así que no se resuelve nada fuera.
+
+Para cada nivel de concurrencia se usa un ResilientScraper nuevo:
+  - concurrencia 1: scrape_url en secuencia
+  - resto: scrape_many(concurrency=N)
+
+Informa páginas/s, bytes/s, CPU de extracción y latencia p50/p99 por URL, y
+compara con un baseline guardado para detectar regresiones.
+
+El baseline de benchmarks/scraper_baseline.json se generó con los parámetros
+por defecto (corpus sintético de 20 páginas, 300 URLs, concurrencia 1,8,32,
+seed 42) y `--save-baseline`. Los tiempos dependen de la máquina: si se
+compara en otra, conviene regenerarlo ahí antes de medir un cambio.
+
+Uso:
+    python scripts/benchmark_scraper.py [--corpus DIR] [--urls 300] [--concurrency 1,8,32]
+    python scripts/benchmark_scraper.py --save-baseline     # fijar el baseline actual
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+
+# Añadir directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.dns_cache import DeadHostCache
+from app.services.redirect_cache import RedirectCache
+from app.services.scraper import ResilientScraper
+from app.services.warc import WARCWriter
+
+DEFAULT_BASELINE = Path(__file__).parent.parent / "benchmarks" / "scraper_baseline.json"
+
+# Mezcla de respuestas del fixture: (tipo, peso)
+SCENARIO_MIX = (
+    ("page", 0.70),
+    ("redirect", 0.10),
+    ("drip", 0.05),
+    ("403", 0.05),
+    ("429", 0.05),
+    ("503", 0.05),
+)
+
+LOREM = (
+    "El scraper descarga cada página una sola vez y la extracción trabaja sobre "
+    "el mismo cuerpo. Este párrafo se repite para generar páginas de distintos "
+    "tamaños con texto suficiente para trafilatura. "
+)
+
+
+# ----------------------------------------------------------------------
+# Servidor de fixtures
+# ----------------------------------------------------------------------
+
+def synthetic_pages(count: int = 20) -> List[bytes]:
+    """Páginas HTML de entre ~2 KB y ~200 KB cuando no se da un corpus"""
+    pages = []
+    for i in range(count):
+        paragraphs = "".join(f"<p>{LOREM * (1 + (i * 7) % 10)}</p>" for _ in range(2 + i * 3))
+        pages.append(
+            (
+                f"<html lang='es'><head><title>Página de prueba {i}</title>"
+                f"<script>var tracking = {i};</script></head>"
+                f"<body><nav><a href='/'>Inicio</a></nav><article><h1>Artículo {i}</h1>"
+                f"{paragraphs}</article><footer>Pie</footer></body></html>"
+            ).encode("utf-8")
+        )
+    return pages
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """
+    Rutas:
+      /page/<n>?latency=S&drip=S     página n (drip: pausa entre bloques de 1 KB)
+      /redirect/<hops>/<ruta>         cadena de 302 hasta /<ruta>
+      /status/<code>                  403, 429 (Retry-After: 30) o 503 (Retry-After: 1)
+    """
+
+    protocol_version = "HTTP/1.1"
+    pages: List[bytes] = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, code: int, body: bytes, headers: Dict[str, str] = None):
+        self.send_response(code)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        return body
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        parts = parsed.path.strip("/").split("/")
+        query = f"?{parsed.query}" if parsed.query else ""
+
+        latency = float(params.get("latency", 0))
+        if latency:
+            time.sleep(latency)
+
+        try:
+            if parts[0] == "redirect":
+                hops = int(parts[1])
+                target = "/".join(parts[2:])
+                location = f"/redirect/{hops - 1}/{target}" if hops > 1 else f"/{target}"
+                self._send(302, b"", {"Location": location + query})
+            elif parts[0] == "status":
+                code = int(parts[1])
+                retry_after = {429: "30", 503: "1"}.get(code)
+                body = self._send(code, b"<html>error</html>", {"Retry-After": retry_after} if retry_after else None)
+                self.wfile.write(body)
+            elif parts[0] == "page":
+                body = self._send(200, self.pages[int(parts[1]) % len(self.pages)])
+                drip = float(params.get("drip", 0))
+                if not drip:
+                    self.wfile.write(body)
+                for start in range(0, len(body) if drip else 0, 1024):
+                    self.wfile.write(body[start:start + 1024])
+                    self.wfile.flush()
+                    time.sleep(drip)
+            else:
+                self.wfile.write(self._send(404, b"<html>not found</html>"))
+        except (BrokenPipeError, ConnectionResetError):
+            # El scraper cortó la descarga (límite de bytes o hedge cancelado)
+            pass
+
+
+def start_server(pages: List[bytes]) -> ThreadingHTTPServer:
+    FixtureHandler.pages = pages
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def build_urls(port: int, args) -> List[str]:
+    """URLs del escenario (deterministas con --seed), repartidas entre --hosts hosts"""
+    rng = random.Random(args.seed)
+    kinds, weights = zip(*SCENARIO_MIX)
+    urls = []
+    for i in range(args.urls):
+        host = f"bench{i % args.hosts}.com"
+        kind = rng.choices(kinds, weights)[0]
+        latency = args.latency * (20 if rng.random() < args.tail else 1)
+        query = f"?latency={latency:.3f}&i={i}"
+        if kind == "page":
+            path = f"/page/{i}"
+        elif kind == "redirect":
+            path = f"/redirect/3/page/{i}"
+        elif kind == "drip":
+            path = f"/page/{i}"
+            query += "&drip=0.02"
+        else:
+            path = f"/status/{kind}"
+        urls.append(f"http://{host}:{port}{path}{query}")
+    return urls
+
+
+# ----------------------------------------------------------------------
+# Ejecución
+# ----------------------------------------------------------------------
+
+def make_scraper(args, workdir: Path) -> ResilientScraper:
+    scraper = ResilientScraper()
+    scraper.cache_mode = "off"
+    # Estado persistente en el directorio del nivel: ni se tocan los ficheros
+    # reales de data/ ni un nivel hereda aciertos de los anteriores
+    scraper.dead_hosts = DeadHostCache(path=str(workdir / "dead_hosts.json"))
+    scraper.redirects = RedirectCache(path=str(workdir / "redirects.sqlite3"))
+    scraper.warc = WARCWriter(directory=str(workdir / "warc"))
+    scraper.warc.enabled = False
+    scraper.rate_limiter.default_rate = args.domain_rate
+    if not args.circuits:
+        # Con 429 inyectados el circuito cerraría el paso a casi todo el escenario
+        scraper.circuits.failure_threshold = 0
+    for i in range(args.hosts):
+        scraper.http_pool.dns_cache.pin(f"bench{i}.com", ["127.0.0.1"])
+    return scraper
+
+
+async def run_level(urls: List[str], concurrency: int, args, workdir: Path) -> Dict:
+    scraper = make_scraper(args, workdir)
+    results = []
+    started = time.perf_counter()
+    try:
+        if concurrency == 1:
+            for url in urls:
+                results.append(await scraper.scrape_url(url))
+        else:
+            async for _, result in scraper.scrape_many(urls, concurrency=concurrency):
+                results.append(result)
+        wall = time.perf_counter() - started
+        stats = scraper.get_stats()
+    finally:
+        await scraper.aclose()
+
+    ok = sum(1 for r in results if r.get("success"))
+    downloaded = sum(
+        step.get("bytes", 0)
+        for r in results
+        for step in r.get("strategy_trace", [])
+        if step.get("strategy") == "fetch"
+    )
+    cpu = stats["extraction"]["cpu_seconds"]
+    return {
+        "concurrency": concurrency,
+        "urls": len(results),
+        "ok": ok,
+        "wall_seconds": round(wall, 3),
+        "pages_per_sec": round(ok / wall, 2) if wall else 0.0,
+        "bytes_per_sec": round(downloaded / wall) if wall else 0,
+        "extraction_cpu_seconds": cpu,
+        "extraction_cpu_ms_per_page": round(cpu * 1000 / ok, 2) if ok else 0.0,
+        "p50": stats["latency"]["p50"],
+        "p99": stats["latency"]["p99"],
+        "errors": dict(Counter(r.get("error_type") for r in results if not r.get("success"))),
+    }
+
+
+# ----------------------------------------------------------------------
+# Baseline
+# ----------------------------------------------------------------------
+
+def compare(levels: List[Dict], baseline: Dict, tolerance: float) -> List[str]:
+    """Regresiones respecto al baseline (peor que `tolerance` en proporción)"""
+    previous = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    regressions = []
+    for level in levels:
+        old = previous.get(level["concurrency"])
+        if old is None:
+            continue
+        checks = (
+            ("pages_per_sec", -1),                # más es mejor
+            ("p99", 1),                           # menos es mejor
+            ("extraction_cpu_ms_per_page", 1),
+        )
+        for metric, direction in checks:
+            before, now = old.get(metric) or 0, level.get(metric) or 0
+            if not before:
+                continue
+            change = (now - before) / before
+            if change * direction > tolerance:
+                regressions.append(
+                    f"c={level['concurrency']} {metric}: {before} -> {now} ({change:+.0%})"
+                )
+    return regressions
+
+
+def print_table(levels: List[Dict], baseline: Dict = None):
+    previous = {level["concurrency"]: level for level in (baseline or {}).get("levels", [])}
+    print(
+        f"  {'conc':>4} | {'ok/urls':>9} | {'páginas/s':>9} | {'KB/s':>8} | "
+        f"{'CPU ext/pág':>11} | {'p50':>7} | {'p99':>7} | vs baseline"
+    )
+    print(f"  {'-' * 4}-|-----------|-----------|----------|-------------|---------|---------|------------")
+    for level in levels:
+        old = previous.get(level["concurrency"])
+        delta = ""
+        if old and old.get("pages_per_sec"):
+            delta = f"{(level['pages_per_sec'] / old['pages_per_sec'] - 1):+.0%} páginas/s"
+        print(
+            f"  {level['concurrency']:>4} | {level['ok']:>4}/{level['urls']:<4} | "
+            f"{level['pages_per_sec']:>9.1f} | {level['bytes_per_sec'] / 1024:>8.0f} | "
+            f"{level['extraction_cpu_ms_per_page']:>9.1f}ms | {level['p50']:>6.2f}s | "
+            f"{level['p99']:>6.2f}s | {delta}"
+        )
+    errors = Counter()
+    for level in levels:
+        errors.update(level["errors"])
+    if errors:
+        print(f"\n  Errores (todas las pasadas): {dict(errors)}")
+
+
+def load_pages(corpus: str) -> List[bytes]:
+    if not corpus:
+        return synthetic_pages()
+    files = sorted(p for p in Path(corpus).rglob("*") if p.suffix.lower() in (".html", ".htm"))
+    if not files:
+        print(f"❌ No hay páginas .html en {corpus}")
+        sys.exit(1)
+    return [f.read_bytes() for f in files]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark del scraper sin red")
+    parser.add_argument("--corpus", help="Directorio con páginas .html grabadas (defecto: sintéticas)")
+    parser.add_argument("--urls", type=int, default=300, help="URLs por pasada")
+    parser.add_argument("--hosts", type=int, default=10, help="Hosts distintos en el escenario")
+    parser.add_argument("--concurrency", default="1,8,32", help="Niveles de concurrencia (CSV)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Latencia base del servidor (s)")
+    parser.add_argument("--tail", type=float, default=0.05, help="Fracción de respuestas 20x más lentas")
+    parser.add_argument("--domain-rate", type=float, default=0.0,
+                        help="Peticiones/s por dominio (0 = sin rate limiting)")
+    parser.add_argument("--circuits", action="store_true", help="Mantener el circuit breaker activo")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="Fichero de baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="Guardar esta ejecución como baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Empeoramiento permitido respecto al baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    pages = load_pages(args.corpus)
+    server = start_server(pages)
+    port = server.server_address[1]
+    urls = build_urls(port, args)
+    levels_wanted = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    print(f"🧪 Fixture en 127.0.0.1:{port}: {len(pages)} páginas, {len(urls)} URLs, {args.hosts} hosts")
+    print(f"   Mezcla: {', '.join(f'{k} {w:.0%}' for k, w in SCENARIO_MIX)}; cola lenta {args.tail:.0%}\n")
+
+    levels = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for i, concurrency in enumerate(levels_wanted):
+                print(f"▶️  Concurrencia {concurrency}...")
+                workdir = Path(tmp) / f"{i}-c{concurrency}"
+                workdir.mkdir()
+                levels.append(await run_level(urls, concurrency, args, workdir))
+    finally:
+        server.shutdown()
+
+    baseline_path = Path(args.baseline)
+    baseline = None
+    if baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+
+    print()
+    print_table(levels, baseline)
+
+    params = {k: getattr(args, k) for k in ("urls", "hosts", "latency", "tail", "domain_rate", "circuits", "seed")}
+    params["corpus_pages"] = len(pages)
+
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(
+            json.dumps({"created_at": datetime.now().isoformat(), "params": params, "levels": levels}, indent=2),
+            encoding="utf-8",
+        )
+        print(f"\n💾 Baseline guardado en {baseline_path}")
+        return
+
+    if baseline is None:
+        print(f"\nℹ️  Sin baseline en {baseline_path} (crear con --save-baseline)")
+        return
+
+    if baseline.get("params") != params:
+        print(f"\n⚠️  El baseline se tomó con otros parámetros: {baseline.get('params')}")
+
+    regressions = compare(levels, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ Regresiones (> {args.tolerance:.0%}):")
+        for line in regressions:
+            print(f"   • {line}")
+        sys.exit(1)
+    print(f"\n✅ Sin regresiones respecto al baseline ({baseline.get('created_at', '?')})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -8,16 +8,19 @@ from pathlib import Path
 import pandas as pd
 from loguru import logger
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 # Añadir directorio raíz al path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app.database import get_db_context, init_db
 from app.models import Bookmark, ProcessingLog
 from app.schemas import ImportStats
 from app.agents import orchestrator
+from app.services.scraper import scraper
+from app.services.canonicalizer import canonicalizer
 from app.utils.validators import URLValidator
 from app.config import get_settings
 
@@ -27,7 +30,7 @@ settings = get_settings()
 class BookmarkImporter:
     """Importador de bookmarks desde CSV"""
     
-    def __init__(self, csv_path: str, batch_size: int = 10):
+    def __init__(self, csv_path: str, batch_size: int = 50):
         self.csv_path = Path(csv_path)
         self.batch_size = batch_size
         self.stats = {
@@ -39,6 +42,8 @@ class BookmarkImporter:
             "local_detected": 0,
             "errors": []
         }
+        # Páginas finales ya vistas en este import (tras redirecciones conocidas)
+        self.seen_pages = set()
     
     async def import_bookmarks(self):
         """Importa bookmarks desde CSV"""
@@ -73,9 +78,6 @@ class BookmarkImporter:
                 logger.info(f"📦 Batch {i // self.batch_size + 1}/{(len(df) - 1) // self.batch_size + 1}")
                 
                 await self._process_batch(batch)
-                
-                # Pausa entre batches para no saturar
-                await asyncio.sleep(1)
             
             # Resumen final
             logger.info("=" * 60)
@@ -87,6 +89,7 @@ class BookmarkImporter:
             logger.info(f"❌ Fallidos:       {self.stats['failed']}")
             logger.info(f"🔞 NSFW:           {self.stats['nsfw_detected']}")
             logger.info(f"🏠 Locales:        {self.stats['local_detected']}")
+            logger.info(scraper.latency.format_summary())
             logger.info("=" * 60)
             
             if self.stats["errors"]:
@@ -100,55 +103,151 @@ class BookmarkImporter:
             return self.stats
     
     async def _process_batch(self, batch: pd.DataFrame):
-        """Procesa un batch de bookmarks"""
+        """
+        Procesa un batch de bookmarks
+        
+        Primero crea los bookmarks nuevos y después los scrapea en paralelo con
+        scraper.scrape_many; cada resultado pasa a los agentes según termina.
+        
+        Los duplicados se detectan por la página final: con el mapa de
+        redirecciones (RedirectCache) un t.co y la URL a la que lleva cuentan
+        como el mismo bookmark. Contra la DB basta una consulta por batch al
+        índice único url_hash, y la inserción (también una por batch) usa
+        ON CONFLICT DO NOTHING para lo que otro proceso haya creado entretanto;
+        si una fila hace fallar el INSERT, el resto se inserta fila a fila.
+        """
+        rows = []
+        for _, row in batch.iterrows():
+            url = row['url']
+            # Validar y normalizar URL
+            is_valid, normalized_url, error = URLValidator.validate_and_normalize(url)
+            if not is_valid:
+                logger.warning(f"⚠️  URL inválida: {url} ({error})")
+                self.stats["failed"] += 1
+                self.stats["errors"].append(f"URL inválida: {url}")
+                continue
+            rows.append((normalized_url, row['title']))
+        
+        # Consulta en bloque: URL -> página final, y página final -> URLs que llevan a ella
+        redirects, sources = {}, {}
+        if scraper.redirects.enabled:
+            redirects = await scraper.redirects.lookup_many(url for url, _ in rows)
+        finals = {url: redirects[url]["final_url"] if url in redirects else url for url, _ in rows}
+        if scraper.redirects.enabled:
+            sources = await scraper.redirects.sources_many(set(finals.values()))
+        
+        # URL canónica de cada candidato (la URL, su destino y las URLs que
+        # llevan a él), para todo el batch de una vez
+        candidates = {url: {url, finals[url], *sources.get(finals[url], [])} for url, _ in rows}
+        all_urls = list(set().union(*candidates.values()))
+        canonical = dict(zip(all_urls, canonicalizer.clean_many(all_urls)))
+        
+        pending = []
+        for normalized_url, title in rows:
+            final_url = finals[normalized_url]
+            page_key = canonical[final_url].url_hash
+            if page_key in self.seen_pages:
+                logger.info(f"🔄 Duplicado (misma página en el CSV): {normalized_url} -> {final_url}")
+                self.stats["duplicates"] += 1
+                continue
+            self.seen_pages.add(page_key)
+            
+            hashes = {canonical[url].url_hash for url in candidates[normalized_url]}
+            pending.append((normalized_url, title, hashes))
+        
         async with get_db_context() as db:
-            for _, row in batch.iterrows():
-                url = row['url']
-                title = row['title']
-                
-                try:
-                    # Validar y normalizar URL
-                    is_valid, normalized_url, error = URLValidator.validate_and_normalize(url)
-                    
-                    if not is_valid:
-                        logger.warning(f"⚠️  URL inválida: {url} ({error})")
-                        self.stats["failed"] += 1
-                        self.stats["errors"].append(f"URL inválida: {url}")
-                        continue
-                    
-                    # Verificar duplicados
+            new_bookmarks: Dict[str, Bookmark] = {}
+            
+            try:
+                all_hashes = set().union(*(hashes for _, _, hashes in pending))
+                existing = set()
+                if all_hashes:
                     result = await db.execute(
-                        select(Bookmark).where(Bookmark.url == normalized_url)
+                        select(Bookmark.url_hash).where(Bookmark.url_hash.in_(all_hashes))
                     )
-                    existing = result.scalar_one_or_none()
-                    
-                    if existing:
+                    existing = set(result.scalars().all())
+                
+                values = []
+                for normalized_url, title, hashes in pending:
+                    if hashes & existing:
                         logger.info(f"🔄 Duplicado: {normalized_url}")
                         self.stats["duplicates"] += 1
                         continue
+                    values.append({
+                        "url": normalized_url,
+                        "original_title": title,
+                        "status": "pending",
+                        **canonical[normalized_url].columns(),
+                    })
+                
+                if values:
+                    created_ids = await self._insert_bookmarks(db, values)
                     
-                    # Crear bookmark inicial
-                    bookmark = Bookmark(
-                        url=normalized_url,
-                        original_title=title,
-                        status="pending"
+                    result = await db.execute(
+                        select(Bookmark).where(Bookmark.id.in_(created_ids)).order_by(Bookmark.id)
                     )
-                    
-                    db.add(bookmark)
-                    await db.commit()
-                    await db.refresh(bookmark)
-                    
-                    logger.info(f"✅ Bookmark creado: {bookmark.id} - {normalized_url}")
-                    
-                    # Procesar con agentes
-                    await self._process_bookmark(db, bookmark)
-                
-                except Exception as e:
-                    logger.error(f"❌ Error procesando {url}: {e}")
-                    self.stats["failed"] += 1
-                    self.stats["errors"].append(f"{url}: {str(e)}")
+                    for bookmark in result.scalars().all():
+                        logger.info(f"✅ Bookmark creado: {bookmark.id} - {bookmark.url}")
+                        new_bookmarks[bookmark.url] = bookmark
+                        canonicalizer.record(canonical[bookmark.url])
+            
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"❌ Error creando el batch ({len(pending)} URLs): {e}")
+                self.stats["failed"] += len(pending)
+                self.stats["errors"].append(f"batch: {str(e)}")
+            
+            # Scraping concurrente; los agentes procesan cada resultado al llegar
+            async for url, scraped in scraper.scrape_many(new_bookmarks.keys()):
+                await self._process_bookmark(db, new_bookmarks[url], scraped)
     
-    async def _process_bookmark(self, db, bookmark: Bookmark):
+    async def _insert_bookmarks(self, db, values: List[Dict]) -> List[int]:
+        """
+        INSERT ... ON CONFLICT DO NOTHING de las filas nuevas de un batch
+        
+        Una fila inválida tumba el INSERT multi-fila entero; en ese caso se
+        repite fila a fila para no perder los bookmarks válidos del batch.
+        
+        Returns:
+            Ids de los bookmarks creados (las filas en conflicto cuentan como
+            duplicadas y las que fallan como fallidas)
+        """
+        async def insert(rows: List[Dict]) -> List[int]:
+            result = await db.execute(
+                pg_insert(Bookmark)
+                .values(rows)
+                .on_conflict_do_nothing()
+                .returning(Bookmark.id)
+            )
+            created = list(result.scalars().all())
+            await db.commit()
+            self.stats["duplicates"] += len(rows) - len(created)
+            return created
+        
+        def failed(row: Dict, error: Exception):
+            logger.error(f"❌ Error creando bookmark {row['url']}: {error}")
+            self.stats["failed"] += 1
+            self.stats["errors"].append(f"{row['url']}: {str(error)}")
+        
+        try:
+            return await insert(values)
+        except Exception as e:
+            await db.rollback()
+            if len(values) == 1:
+                failed(values[0], e)
+                return []
+            logger.warning(f"⚠️  Falló el INSERT del batch ({len(values)} filas), reintentando fila a fila: {e}")
+        
+        created_ids = []
+        for row in values:
+            try:
+                created_ids += await insert([row])
+            except Exception as e:
+                await db.rollback()
+                failed(row, e)
+        return created_ids
+    
+    async def _process_bookmark(self, db, bookmark: Bookmark, scraped: Optional[Dict] = None):
         """Procesa un bookmark con los agentes"""
         try:
             # Marcar como procesando
@@ -158,7 +257,8 @@ class BookmarkImporter:
             # Procesar con orquestador
             result = await orchestrator.process_bookmark(
                 bookmark.url,
-                bookmark.original_title
+                bookmark.original_title,
+                scraped,
             )
             
             # Actualizar bookmark con resultados
@@ -172,12 +272,17 @@ class BookmarkImporter:
             bookmark.is_local = result.get("is_local", False)
             bookmark.domain = result.get("domain")
             bookmark.language = result.get("language")
+            bookmark.favicon_url = result.get("favicon_url")
             bookmark.word_count = result.get("word_count", 0)
             bookmark.embedding = result.get("embedding")
             bookmark.status = result.get("status", "failed")
             bookmark.error_message = result.get("error")
             bookmark.scraped_at = datetime.now()
             
+            # 429, timeouts, 5xx...: se reprograma para reprocess_failed.py
+            bookmark.next_attempt_at = scraper.retry_policy.next_attempt_at(scraped, 0)
+            bookmark.retry_count = 1 if bookmark.next_attempt_at is not None else 0
+            
             await db.commit()
             
             # Actualizar estadísticas
@@ -228,11 +333,11 @@ async def main():
     # Argumentos
     if len(sys.argv) < 2:
         logger.error("❌ Uso: python import_csv.py <archivo.csv> [batch_size]")
-        logger.info("Ejemplo: python import_csv.py data/bookmarks.csv 10")
+        logger.info("Ejemplo: python import_csv.py data/bookmarks.csv 50")
         sys.exit(1)
     
     csv_path = sys.argv[1]
-    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 50
     
     logger.info("🧠 Neural Bookmark Brain - Importador CSV")
     logger.info("=" * 60)
@@ -242,6 +347,8 @@ async def main():
         logger.info("🔧 Inicializando base de datos...")
         await init_db()
         logger.info("✅ Base de datos lista")
+        async with get_db_context() as db:
+            await scraper.learn_strategies(db)
         
         # Importar bookmarks
         importer = BookmarkImporter(csv_path, batch_size)
@@ -252,6 +359,10 @@ async def main():
     except Exception as e:
         logger.error(f"❌ Error fatal: {e}")
         sys.exit(1)
+    
+    finally:
+        canonicalizer.flush_stats()
+        await scraper.aclose()
 
 
 if __name__ == "__main__":
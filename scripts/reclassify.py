@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Reclasificación NSFW de los bookmarks guardados, sin pasar por el pipeline LLM
+
+Sin opciones indexa (y clasifica) las filas nuevas o modificadas desde la
+última pasada. Con --keyword / --domain añade la regla y sólo revisa las filas
+que contienen sus tokens (índice classifier_tokens). --full recorre la tabla
+entera, por ejemplo tras quitar keywords de NSFW_KEYWORDS.
+
+Las reglas añadidas aquí no se guardan: añádelas también a NSFW_KEYWORDS /
+NSFW_DOMAINS para que se apliquen a los bookmarks nuevos.
+
+Uso:
+    python scripts/reclassify.py [--full] [--keyword K ...] [--domain D ...] [--workers N]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Añadir directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from loguru import logger
+
+from app.database import get_db_context, init_db
+from app.services.reclassify import BulkReclassifier
+
+
+def log_stats(label: str, stats: dict):
+    logger.info(
+        f"   {label}: {stats['scanned']} filas, {stats['changed']} cambios "
+        f"(+{stats['flagged']} NSFW, -{stats['cleared']})"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Reclasificar NSFW en bloque")
+    parser.add_argument("--full", action="store_true", help="Reclasificar todas las filas")
+    parser.add_argument("--keyword", action="append", default=[], help="Keyword NSFW nueva (repetible)")
+    parser.add_argument("--domain", action="append", default=[], help="Dominio NSFW nuevo (repetible)")
+    parser.add_argument("--workers", type=int, help="Procesos de clasificación (defecto: CLASSIFIER_WORKERS)")
+    args = parser.parse_args()
+
+    logger.info("🧠 Neural Bookmark Brain - Reclasificación NSFW")
+    logger.info("=" * 60)
+
+    await init_db()
+    reclassifier = BulkReclassifier(workers=args.workers)
+    started = time.perf_counter()
+
+    try:
+        async with get_db_context() as db:
+            if args.full:
+                log_stats("completa", await reclassifier.reclassify(db))
+            else:
+                log_stats("índice", await reclassifier.refresh_index(db))
+
+            for keyword in args.keyword:
+                log_stats(f"keyword '{keyword}'", await reclassifier.add_keyword(db, keyword))
+            for domain in args.domain:
+                log_stats(f"dominio '{domain}'", await reclassifier.add_domain(db, domain))
+    finally:
+        reclassifier.close()
+
+    logger.info(f"✅ Terminado en {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Re-extracción de bookmarks desde el archivo WARC, sin volver a descargar
+
+Lee las respuestas archivadas (SCRAPER_WARC_ENABLED) y pasa cada una por la
+etapa de extracción del scraper y el Agente Archivista. Con --curate pasa por
+el orquestador completo (resumen, tags y embedding), igual que
+reprocess_failed.py.
+
+Si una URL aparece varias veces en el archivo gana la última respuesta.
+
+Uso:
+    python scripts/reextract_warc.py [ficheros_o_directorios ...] [--curate] [--limit N] [--dry-run]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+# Añadir directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.orm.attributes import flag_modified
+
+from app.agents import orchestrator
+from app.config import get_settings
+from app.database import get_db_context
+from app.models import Bookmark
+from app.services.scraper import scraper
+from app.services.warc import read_archive
+
+settings = get_settings()
+
+
+def apply_archivist(bookmark: Bookmark, res: Dict):
+    """Campos que produce la etapa de extracción (Archivista)"""
+    bookmark.clean_title = res.get("clean_title") or bookmark.original_title
+    bookmark.full_text = res.get("full_text")
+    bookmark.is_nsfw = bool(res.get("is_nsfw", False))
+    bookmark.nsfw_reason = res.get("nsfw_reason")
+    bookmark.language = res.get("language")
+    bookmark.favicon_url = res.get("favicon_url")
+    bookmark.word_count = int(res.get("word_count", 0) or 0)
+    bookmark.scraping_status = res.get("scraping_status")
+    bookmark.scraping_strategy = res.get("scraping_strategy")
+    bookmark.scraping_error_type = res.get("scraping_error_type")
+
+
+def apply_curation(bookmark: Bookmark, res: Dict):
+    """Campos del orquestador completo (Archivista + Curador)"""
+    apply_archivist(bookmark, res)
+    bookmark.summary = res.get("summary")
+    bookmark.tags = res.get("tags", []) or []
+    bookmark.category = res.get("category")
+    bookmark.embedding = res.get("embedding")
+    bookmark.curation_status = res.get("curation_status")
+    bookmark.curation_mode = res.get("curation_mode")
+    bookmark.confidence_score = res.get("confidence_score", 0.0)
+    bookmark.status = res.get("status", bookmark.status)
+    bookmark.error_message = res.get("error")
+    flag_modified(bookmark, "tags")
+
+
+async def reextract(paths: List[str], curate: bool, limit: int, dry_run: bool, batch_size: int = 50):
+    stats = Counter()
+    started = time.perf_counter()
+
+    async def extract(url: str, page: Dict, bookmark: Bookmark):
+        scraped = await scraper.replay(url, page)
+        stats["extracted" if scraped["success"] else "extraction_failed"] += 1
+        if dry_run or bookmark is None:
+            return
+        if curate:
+            res = await orchestrator.process_bookmark(url, bookmark.original_title, scraped)
+            apply_curation(bookmark, res)
+        else:
+            res = await orchestrator.archivist.process(url, bookmark.original_title, scraped)
+            apply_archivist(bookmark, res)
+        bookmark.scraped_at = datetime.now()
+        stats["updated"] += 1
+
+    async with get_db_context() as db:
+        batch: Dict[str, Dict] = {}
+
+        async def flush():
+            if not batch:
+                return
+            bookmarks = {}
+            if not dry_run:
+                rows = await db.execute(select(Bookmark).where(Bookmark.url.in_(list(batch))))
+                bookmarks = {b.url: b for b in rows.scalars().all()}
+                stats["not_in_db"] += len(batch) - len(bookmarks)
+            # La extracción va al pool (SCRAPER_EXTRACTION_WORKERS) en paralelo
+            await asyncio.gather(*(
+                extract(url, page, bookmarks.get(url))
+                for url, page in batch.items()
+            ))
+            if not dry_run:
+                await db.commit()
+            batch.clear()
+            logger.info(
+                f"  {stats['records']} registros, {stats['extracted']} extraídos, "
+                f"{stats['updated']} actualizados ({time.perf_counter() - started:.0f}s)"
+            )
+
+        for page in read_archive(paths):
+            if page["status_code"] != 200:
+                stats["skipped_status"] += 1
+                continue
+            if limit and stats["records"] >= limit:
+                break
+            stats["records"] += 1
+            url = page["bookmark_url"]
+            if url in batch:
+                # Misma URL dos veces en el lote: se procesa la anterior antes
+                await flush()
+            batch[url] = page
+            if len(batch) >= batch_size:
+                await flush()
+        await flush()
+
+    elapsed = time.perf_counter() - started
+    logger.info("=" * 60)
+    logger.info(
+        f"📊 RESUMEN: {stats['records']} registros en {elapsed:.1f}s "
+        f"({stats['records'] / elapsed if elapsed else 0:.1f}/s)"
+    )
+    logger.info(
+        f"   extraídos: {stats['extracted']}, sin texto: {stats['extraction_failed']}, "
+        f"actualizados: {stats['updated']}, sin bookmark: {stats['not_in_db']}, "
+        f"otros estados HTTP: {stats['skipped_status']}"
+    )
+    logger.info(f"   CPU de extracción: {scraper.extractor.get_stats()['cpu_seconds']:.1f}s")
+    logger.info("=" * 60)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Re-extraer bookmarks desde el archivo WARC")
+    parser.add_argument("paths", nargs="*", help=f"Ficheros .warc.gz o directorios (defecto: {settings.SCRAPER_WARC_DIR})")
+    parser.add_argument("--curate", action="store_true", help="Pasar también por el Curador (resumen, tags, embedding)")
+    parser.add_argument("--limit", type=int, help="Máximo de registros a procesar")
+    parser.add_argument("--dry-run", action="store_true", help="Sólo extraer, sin tocar la base de datos")
+    args = parser.parse_args()
+
+    paths = args.paths or [settings.SCRAPER_WARC_DIR]
+    logger.info(f"🗄️  Re-extracción desde {', '.join(paths)}")
+
+    try:
+        await reextract(paths, args.curate, args.limit, args.dry_run)
+    finally:
+        await scraper.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -7,29 +7,56 @@ import sys
 import argparse
 from pathlib import Path
 from loguru import logger
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import Dict, List
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from sqlalchemy import select, func, text
+from sqlalchemy import select, func, text, or_
 from sqlalchemy.orm.attributes import flag_modified
 from app.database import get_db_context, init_db
 from app.models import Bookmark
 from app.agents import orchestrator
+from app.services.scraper import scraper
+from app.services.url_cleaner import URLCleaner
 
 
-async def reprocess_failed_bookmarks(limit: int = None, batch_size: int = 5):
+async def _scraped_bookmarks(by_url: Dict[str, List[Bookmark]]):
+    """Scrapea cada URL una vez y entrega (bookmark, resultado) para cada fila con esa URL"""
+    async for url, scraped in scraper.scrape_many(by_url.keys()):
+        for bookmark in by_url[url]:
+            yield bookmark, scraped
+
+
+async def reprocess_failed_bookmarks(limit: int = None, batch_size: int = 20):
     """
-    Re-procesa bookmarks con status 'failed' o 'pending'.
-    Si se proporciona un limit, solo procesará esa cantidad.
+    Re-procesa bookmarks con status 'failed' o 'pending' y los reprogramados
+    (next_attempt_at) cuya hora ya ha pasado.
+    Prioridad: menos reintentos primero, luego los que más tiempo llevan
+    esperando. Si se proporciona un limit, solo procesará esa cantidad.
     """
     logger.info("🔄 Iniciando re-procesamiento resiliente...")
     
     async with get_db_context() as db:
+        # Estrategia de extracción que mejor funciona en cada dominio
+        await scraper.learn_strategies(db)
+        
         # 1. Construcción de la consulta con límite real en SQL
+        now = datetime.now(timezone.utc)
         query = select(Bookmark).where(
-            Bookmark.status.in_(['failed', 'pending'])
-        ).order_by(Bookmark.created_at)
+            or_(
+                Bookmark.status.in_(['failed', 'pending']),
+                Bookmark.next_attempt_at.isnot(None),
+            ),
+            or_(
+                Bookmark.next_attempt_at.is_(None),
+                Bookmark.next_attempt_at <= now,
+            ),
+        ).order_by(
+            func.coalesce(Bookmark.retry_count, 0),
+            Bookmark.next_attempt_at.asc().nullsfirst(),
+            Bookmark.created_at,
+        )
         
         if limit:
             query = query.limit(limit)
@@ -50,6 +77,7 @@ async def reprocess_failed_bookmarks(limit: int = None, batch_size: int = 5):
         processed = 0
         success_count = 0
         failed_count = 0
+        deferred_count = 0
         
         # 2. Bucle por batches (segmentando la lista ya limitada)
         for i in range(0, total, batch_size):
@@ -59,93 +87,124 @@ async def reprocess_failed_bookmarks(limit: int = None, batch_size: int = 5):
             
             logger.info(f"📦 Batch {current_batch_num}/{total_batches} (Tamaño: {len(batch)})")
             
+            # Estado intermedio para evitar colisiones (varias filas pueden
+            # compartir URL: todas se procesan con el mismo resultado)
+            by_url: Dict[str, List[Bookmark]] = {}
             for bookmark in batch:
-                try:
-                    logger.info(f"  🔄 Procesando [{processed + 1}/{total}]: ID {bookmark.id} - {bookmark.url[:50]}...")
+                by_url.setdefault(bookmark.url, []).append(bookmark)
+            previous_status = {bookmark.id: bookmark.status for bookmark in batch}
+            for bookmark in batch:
+                bookmark.status = "processing"
+            await db.commit()
+            unprocessed = {bookmark.id: bookmark for bookmark in batch}
+            
+            try:
+                # Scraping concurrente del batch; cada resultado se cura según llega
+                async for bookmark, scraped in _scraped_bookmarks(by_url):
+                    unprocessed.pop(bookmark.id, None)
+                    try:
+                        logger.info(f"  🔄 Procesando [{processed + 1}/{total}]: ID {bookmark.id} - {bookmark.url[:50]}...")
                     
-                    # Estado intermedio para evitar colisiones
-                    bookmark.status = "processing"
-                    await db.commit()
+                        # Llamada al orquestador
+                        res = await orchestrator.process_bookmark(
+                            bookmark.url,
+                            bookmark.original_title,
+                            scraped,
+                        )
                     
-                    # Llamada al orquestador
-                    res = await orchestrator.process_bookmark(
-                        bookmark.url,
-                        bookmark.original_title
-                    )
+                        # Actualización de campos
+                        bookmark.clean_title = res.get("clean_title") or bookmark.original_title
+                        bookmark.summary = res.get("summary")
+                        bookmark.full_text = res.get("full_text")
+                        bookmark.tags = res.get("tags", []) or []
+                        bookmark.category = res.get("category")
+                        bookmark.is_nsfw = bool(res.get("is_nsfw", False))
+                        bookmark.nsfw_reason = res.get("nsfw_reason")
+                        bookmark.is_local = bool(res.get("is_local", False))
+                        bookmark.domain = res.get("domain")
+                        bookmark.language = res.get("language")
+                        bookmark.favicon_url = res.get("favicon_url")
+                        bookmark.word_count = int(res.get("word_count", 0))
+                        bookmark.embedding = res.get("embedding")
+                        bookmark.status = res.get("status", "failed")
+                        bookmark.error_message = res.get("error")
+                        bookmark.scraped_at = datetime.now()
                     
-                    # Actualización de campos
-                    bookmark.clean_title = res.get("clean_title") or bookmark.original_title
-                    bookmark.summary = res.get("summary")
-                    bookmark.full_text = res.get("full_text")
-                    bookmark.tags = res.get("tags", []) or []
-                    bookmark.category = res.get("category")
-                    bookmark.is_nsfw = bool(res.get("is_nsfw", False))
-                    bookmark.nsfw_reason = res.get("nsfw_reason")
-                    bookmark.is_local = bool(res.get("is_local", False))
-                    bookmark.domain = res.get("domain")
-                    bookmark.language = res.get("language")
-                    bookmark.word_count = int(res.get("word_count", 0))
-                    bookmark.embedding = res.get("embedding")
-                    bookmark.status = res.get("status", "failed")
-                    bookmark.error_message = res.get("error")
-                    bookmark.scraped_at = datetime.now()
+                        # Fallos transitorios: se reprograman en lugar de esperar aquí
+                        retry_count = bookmark.retry_count or 0
+                        if scraped.get("success"):
+                            bookmark.next_attempt_at = None
+                            bookmark.retry_count = 0
+                        else:
+                            bookmark.next_attempt_at = scraper.retry_policy.next_attempt_at(scraped, retry_count)
+                            if bookmark.next_attempt_at is not None:
+                                bookmark.retry_count = retry_count + 1
+                                deferred_count += 1
                     
-                    # Campos de limpieza de URL
-                    bookmark.url_clean = res.get("url_clean") if res.get("url_clean") is not None else bookmark.url
-                    bookmark.tracking_params = res.get("tracking_params")
+                        # Campos de limpieza de URL (url_hash lo rellena backfill_url_keys.py)
+                        if bookmark.url_clean is None:
+                            keys = URLCleaner.bookmark_keys(bookmark.url)
+                            bookmark.url_clean = keys["url_clean"]
+                            bookmark.tracking_params = keys["tracking_params"]
                     
-                    # Forzar detección de cambios en SQLAlchemy
-                    flag_modified(bookmark, "url_clean")
-                    flag_modified(bookmark, "tracking_params")
-                    flag_modified(bookmark, "tags")
+                        # Forzar detección de cambios en SQLAlchemy
+                        flag_modified(bookmark, "tags")
                     
-                    await db.commit()
-                    processed += 1
+                        await db.commit()
+                        processed += 1
                     
-                    if res.get("success"):
-                        success_count += 1
-                        logger.info(f"    ✅ ÉXITO ID {bookmark.id}: {bookmark.category}")
-                    else:
-                        failed_count += 1
-                        logger.warning(f"    ❌ FALLO ID {bookmark.id}: {bookmark.error_message[:60]}")
+                        if res.get("success"):
+                            success_count += 1
+                            logger.info(f"    ✅ ÉXITO ID {bookmark.id}: {bookmark.category}")
+                        else:
+                            failed_count += 1
+                            logger.warning(f"    ❌ FALLO ID {bookmark.id}: {bookmark.error_message[:60]}")
                         
-                        # Inserción en tabla de fallidos (SQL puro para velocidad)
-                        try:
-                            await db.execute(text('''
-                                INSERT INTO failed_bookmarks 
-                                (url_original, url_clean, domain, failure_reason, error_message, word_count, processing_time, bookmark_id)
-                                VALUES (:url, :url_clean, :domain, :reason, :error, :words, :time, :bookmark_id)
-                            '''), {
-                                'url': bookmark.url,
-                                'url_clean': res.get('url_clean'),
-                                'domain': res.get('domain'),
-                                'reason': 'timeout' if 'timeout' in str(res.get('error','')).lower() else 'http_error',
-                                'error': res.get('error'),
-                                'words': res.get('word_count', 0),
-                                'time': res.get('processing_time', 0),
-                                'bookmark_id': bookmark.id
-                            })
-                            await db.commit()
-                        except Exception:
-                            await db.rollback() # Evitar que un error aquí rompa el bucle
+                            # Inserción en tabla de fallidos (SQL puro para velocidad)
+                            try:
+                                await db.execute(text('''
+                                    INSERT INTO failed_bookmarks 
+                                    (url_original, url_clean, domain, failure_reason, error_message, word_count, processing_time, bookmark_id)
+                                    VALUES (:url, :url_clean, :domain, :reason, :error, :words, :time, :bookmark_id)
+                                '''), {
+                                    'url': bookmark.url,
+                                    'url_clean': bookmark.url_clean,
+                                    'domain': res.get('domain'),
+                                    'reason': 'timeout' if 'timeout' in str(res.get('error','')).lower() else 'http_error',
+                                    'error': res.get('error'),
+                                    'words': res.get('word_count', 0),
+                                    'time': res.get('processing_time', 0),
+                                    'bookmark_id': bookmark.id
+                                })
+                                await db.commit()
+                            except Exception:
+                                await db.rollback() # Evitar que un error aquí rompa el bucle
                 
-                except Exception as e:
-                    logger.error(f"  ⚠️ Error crítico en bookmark {bookmark.id}: {str(e)}")
-                    bookmark.status = "failed"
-                    bookmark.error_message = str(e)
-                    await db.commit()
-                    failed_count += 1
-                    continue
-
-            # Pausa anti-bloqueo entre batches
-            if i + batch_size < total:
-                wait_time = 3
-                logger.info(f"⏳ Esperando {wait_time}s para el siguiente batch...")
-                await asyncio.sleep(wait_time)
+                    except Exception as e:
+                        logger.error(f"  ⚠️ Error crítico en bookmark {bookmark.id}: {str(e)}")
+                        bookmark.status = "failed"
+                        bookmark.error_message = str(e)
+                        await db.commit()
+                        failed_count += 1
+                        continue
+            finally:
+                # Si scrape_many falla a mitad, las filas sin procesar no se
+                # quedan en "processing" (el selector no las volvería a coger)
+                if unprocessed:
+                    try:
+                        await db.rollback()
+                        for bookmark in unprocessed.values():
+                            bookmark.status = previous_status[bookmark.id]
+                        await db.commit()
+                        logger.warning(f"  ↩️ {len(unprocessed)} bookmarks sin procesar vuelven a su estado anterior")
+                    except Exception as e:
+                        logger.error(f"  ⚠️ No se pudo restaurar el estado de {len(unprocessed)} bookmarks: {e}")
         
         # Resumen final
         logger.info("=" * 60)
         logger.info(f"📊 RESUMEN: {success_count} exitosos, {failed_count} fallidos de {total} intentados")
+        logger.info(f"⏳ Reprogramados por fallos transitorios: {deferred_count}")
+        logger.info(scraper.latency.format_summary())
         logger.info("=" * 60)
 
 
@@ -153,6 +212,10 @@ async def main():
     # 1. Configurar el lector de argumentos
     parser = argparse.ArgumentParser(description="Re-procesar marcadores fallidos")
     parser.add_argument('--limit', type=int, help='Cantidad máxima a procesar')
+    parser.add_argument('--cache-only', action='store_true',
+                        help='Usar sólo la caché de páginas, sin red (re-curación)')
+    parser.add_argument('--forget-dead-hosts', action='store_true',
+                        help='Vaciar la caché negativa de hosts caídos antes de empezar')
     
     # 2. Leer los argumentos de la terminal
     args = parser.parse_args()  # <--- AQUÍ ES DONDE SE DEFINE 'args'
@@ -160,12 +223,22 @@ async def main():
     logger.info("🧠 Neural Bookmark Brain - Re-procesamiento Resiliente")
     logger.info("=" * 60)
     
+    if args.forget_dead_hosts:
+        scraper.dead_hosts.clear_all()
+        logger.info("🧹 Caché negativa de hosts vaciada")
+    
+    if args.cache_only:
+        scraper.cache_mode = "only"
+        logger.info("💾 Modo sólo caché: las páginas sin copia local fallarán con cache_miss")
+    
     try:
         # 3. Pasar el límite a la función
         await reprocess_failed_bookmarks(limit=args.limit)
     except Exception as e:
         logger.error(f"❌ Error fatal: {e}")
+    finally:
+        await scraper.aclose()
 
 if __name__ == "__main__":
     import asyncio
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file
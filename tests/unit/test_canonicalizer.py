@@ -0,0 +1,107 @@
+# tests/unit/test_canonicalizer.py
+import json
+
+import pytest
+
+from app.services.canonicalizer import RulePack, URLCanonicalizer, url_hash
+
+
+@pytest.fixture
+def canonicalizer(tmp_path):
+    return URLCanonicalizer(packs_file="", stats_file=str(tmp_path / "url_stats.json"))
+
+
+class TestCanonicalize:
+    @pytest.mark.parametrize("url,expected", [
+        ("https://youtu.be/dQw4w9WgXcQ?si=abc&t=42", "https://www.youtube.com/watch?v=dQw4w9WgXcQ"),
+        ("https://m.youtube.com/watch?feature=share&v=dQw4w9WgXcQ", "https://www.youtube.com/watch?v=dQw4w9WgXcQ"),
+        ("https://www.youtube.com/shorts/dQw4w9WgXcQ", "https://www.youtube.com/watch?v=dQw4w9WgXcQ"),
+        ("https://www.google.com/amp/s/example.com/news/story/amp", "https://example.com/news/story"),
+        ("https://www.google.com/amp/s/example.com/news/story.amp.html", "https://example.com/news/story.html"),
+        ("https://example.com/news/story?amp=1", "https://example.com/news/story"),
+        ("https://en.m.wikipedia.org/wiki/Python#History", "https://en.wikipedia.org/wiki/Python"),
+        ("https://www.amazon.es/Cafetera/dp/B000123456/ref=sr_1_1?qid=1", "https://www.amazon.es/dp/B000123456"),
+        ("https://mobile.twitter.com/user/status/1?s=20", "https://x.com/user/status/1"),
+    ])
+    def test_rule_packs(self, canonicalizer, url, expected):
+        assert canonicalizer.canonicalize(url).url == expected
+
+    @pytest.mark.parametrize("url", [
+        "https://github.com/ampproject/amp",
+        "https://www.npmjs.com/package/amp",
+        "https://github.com/amp/tools",
+        "https://example.com/file.amp",
+        "https://example.com/news/story.amp.html",
+    ])
+    def test_amp_path_without_signal_is_kept(self, canonicalizer, url):
+        result = canonicalizer.canonicalize(url)
+
+        assert result.url == url
+        assert "amp" not in result.rules
+
+    def test_amp_param_with_other_value_is_kept(self, canonicalizer):
+        assert canonicalizer.canonicalize("https://example.com/search?amp=0").url == "https://example.com/search?amp=0"
+
+    def test_youtube_keep_params_only_on_watch(self, canonicalizer):
+        search = canonicalizer.canonicalize("https://www.youtube.com/results?search_query=python&utm_source=x")
+        other = canonicalizer.canonicalize("https://www.youtube.com/results?search_query=rust")
+
+        assert search.url == "https://www.youtube.com/results?search_query=python"
+        assert search.url != other.url
+        assert canonicalizer.canonicalize("https://www.youtube.com/watch?v=dQw4w9WgXcQ&feature=share").url == \
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+    def test_mobile_host_folds_to_desktop_key(self, canonicalizer):
+        assert canonicalizer.canonicalize("https://m.example.com/a").url == \
+            canonicalizer.canonicalize("https://example.com/a").url == "https://example.com/a"
+
+    @pytest.mark.parametrize("mobile, desktop", [
+        ("https://m.example.com/a", "https://www.example.com/a"),
+        ("https://m.bbc.co.uk/news/1", "https://www.bbc.co.uk/news/1"),
+        ("http://mobile.example.com/a", "https://example.com/a"),
+    ])
+    def test_mobile_and_desktop_share_hash(self, canonicalizer, mobile, desktop):
+        assert canonicalizer.canonicalize(mobile).url_hash == canonicalizer.canonicalize(desktop).url_hash
+
+    def test_www_alone_is_not_folded(self, canonicalizer):
+        assert url_hash("https://www.com/a") != url_hash("https://com/a")
+
+    def test_query_sorted_and_tracking_reported(self, canonicalizer):
+        result = canonicalizer.canonicalize("https://Example.com/p/?b=2&utm_source=x&a=1&fbclid=y")
+
+        assert result.url == "https://example.com/p?a=1&b=2"
+        assert result.tracking_params == {"utm_source": "x", "fbclid": "y"}
+
+    def test_spa_hash_route_is_kept(self, canonicalizer):
+        assert canonicalizer.canonicalize("https://app.example.com/#/settings").url == \
+            "https://app.example.com#/settings"
+        assert canonicalizer.canonicalize("https://example.com/doc#section").url == "https://example.com/doc"
+
+    def test_custom_pack(self, canonicalizer):
+        canonicalizer.add_pack(RulePack(name="docs", domains=("docs.example.org",), drop_params=frozenset({"lang"}), keep_fragment=True))
+
+        assert canonicalizer.canonicalize("https://docs.example.org/api?lang=es#auth").url == \
+            "https://docs.example.org/api#auth"
+
+    def test_clean_many_keeps_order(self, canonicalizer):
+        urls = ["https://a.io/?utm_source=x", "https://b.io", "https://a.io/?utm_source=x", None]
+
+        assert [r.url for r in canonicalizer.clean_many(urls)] == ["https://a.io", "https://b.io", "https://a.io", None]
+
+
+class TestCounters:
+    def test_record_flush_and_report(self, canonicalizer, tmp_path):
+        canonicalizer.record(canonicalizer.canonicalize("https://example.com/a?utm_source=x&gclid=1"))
+        canonicalizer.record(canonicalizer.canonicalize("https://m.example.com/b"))
+        canonicalizer.flush_stats()
+        canonicalizer.record(canonicalizer.canonicalize("https://example.com/c?utm_source=y"))
+
+        saved = json.loads((tmp_path / "url_stats.json").read_text())
+        assert saved["urls"] == 2
+
+        report = canonicalizer.report()
+        assert report["urls"] == 3
+        assert report["with_tracking"] == 2
+        assert report["top_params"][0] == ("utm_source", 2)
+        assert report["top_domains"] == [("example.com", 2)]
+        assert report["rules"] == {"mobile": 1}
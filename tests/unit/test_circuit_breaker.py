@@ -0,0 +1,60 @@
+# tests/unit/test_circuit_breaker.py
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def make_breaker(cooldown=300.0):
+    breaker = CircuitBreaker()
+    breaker.failure_threshold = 3
+    breaker.base_cooldown = cooldown
+    breaker.max_cooldown = 3600.0
+    return breaker
+
+
+class TestCircuitBreaker:
+    def test_rate_limit_opens_immediately(self):
+        breaker = make_breaker()
+        breaker.record("medium.com", "rate_limited")
+
+        assert breaker.status("medium.com")["state"] == OPEN
+        assert breaker.allow("medium.com") is False
+        assert breaker.allow("github.com") is True
+
+    def test_timeouts_need_threshold(self):
+        breaker = make_breaker()
+        breaker.record("slow.com", "timeout")
+        breaker.record("slow.com", "timeout")
+        assert breaker.allow("slow.com") is True
+
+        breaker.record("slow.com", "timeout")
+        assert breaker.allow("slow.com") is False
+
+    def test_host_answering_resets_failures(self):
+        breaker = make_breaker()
+        breaker.record("site.com", "bot_detection")
+        breaker.record("site.com", "http_error")  # un 404: el host contesta
+        breaker.record("site.com", "bot_detection")
+        assert breaker.status("site.com")["state"] == CLOSED
+
+    def test_half_open_allows_single_probe(self):
+        breaker = make_breaker(cooldown=0.0)
+        breaker.record("site.com", "rate_limited")
+
+        assert breaker.allow("site.com") is True  # prueba
+        assert breaker.status("site.com")["state"] == HALF_OPEN
+
+        breaker.record("site.com")
+        assert breaker.status("site.com")["state"] == CLOSED
+
+    def test_failed_probe_reopens_with_longer_cooldown(self):
+        breaker = make_breaker(cooldown=0.0)
+        breaker.base_cooldown = 10.0
+        breaker.record("site.com", "rate_limited")
+        breaker._circuits["site.com"].open_until = 0  # cool-down vencido
+
+        assert breaker.allow("site.com") is True
+        breaker.record("site.com", "rate_limited")
+
+        status = breaker.status("site.com")
+        assert status["state"] == OPEN
+        assert breaker._circuits["site.com"].cooldown == 20.0
+        assert breaker.hosts(state="open")[0]["domain"] == "site.com"
@@ -1,6 +1,7 @@
 # tests/unit/test_classifier.py
 import pytest
-from app.services.classifier import SafetyClassifier
+import re
+from app.services.classifier import KeywordMatcher, SafetyClassifier
 
 class TestSafetyClassifier:
     @pytest.fixture
@@ -16,6 +17,11 @@ class TestSafetyClassifier:
         assert is_nsfw is True
         assert "Dominio NSFW" in reason
     
+    def test_nsfw_domain_is_suffix_not_substring(self, classifier):
+        classifier.add_domain("sex.com")
+        assert classifier._check_domain("https://www.sex.com/x")[0] is True
+        assert classifier._check_domain("https://essex.com/news") == (False, None)
+    
     def test_nsfw_keyword_in_url(self, classifier):
         is_nsfw, reason = classifier.classify(
             url="https://example.com/adult/content",
@@ -41,4 +47,34 @@ class TestSafetyClassifier:
         
         # 2+ keywords sí
         is_nsfw, reason = classifier._check_text("This has adult and xxx content", "test")
-        assert is_nsfw is True
\ No newline at end of file
+        assert is_nsfw is True
+    
+    def test_add_keyword_rebuilds_matcher(self, classifier):
+        classifier.add_keyword("Phishing")
+        is_nsfw, reason = classifier.classify(url="https://example.com/phishing-kit")
+        assert is_nsfw is True
+        assert reason == "Keyword NSFW en URL: phishing"
+
+
+class TestKeywordMatcher:
+    def test_overlapping_keywords(self):
+        matcher = KeywordMatcher(["sex", "sex toys", "toys", "sexy"])
+        assert matcher.find_all("sex toys for sale") == ["sex", "sex toys", "toys"]
+        assert matcher.find_all("sussex sexyness") == []
+    
+    def test_same_result_as_one_regex_per_keyword(self):
+        keywords = ["ad", "adult", "adult content", "xxx", "cas", "casino", "no"]
+        text = "an adult content casino, not a cas-ino or xxx-rated ad"
+        expected = [k for k in keywords if re.search(r"\b" + re.escape(k) + r"\b", text)]
+        assert KeywordMatcher(keywords).find_all(text) == expected
+    
+    def test_index_tokens_cover_matching_rules(self):
+        keywords = ["sex toys", "18+", "adult"]
+        matcher = KeywordMatcher(keywords)
+        url, title, text = "https://shop.example.com/sex-toys", "Adult store", "18+ only"
+        tokens = set(SafetyClassifier.index_tokens(url, title, text))
+        
+        for keyword in matcher.find_all(f"{url.lower()} {title.lower()} {text.lower()}"):
+            assert set(SafetyClassifier.rule_tokens(keyword)) <= tokens
+        assert set(SafetyClassifier.rule_tokens("example.com")) <= tokens
+
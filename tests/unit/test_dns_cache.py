@@ -0,0 +1,122 @@
+# tests/unit/test_dns_cache.py
+import asyncio
+import socket
+import time
+import httpcore
+import pytest
+from app.services.dns_cache import CachingNetworkBackend, DNSCache, DeadHostCache, dns_failure
+
+
+class TestDNSCache:
+    @pytest.mark.asyncio
+    async def test_second_lookup_is_cached(self):
+        cache = DNSCache(ttl=60)
+        first = await cache.resolve("localhost", 80)
+        second = await cache.resolve("localhost", 80)
+
+        assert first == second
+        stats = cache.get_stats()
+        assert stats["misses"] == 1
+        assert stats["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_pinned_host_never_resolves(self):
+        cache = DNSCache(ttl=0)
+        cache.pin("Bench0.com", ["127.0.0.1"])
+
+        assert await cache.resolve("bench0.com", 80) == ["127.0.0.1"]
+        assert cache.get_stats()["misses"] == 0
+
+    def test_dns_failure_classification(self):
+        error = httpcore.ConnectError("nxdomain")
+        error.__cause__ = socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+        assert dns_failure(error) == "permanent"
+
+        error.__cause__ = socket.gaierror(socket.EAI_AGAIN, "Temporary failure")
+        assert dns_failure(error) == "transient"
+
+        assert dns_failure(httpcore.ConnectError("refused")) is None
+
+
+class FakeStream:
+    def __init__(self, address):
+        self.address = address
+        self.closed = False
+
+    async def aclose(self):
+        self.closed = True
+
+
+class FakeBackend:
+    """connect_tcp con un retraso por dirección (None = conexión rechazada)"""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.attempts = []
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        self.attempts.append(host)
+        if self.delays[host] is None:
+            raise httpcore.ConnectError(f"refused {host}")
+        await asyncio.sleep(self.delays[host])
+        return FakeStream(host)
+
+
+class TestHappyEyeballs:
+    @pytest.mark.asyncio
+    async def test_dead_address_does_not_stall_connection(self):
+        cache = DNSCache()
+        cache.pin("example.com", ["2001:db8::1", "2001:db8::2", "192.0.2.1"])
+        backend = FakeBackend({"2001:db8::1": 10, "2001:db8::2": 10, "192.0.2.1": 0.01})
+        network = CachingNetworkBackend(cache, backend, attempt_delay=0.05)
+
+        started = time.monotonic()
+        stream = await network.connect_tcp("example.com", 443, timeout=10)
+
+        assert stream.address == "192.0.2.1"
+        assert time.monotonic() - started < 1
+        # IPv6 e IPv4 alternadas: la IPv4 va segunda
+        assert backend.attempts == ["2001:db8::1", "192.0.2.1"]
+
+    @pytest.mark.asyncio
+    async def test_refused_address_starts_next_immediately(self):
+        cache = DNSCache()
+        cache.pin("example.com", ["2001:db8::1", "192.0.2.1"])
+        backend = FakeBackend({"2001:db8::1": None, "192.0.2.1": 0})
+        network = CachingNetworkBackend(cache, backend, attempt_delay=5)
+
+        started = time.monotonic()
+        stream = await network.connect_tcp("example.com", 443)
+
+        assert stream.address == "192.0.2.1"
+        assert time.monotonic() - started < 1
+
+    @pytest.mark.asyncio
+    async def test_all_addresses_failing_raises(self):
+        cache = DNSCache()
+        cache.pin("example.com", ["2001:db8::1", "192.0.2.1"])
+        backend = FakeBackend({"2001:db8::1": None, "192.0.2.1": None})
+        network = CachingNetworkBackend(cache, backend, attempt_delay=0.05)
+
+        with pytest.raises(httpcore.ConnectError):
+            await network.connect_tcp("example.com", 443)
+        assert len(backend.attempts) == 2
+
+
+class TestDeadHostCache:
+    def test_marked_host_persists_across_instances(self, tmp_path):
+        path = tmp_path / "dead_hosts.json"
+        DeadHostCache(path=str(path), cooldown=3600).mark("Dead.Example.com", "dns_error", "nxdomain")
+
+        entry = DeadHostCache(path=str(path), cooldown=3600).check("dead.example.com")
+        assert entry["error_type"] == "dns_error"
+
+    def test_expired_and_cleared_hosts(self, tmp_path):
+        cache = DeadHostCache(path=str(tmp_path / "dead.json"), cooldown=-1)
+        cache.mark("old.example.com", "connection_refused", "refused")
+        assert cache.check("old.example.com") is None
+
+        cache.cooldown = 3600
+        cache.mark("back.example.com", "dns_error", "nxdomain")
+        cache.clear("back.example.com")
+        assert cache.check("back.example.com") is None
@@ -0,0 +1,37 @@
+# tests/unit/test_domain_parser.py
+from app.services.domain_parser import DomainParser
+
+
+class TestDomainParser:
+    def test_registered_domain(self):
+        parser = DomainParser(suffix_list_file="")
+        parts = parser.parse("https://blog.example.co.uk/post?id=1")
+
+        assert (parts.subdomain, parts.domain, parts.suffix) == ("blog", "example", "co.uk")
+        assert parts.registered_domain == "example.co.uk"
+        assert parser.registered_domain("docs.python.org/3/") == "python.org"
+        assert parser.registered_domain("http://127.0.0.1:8000/admin") == "127.0.0.1"
+        assert parser.registered_domain("http://localhost:3000") == "localhost"
+
+    def test_memo_by_host(self):
+        parser = DomainParser(suffix_list_file="")
+        for path in ("a", "b", "c"):
+            parser.parse(f"https://www.example.com/{path}")
+
+        stats = parser.get_stats()
+        assert stats["misses"] == 1
+        assert stats["hits"] == 2
+        assert stats["psl"].startswith("tldextract-")
+
+    def test_parse_many_keeps_order(self):
+        parser = DomainParser(suffix_list_file="")
+        urls = ["https://a.github.com/x", "https://example.org", "https://b.github.com/y"]
+
+        assert parser.registered_domains(urls) == ["github.com", "example.org", "github.com"]
+        assert parser.get_stats()["misses"] == 3
+
+    def test_netloc(self):
+        assert DomainParser.netloc("http://user:pw@LocalHost:8080/x") == "localhost:8080"
+        assert DomainParser.netloc("https://[::1]:8443/") == "[::1]:8443"
+        assert DomainParser.netloc("example.com/path") == "example.com"
+        assert DomainParser.netloc("") == ""
@@ -0,0 +1,39 @@
+# tests/unit/test_domain_set.py
+from app.utils.domain_set import DomainSuffixSet
+
+
+class TestDomainSuffixSet:
+    def test_suffix_match_without_substring_false_positives(self):
+        domains = DomainSuffixSet(["sex.com", ".local", "*.example.org"])
+
+        assert domains.match("sex.com") == "sex.com"
+        assert domains.match("www.sex.com") == "sex.com"
+        assert domains.match("essex.com") is None
+        assert domains.match("sex.com.evil.net") is None
+        assert domains.match("printer.local") == "local"
+        assert domains.match("cdn.example.org.") == "example.org"
+
+    def test_ip_prefixes_and_networks(self):
+        domains = DomainSuffixSet(["127.0.0.1", "192.168", "10.0.0.0/8", "::1"])
+
+        assert domains.match("127.0.0.1") == "127.0.0.1"
+        assert domains.match("192.168.1.20") == "192.168"
+        assert domains.match("192.169.1.20") is None
+        assert domains.match("10.4.5.6") == "10.0.0.0/8"
+        assert domains.match("[::1]") == "::1"
+        assert domains.match("localhost:8080") is None
+
+    def test_load_file(self, tmp_path):
+        blocklist = tmp_path / "blocklist.txt"
+        blocklist.write_text(
+            "# comentario\n"
+            "bad.example\n"
+            "0.0.0.0 tracker.example ads.example  # formato hosts\n"
+            "\n"
+            "bad.example\n"
+        )
+        domains = DomainSuffixSet()
+
+        assert domains.load_file(blocklist) == 3
+        assert "www.ads.example" in domains
+        assert "0.0.0.0" not in domains
@@ -1,7 +1,9 @@
 # tests/unit/test_embeddings.py
+import asyncio
+
 import pytest
 import numpy as np
-from app.services.embeddings import EmbeddingService
+from app.services.embeddings import EmbeddingBatcher, EmbeddingService
 
 class TestEmbeddingService:
     @pytest.fixture
@@ -37,4 +39,80 @@ class TestEmbeddingService:
         embeddings = service.generate_batch_embeddings(texts)
         
         assert len(embeddings) == 3
-        assert all(len(emb) == service.dimension for emb in embeddings)
\ No newline at end of file
+        assert all(len(emb) == service.dimension for emb in embeddings)
+    
+    @pytest.mark.asyncio
+    async def test_embed_many_raises_on_encode_error(self, service):
+        class BrokenModel:
+            def encode(self, *args, **kwargs):
+                raise RuntimeError("boom")
+        
+        service._model = BrokenModel()
+        
+        with pytest.raises(RuntimeError):
+            await service.embed_many(["Text 1", "Text 2"])
+
+class TestEmbeddingBatcher:
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_encode(self):
+        calls = []
+
+        def encode(texts):
+            calls.append(list(texts))
+            return [[float(len(text))] for text in texts]
+
+        batcher = EmbeddingBatcher(encode, max_batch_size=8, max_wait_ms=20)
+        vectors = await asyncio.gather(*(batcher.submit("x" * n) for n in range(1, 6)))
+
+        assert vectors == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+        assert len(calls) == 1
+        stats = batcher.get_stats()
+        assert stats["batches"] == 1
+        assert stats["fill_ratio"] == round(5 / 8, 3)
+
+    @pytest.mark.asyncio
+    async def test_batches_are_capped(self):
+        calls = []
+
+        def encode(texts):
+            calls.append(len(texts))
+            return [[0.0] for _ in texts]
+
+        batcher = EmbeddingBatcher(encode, max_batch_size=2, max_wait_ms=20)
+        await asyncio.gather(*(batcher.submit("text") for _ in range(5)))
+
+        assert calls == [2, 2, 1]
+
+    @pytest.mark.asyncio
+    async def test_encode_error_reaches_every_caller(self):
+        def encode(texts):
+            raise RuntimeError("boom")
+
+        batcher = EmbeddingBatcher(encode, max_batch_size=4, max_wait_ms=5)
+        results = await asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True)
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert batcher.get_stats()["errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_missing_vectors_fail_the_whole_batch(self):
+        def encode(texts):
+            return [[0.0]]
+
+        batcher = EmbeddingBatcher(encode, max_batch_size=4, max_wait_ms=20)
+        results = await asyncio.wait_for(
+            asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True), 1
+        )
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    @pytest.mark.asyncio
+    async def test_aclose_stops_worker(self):
+        batcher = EmbeddingBatcher(lambda texts: [[0.0] for _ in texts], max_wait_ms=1)
+        await batcher.submit("a")
+        worker = batcher._worker
+
+        await batcher.aclose()
+
+        assert worker.done()
+        assert batcher.get_stats()["queued"] == 0
@@ -0,0 +1,92 @@
+# tests/unit/test_extraction.py
+import asyncio
+import time
+import pytest
+from app.services.extraction import (
+    ExtractionExecutor,
+    ExtractionTimeoutError,
+    extract_document,
+)
+
+SAMPLE_HTML = (
+    b'<html lang="es-ES"><head><title>Sample Page</title>'
+    b'<link rel="shortcut icon" href="/static/favicon.png">'
+    b"<script>var x = 1;</script></head>"
+    b"<body><p>First paragraph.</p><p>Second paragraph.</p></body></html>"
+)
+
+
+class TestExtractDocument:
+    def test_metadata_from_single_parse(self):
+        result = extract_document(SAMPLE_HTML, None, "https://example.com/post/1")
+        assert result["title"] == "Sample Page"
+        assert result["language"] == "es"
+        assert result["favicon_url"] == "https://example.com/static/favicon.png"
+
+    def test_fallback_text_skips_scripts(self):
+        result = extract_document(SAMPLE_HTML, with_main_content=False)
+        assert "First paragraph." in result["fallback_text"]
+        assert "var x" not in result["fallback_text"]
+        assert result["text"] is None
+
+    def test_meta_charset_without_header(self):
+        html = '<html><head><meta charset="iso-8859-1"><title>Café</title></head></html>'
+        result = extract_document(html.encode("iso-8859-1"))
+        assert result["title"] == "Café"
+
+    def test_empty_body(self):
+        assert extract_document(b"")["title"] is None
+
+
+class TestExtractionExecutor:
+    @pytest.fixture
+    def executor(self):
+        executor = ExtractionExecutor()
+        executor.kind = "thread"
+        yield executor
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_runs_extraction_in_pool(self, executor):
+        result = await executor.run(extract_document, SAMPLE_HTML, None, None, False)
+        assert result["title"] == "Sample Page"
+        assert executor.get_stats()["jobs"] == 1
+        assert "cpu_seconds" in executor.get_stats()
+
+    @pytest.mark.asyncio
+    async def test_job_timeout(self, executor):
+        executor.timeout = 0.1
+        with pytest.raises(ExtractionTimeoutError):
+            await executor.run(time.sleep, 0.5)
+        assert executor.get_stats()["timeouts"] == 1
+
+    @pytest.mark.asyncio
+    async def test_queue_wait_does_not_count_against_timeout(self, executor):
+        executor.max_workers = 1
+        executor.timeout = 0.3
+
+        # El segundo espera 0.2s a que quede libre el único worker
+        await asyncio.gather(executor.run(time.sleep, 0.2), executor.run(time.sleep, 0.2))
+
+        assert executor.get_stats()["timeouts"] == 0
+
+    @pytest.mark.asyncio
+    async def test_restart_does_not_fail_running_neighbours(self):
+        executor = ExtractionExecutor()
+        executor.kind = "process"
+        executor.max_workers = 2
+        executor.timeout = 1.0
+        try:
+            async def neighbour():
+                await asyncio.sleep(0.5)
+                return await executor.run(time.sleep, 0.8)
+
+            hung, result = await asyncio.gather(
+                executor.run(time.sleep, 5), neighbour(), return_exceptions=True
+            )
+
+            assert isinstance(hung, ExtractionTimeoutError)
+            assert result is None
+            assert executor.get_stats()["restarts"] == 1
+        finally:
+            executor.shutdown()
@@ -0,0 +1,96 @@
+# tests/unit/test_hedging.py
+import asyncio
+import pytest
+from app.services.hedging import HedgePolicy
+from app.services.scraper import ResilientScraper
+
+
+def make_policy(samples=(), min_samples=5):
+    policy = HedgePolicy()
+    policy.enabled = True
+    policy.min_samples = min_samples
+    policy.min_delay = 0.05
+    for seconds in samples:
+        policy.record("slow.example.com", seconds)
+    return policy
+
+
+class TestHedgePolicy:
+    def test_no_delay_without_history(self):
+        policy = make_policy(samples=[0.2] * 4)
+        assert policy.delay("slow.example.com") is None
+        assert policy.delay("other.example.com") is None
+
+    def test_delay_is_host_percentile(self):
+        policy = make_policy(samples=[0.2] * 19 + [25.0])
+        policy.percentile = 90
+        assert policy.delay("slow.example.com") == 0.2
+
+    def test_disabled_records_nothing(self):
+        policy = make_policy()
+        policy.enabled = False
+        policy.record("slow.example.com", 1.0)
+        assert policy.delay("slow.example.com") is None
+        assert policy.get_stats()["hosts_tracked"] == 0
+
+
+class TestHedgedFetch:
+    PAGE = {
+        "url": "https://slow.example.com/post",
+        "status_code": 200,
+        "content_type": "text/html",
+        "encoding": None,
+        "content": b"<html></html>",
+        "truncated": False,
+    }
+
+    @pytest.fixture
+    def scraper(self):
+        scraper = ResilientScraper()
+        scraper.hedging = make_policy(samples=[0.05] * 10)
+        scraper.rate_limiter.default_rate = 0.0
+        yield scraper
+        scraper.extractor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_hedge_wins_when_first_request_stalls(self, scraper, monkeypatch):
+        user_agents = []
+
+        async def fake_send(url, headers, timeout=None, progress=None):
+            user_agents.append(headers["User-Agent"])
+            if progress is not None:
+                progress.sent.set()
+            if len(user_agents) == 1:
+                await asyncio.sleep(5)
+            return dict(self.PAGE)
+
+        monkeypatch.setattr(scraper, "_send", fake_send)
+        headers = scraper.user_agent_rotator.get_realistic_headers()
+        page = await asyncio.wait_for(
+            scraper._fetch_hedged(self.PAGE["url"], headers, "example.com", 10.0), 2.0
+        )
+
+        assert page["hedge"] == "won"
+        assert len(user_agents) == 2
+        assert user_agents[0] != user_agents[1]
+        assert scraper.hedging.get_stats()["hedge_wins"] == 1
+
+    @pytest.mark.asyncio
+    async def test_hedge_skipped_without_host_capacity(self, scraper, monkeypatch):
+        scraper.http_pool.max_connections_per_host = 1
+        calls = []
+
+        async def fake_send(url, headers, timeout=None, progress=None):
+            calls.append(url)
+            if progress is not None:
+                progress.sent.set()
+            await asyncio.sleep(0.3)
+            return dict(self.PAGE)
+
+        monkeypatch.setattr(scraper, "_send", fake_send)
+        headers = scraper.user_agent_rotator.get_realistic_headers()
+        page = await scraper._fetch_hedged(self.PAGE["url"], headers, "example.com", 10.0)
+
+        assert "hedge" not in page
+        assert len(calls) == 1
+        assert scraper.hedging.get_stats()["skipped_no_capacity"] == 1
@@ -0,0 +1,42 @@
+# tests/unit/test_loop_monitor.py
+import asyncio
+import time
+
+import pytest
+
+from app.services.loop_monitor import LoopLagMonitor
+
+
+class TestLoopLagMonitor:
+    @pytest.mark.asyncio
+    async def test_blocking_call_is_measured(self):
+        monitor = LoopLagMonitor(interval_ms=10, stall_ms=50)
+        monitor.start()
+        await asyncio.sleep(0.05)
+
+        time.sleep(0.15)  # Código síncrono en el loop
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+        stats = monitor.get_stats()
+        assert stats["stalls"] >= 1
+        assert stats["lag_ms_max"] >= 100
+        assert stats["blocked_seconds"] >= 0.1
+
+    @pytest.mark.asyncio
+    async def test_work_in_executor_does_not_block(self):
+        monitor = LoopLagMonitor(interval_ms=10, stall_ms=50)
+        monitor.start()
+
+        await asyncio.get_running_loop().run_in_executor(None, time.sleep, 0.15)
+        await monitor.stop()
+
+        assert monitor.get_stats()["stalls"] == 0
+
+    def test_reset(self):
+        monitor = LoopLagMonitor(interval_ms=10, stall_ms=50)
+        monitor.record(0.2)
+        monitor.reset()
+
+        assert monitor.get_stats()["samples"] == 0
+        assert monitor.get_stats()["lag_ms_max"] == 0.0
@@ -0,0 +1,57 @@
+# tests/unit/test_page_cache.py
+import pytest
+from app.services.page_cache import PageCache, normalize_cache_key
+
+
+def make_page(content: bytes, etag=None):
+    return {
+        "url": "https://example.com/post",
+        "status_code": 200,
+        "content_type": "text/html",
+        "encoding": "utf-8",
+        "content": content,
+        "truncated": False,
+        "etag": etag,
+        "last_modified": None,
+    }
+
+
+class TestNormalizeCacheKey:
+    def test_equivalent_urls_share_key(self):
+        assert normalize_cache_key("HTTPS://Example.com:443/post/?b=2&a=1&utm_source=x#top") == \
+            normalize_cache_key("https://example.com/post?a=1&b=2")
+
+
+class TestPageCache:
+    @pytest.mark.asyncio
+    async def test_roundtrip_with_extraction(self, tmp_path):
+        cache = PageCache(directory=str(tmp_path))
+        await cache.put("https://example.com/post", make_page(b"<html>hola</html>", etag='"v1"'),
+                        {"success": True, "strategy": "trafilatura_retry", "text": "hola"})
+
+        entry = await cache.get("https://example.com/post/")
+        assert entry["content"] == b"<html>hola</html>"
+        assert entry["extraction"]["strategy"] == "trafilatura_retry"
+        assert PageCache.conditional_headers(entry) == {"If-None-Match": '"v1"'}
+        cache.close()
+
+    @pytest.mark.asyncio
+    async def test_identical_bodies_are_stored_once(self, tmp_path):
+        cache = PageCache(directory=str(tmp_path))
+        await cache.put("https://a.com/1", make_page(b"same body"))
+        await cache.put("https://b.com/2", make_page(b"same body"))
+
+        stats = cache.get_stats()
+        assert stats["entries"] == 2
+        assert len(list((tmp_path / "bodies").rglob("*.gz"))) == 1
+        cache.close()
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction(self, tmp_path):
+        cache = PageCache(directory=str(tmp_path), max_bytes=1)
+        await cache.put("https://a.com/old", make_page(b"old page"))
+        await cache.put("https://a.com/new", make_page(b"new page"))
+
+        assert await cache.get("https://a.com/old") is None
+        assert cache.get_stats()["evictions"] >= 1
+        cache.close()
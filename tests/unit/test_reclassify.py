@@ -0,0 +1,40 @@
+# tests/unit/test_reclassify.py
+import pytest
+from app.services.classifier import SafetyClassifier
+from app.services.reclassify import BulkReclassifier
+
+
+class TestBulkReclassifier:
+    ROWS = [
+        ("https://example.com/casino-guide", "Casino", None),
+        ("https://blog.example.org/post", "Clean Article", "Nothing to see here."),
+        ("https://cdn.badsite.com/x", "Images", ""),
+        ("https://example.net/a", "Poker night", "casino and gambling tips"),
+    ] * 100
+
+    def _classifier(self):
+        return SafetyClassifier(
+            keywords=["casino", "gambling"],
+            domains=["badsite.com"],
+            domains_file="",
+        )
+
+    @pytest.mark.asyncio
+    async def test_process_pool_matches_in_process(self):
+        in_process = BulkReclassifier(self._classifier(), workers=1)
+        pooled = BulkReclassifier(self._classifier(), workers=2)
+        pooled.chunk_size = 50
+        try:
+            expected = await in_process.classify_many(self.ROWS)
+            verdicts = await pooled.classify_many(self.ROWS)
+        finally:
+            pooled.close()
+
+        assert verdicts == expected
+        assert [v[:2] for v in verdicts[:4]] == [
+            (True, "Keyword NSFW en URL: casino"),
+            (False, None),
+            (True, "Dominio NSFW: badsite.com"),
+            (True, "Keywords NSFW en contenido: casino, gambling"),
+        ]
+        assert "badsite" in verdicts[2][2]
@@ -0,0 +1,55 @@
+# tests/unit/test_redirect_cache.py
+import pytest
+from app.services.redirect_cache import RedirectCache
+
+
+class TestRedirectCache:
+    @pytest.mark.asyncio
+    async def test_record_and_lookup(self, tmp_path):
+        cache = RedirectCache(path=str(tmp_path / "redirects.sqlite3"))
+        await cache.record("https://t.co/abc", "https://example.com/post", hops=2, permanent=True)
+
+        found = await cache.lookup("https://t.co/abc?utm_source=x")
+        assert found == {"final_url": "https://example.com/post", "hops": 2}
+        assert await cache.lookup("https://t.co/other") is None
+        cache.close()
+
+    @pytest.mark.asyncio
+    async def test_no_redirect_not_stored(self, tmp_path):
+        cache = RedirectCache(path=str(tmp_path / "redirects.sqlite3"))
+        await cache.record("https://example.com/a", "https://example.com/a#top", hops=1, permanent=True)
+        await cache.record("https://example.com/b", "https://example.com/c", hops=0, permanent=True)
+
+        assert await cache.lookup_many(["https://example.com/a", "https://example.com/b"]) == {}
+        cache.close()
+
+    @pytest.mark.asyncio
+    async def test_bulk_queries(self, tmp_path):
+        cache = RedirectCache(path=str(tmp_path / "redirects.sqlite3"))
+        await cache.record("https://t.co/1", "https://example.com/post", hops=1, permanent=True)
+        await cache.record("https://bit.ly/2", "https://example.com/post", hops=1, permanent=False)
+
+        found = await cache.lookup_many(["https://t.co/1", "https://bit.ly/2", "https://other.com"])
+        assert {url: r["final_url"] for url, r in found.items()} == {
+            "https://t.co/1": "https://example.com/post",
+            "https://bit.ly/2": "https://example.com/post",
+        }
+
+        sources = await cache.sources_many(["https://example.com/post"])
+        assert sorted(sources["https://example.com/post"]) == ["https://bit.ly/2", "https://t.co/1"]
+        cache.close()
+
+    @pytest.mark.asyncio
+    async def test_expiry_and_invalidate(self, tmp_path):
+        cache = RedirectCache(path=str(tmp_path / "redirects.sqlite3"))
+        cache.temp_ttl = -1  # las temporales caducan al instante
+        await cache.record("https://a.com/tmp", "https://b.com/x", hops=1, permanent=False)
+        await cache.record("https://a.com/perm", "https://b.com/y", hops=1, permanent=True)
+
+        assert await cache.lookup("https://a.com/tmp") is None
+        assert await cache.lookup("https://a.com/perm") is not None
+
+        await cache.invalidate("https://a.com/perm")
+        assert await cache.lookup("https://a.com/perm") is None
+        assert cache.get_stats()["invalidations"] == 1
+        cache.close()
@@ -0,0 +1,82 @@
+# tests/unit/test_retry_policy.py
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from app.services.retry_policy import (
+    LatencyTracker,
+    RetryBudget,
+    RetryPolicy,
+    parse_retry_after,
+)
+
+
+def make_budget(max_attempts=3, deadline=60.0):
+    return RetryBudget(
+        max_attempts=max_attempts,
+        deadline=deadline,
+        backoff_base=1.0,
+        backoff_max=10.0,
+        request_timeout=30.0,
+    )
+
+
+class TestRetryBudget:
+    def test_attempts_are_shared(self):
+        budget = make_budget(max_attempts=2)
+        assert budget.next_attempt() == 1
+        assert budget.next_attempt() == 2
+        assert budget.can_attempt() is False
+        assert budget.backoff(2) is None
+
+    def test_backoff_is_jittered_and_capped(self):
+        budget = make_budget(max_attempts=10)
+        budget.next_attempt()
+        delays = [budget.backoff(6) for _ in range(50)]
+        assert all(0 <= d <= 10.0 for d in delays)
+        assert len(set(delays)) > 1
+
+    def test_backoff_respects_deadline(self):
+        budget = make_budget(deadline=0.5)
+        budget.next_attempt()
+        assert budget.backoff(1) is None
+        assert budget.attempt_timeout() <= 0.5
+
+
+class TestRequeue:
+    def test_parse_retry_after(self):
+        assert parse_retry_after("120") == 120.0
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("soon") is None
+        when = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=600), usegmt=True)
+        assert 590 <= parse_retry_after(when) <= 600
+
+    def test_retry_after_wins_over_backoff(self):
+        policy = RetryPolicy()
+        policy.requeue_max_delay = 3600.0
+        assert policy.requeue_delay(0, retry_after=90.0) == 90.0
+        assert policy.requeue_delay(0, retry_after=90000.0) == 3600.0
+
+    def test_next_attempt_only_for_transient_failures(self):
+        policy = RetryPolicy()
+        policy.requeue_max_retries = 2
+        transient = {"success": False, "retryable": True, "retry_after": 60.0}
+
+        scheduled = policy.next_attempt_at(transient, retry_count=0)
+        assert scheduled > datetime.now(timezone.utc) + timedelta(seconds=55)
+        assert policy.next_attempt_at(transient, retry_count=2) is None
+        assert policy.next_attempt_at({"success": False, "retryable": False}, 0) is None
+        assert policy.next_attempt_at({"success": True}, 0) is None
+
+
+class TestLatencyTracker:
+    def test_percentiles(self):
+        tracker = LatencyTracker()
+        for i in range(101):
+            tracker.record(i / 10, success=i % 10 != 0)
+
+        summary = tracker.summary()
+        assert summary["count"] == 101
+        assert summary["failures"] == 11
+        assert summary["p50"] == 5.0
+        assert summary["p99"] == 9.9
+        assert summary["max"] == 10.0
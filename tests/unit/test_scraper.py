@@ -0,0 +1,366 @@
+# tests/unit/test_scraper.py
+import asyncio
+import time
+import httpx
+import pytest
+from app.services.scraper import (
+    BotDetectionError,
+    ContentRejectedError,
+    RateLimitError,
+    ResilientScraper,
+)
+from app.services.http_pool import HTTPClientPool
+from app.services.rate_limiter import DomainRateLimiter, TokenBucket
+from app.services.scheduler import HostFairQueue
+from app.services.dns_cache import DeadHostCache
+from app.services.redirect_cache import RedirectCache
+
+
+class TestHTTPClientPool:
+    @pytest.mark.asyncio
+    async def test_client_is_reused(self):
+        pool = HTTPClientPool()
+        client1 = pool.get_client()
+        client2 = pool.get_client()
+        assert client1 is client2
+        await pool.aclose()
+        assert client1.is_closed
+
+    @pytest.mark.asyncio
+    async def test_host_slot_limits_concurrency(self):
+        pool = HTTPClientPool()
+        pool.max_connections_per_host = 2
+        in_flight = 0
+        peak = 0
+
+        async def fake_request():
+            nonlocal in_flight, peak
+            async with pool.host_slot("https://example.com/page"):
+                in_flight += 1
+                peak = max(peak, in_flight)
+                await asyncio.sleep(0.01)
+                in_flight -= 1
+
+        await asyncio.gather(*(fake_request() for _ in range(6)))
+        assert peak == 2
+
+    def test_stats_without_requests(self):
+        stats = HTTPClientPool().get_stats()
+        assert stats["requests"] == 0
+        assert stats["reuse_ratio"] == 0.0
+        assert stats["active_connections"] == 0
+
+
+class TestResilientScraper:
+    def test_stats_include_connection_pool(self):
+        scraper = ResilientScraper()
+        assert "connection_pool" in scraper.get_stats()
+
+
+class TestDomainRateLimiter:
+    @pytest.mark.asyncio
+    async def test_token_bucket_burst(self):
+        bucket = TokenBucket(rate=10, burst=2)
+        assert bucket.try_acquire() is True
+        assert bucket.try_acquire() is True
+        assert bucket.try_acquire() is False
+
+    @pytest.mark.asyncio
+    async def test_different_domains_do_not_wait(self):
+        limiter = DomainRateLimiter()
+        limiter.default_rate = 1.0  # 1 petición/s por dominio
+
+        start = time.monotonic()
+        await asyncio.gather(*(limiter.acquire(f"host{i}.com") for i in range(5)))
+        assert time.monotonic() - start < 0.5
+
+    @pytest.mark.asyncio
+    async def test_same_domain_is_paced(self):
+        limiter = DomainRateLimiter()
+        limiter.default_rate = 10.0
+
+        start = time.monotonic()
+        for _ in range(3):
+            await limiter.acquire("example.com")
+        assert time.monotonic() - start >= 0.18
+
+
+class TestScrapeMany:
+    @pytest.mark.asyncio
+    async def test_host_fair_queue_round_robin(self):
+        urls = [f"https://a.com/{i}" for i in range(3)] + ["https://b.com/1"]
+        queue = HostFairQueue(urls, key_func=lambda u: u.split("/")[2], per_host_limit=1)
+
+        first = await queue.get()
+        second = await queue.get()
+        assert first == ("a.com", "https://a.com/0")
+        assert second == ("b.com", "https://b.com/1")
+
+    @pytest.mark.asyncio
+    async def test_yields_every_url_once(self, monkeypatch):
+        scraper = ResilientScraper()
+
+        async def fake_scrape(url):
+            await asyncio.sleep(0.01)
+            return {"success": True, "text": url}
+
+        monkeypatch.setattr(scraper, "scrape_url", fake_scrape)
+        urls = [f"https://site{i % 3}.com/{i}" for i in range(9)]
+
+        results = [item async for item in scraper.scrape_many(urls, concurrency=4)]
+
+        assert sorted(url for url, _ in results) == sorted(urls)
+        assert all(result["text"] == url for url, result in results)
+
+
+class TestStrategyChain:
+    HTML = b"<html><head><title>Short</title></head><body><p>Only a short line.</p></body></html>"
+
+    @pytest.fixture
+    def scraper(self, tmp_path):
+        scraper = ResilientScraper()
+        scraper.extractor.kind = "thread"
+        scraper.cache_mode = "off"
+        scraper.dead_hosts = DeadHostCache(path=str(tmp_path / "dead_hosts.json"))
+        scraper.redirects = RedirectCache(path=str(tmp_path / "redirects.sqlite3"))
+        scraper.retry_policy.backoff_base = 0.01
+        yield scraper
+        scraper.extractor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_fallback_reuses_fetched_body(self, scraper, monkeypatch):
+        fetches = []
+
+        async def fake_fetch(url, headers, domain="", timeout=None):
+            fetches.append(url)
+            return {
+                "url": url,
+                "status_code": 200,
+                "content_type": "text/html",
+                "encoding": None,
+                "content": self.HTML,
+                "truncated": False,
+            }
+
+        monkeypatch.setattr(scraper, "_fetch_once", fake_fetch)
+        result = await scraper.scrape_url("https://example.com/post")
+
+        assert result["success"] is True
+        assert result["strategy"] == "html_text"
+        assert len(fetches) == 1
+        assert [step["strategy"] for step in result["strategy_trace"]] == [
+            "fetch", "trafilatura_retry", "html_text"
+        ]
+        assert {step["fetch"] for step in result["strategy_trace"]} == {1}
+
+    @pytest.mark.asyncio
+    async def test_bot_detection_refetches_once(self, scraper, monkeypatch):
+        fetches = []
+
+        async def fake_fetch(url, headers, domain="", timeout=None):
+            fetches.append(headers["User-Agent"])
+            raise BotDetectionError("403")
+
+        monkeypatch.setattr(scraper, "_fetch_once", fake_fetch)
+        result = await scraper.scrape_url("https://example.com/post")
+
+        assert result["error_type"] == "bot_detection"
+        assert len(fetches) == 2
+        assert result["attempts"] == 2
+
+    @pytest.mark.asyncio
+    async def test_slow_drip_body_respects_url_deadline(self, scraper, monkeypatch):
+        scraper.retry_policy.deadline = 0.3
+
+        async def fake_fetch(url, headers, domain="", timeout=None):
+            # Cada trozo llega antes del timeout de lectura de httpx
+            for _ in range(50):
+                await asyncio.sleep(0.1)
+            return {"url": url, "status_code": 200, "content": b"", "encoding": None}
+
+        monkeypatch.setattr(scraper, "_fetch_once", fake_fetch)
+        started = time.monotonic()
+        result = await scraper.scrape_url("https://example.com/slow")
+
+        assert result["error_type"] == "timeout"
+        assert time.monotonic() - started < 1.5
+
+    @pytest.mark.asyncio
+    async def test_dead_host_fails_without_fetching(self, scraper, monkeypatch):
+        scraper.dead_hosts.mark("gone.example.com", "dns_error", "nxdomain")
+        fetches = []
+
+        async def fake_fetch(url, headers, domain="", timeout=None):
+            fetches.append(url)
+
+        monkeypatch.setattr(scraper, "_fetch_once", fake_fetch)
+        result = await scraper.scrape_url("https://gone.example.com/post")
+
+        assert result["error_type"] == "dns_error"
+        assert fetches == []
+
+    @pytest.mark.asyncio
+    async def test_client_error_is_not_refetched(self, scraper, monkeypatch):
+        fetches = []
+
+        async def fake_fetch(url, headers, domain="", timeout=None):
+            fetches.append(url)
+            request = httpx.Request("GET", url)
+            response = httpx.Response(404, request=request)
+            raise httpx.HTTPStatusError("404", request=request, response=response)
+
+        monkeypatch.setattr(scraper, "_fetch_once", fake_fetch)
+        result = await scraper.scrape_url("https://example.com/missing")
+
+        assert result["error_type"] == "http_error"
+        assert len(fetches) == 1
+        assert result["retryable"] is False
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_is_deferred_not_slept(self, scraper, monkeypatch):
+        fetches = []
+
+        async def fake_fetch(url, headers, domain="", timeout=None):
+            fetches.append(url)
+            raise RateLimitError("429", retry_after=120.0)
+
+        monkeypatch.setattr(scraper, "_fetch_once", fake_fetch)
+        result = await scraper.scrape_url("https://example.com/post")
+
+        assert result["error_type"] == "rate_limited"
+        assert len(fetches) == 1
+        assert result["retryable"] is True
+        assert result["retry_after"] == 120.0
+        assert result["strategy_trace"][-1]["outcome"] == "deferred"
+
+    @pytest.mark.asyncio
+    async def test_known_redirect_jumps_to_final_url(self, scraper, monkeypatch):
+        fetches = []
+
+        async def fake_fetch(url, headers, domain="", timeout=None):
+            fetches.append(url)
+            return {
+                "url": "https://example.com/post",
+                "status_code": 200,
+                "content_type": "text/html",
+                "encoding": None,
+                "content": self.HTML,
+                "truncated": False,
+                "redirect_hops": 0 if url == "https://example.com/post" else 1,
+                "redirect_permanent": True,
+            }
+
+        monkeypatch.setattr(scraper, "_fetch_once", fake_fetch)
+        first = await scraper.scrape_url("https://t.co/abc")
+        second = await scraper.scrape_url("https://t.co/abc")
+
+        assert fetches == ["https://t.co/abc", "https://example.com/post"]
+        assert first["final_url"] == second["final_url"] == "https://example.com/post"
+        assert second["domain"] == "example.com"
+        assert second["strategy_trace"][0]["strategy"] == "redirect_cache"
+
+    @pytest.mark.asyncio
+    async def test_learned_strategy_skips_trafilatura(self, scraper, monkeypatch):
+        parses = []
+
+        async def fake_fetch(url, headers, domain="", timeout=None):
+            return {
+                "url": url,
+                "status_code": 200,
+                "content_type": "text/html",
+                "encoding": None,
+                "content": self.HTML,
+                "truncated": False,
+            }
+
+        async def fake_run(func, content, encoding, url, main_content=True):
+            parses.append(main_content)
+            return {
+                "text": None,
+                "fallback_text": "Only a short line.",
+                "title": "Short",
+                "language": None,
+                "favicon_url": None,
+            }
+
+        monkeypatch.setattr(scraper, "_fetch_once", fake_fetch)
+        monkeypatch.setattr(scraper.extractor, "run", fake_run)
+        scraper.strategy_preferences.enabled = True
+        scraper.strategy_preferences.explore_rate = 0.0
+        scraper.strategy_preferences.seed([("example.com", "html_text")] * 10)
+
+        result = await scraper.scrape_url("https://app.example.com/page")
+
+        assert result["strategy"] == "html_text"
+        assert parses == [False]
+        assert result["strategy_trace"][-2]["outcome"] == "preferred"
+        # html_text no tiene umbral: ganar como preferida no cuenta
+        assert len(scraper.strategy_preferences._history["example.com"]) == 10
+
+    @pytest.mark.asyncio
+    async def test_learn_strategies_maps_legacy_names(self, scraper):
+        class Rows:
+            def all(self):
+                return [("https://x.com/status/1", "beautifulsoup")] * 20
+
+        class Session:
+            async def execute(self, *args, **kwargs):
+                return Rows()
+
+        scraper.strategy_preferences.enabled = True
+        scraper.strategy_preferences.explore_rate = 0.0
+
+        assert await scraper.learn_strategies(Session()) == 1
+        preferred = scraper.strategy_preferences.preferred("x.com")
+        assert preferred == "html_text"
+        assert [s.name for s in scraper.strategies.plan(preferred)] == ["html_text", "trafilatura_retry"]
+
+    @pytest.mark.asyncio
+    async def test_learn_strategies_error_is_not_fatal(self, scraper):
+        class BrokenSession:
+            rolled_back = False
+
+            async def execute(self, *args, **kwargs):
+                raise RuntimeError("relation bookmarks does not exist")
+
+            async def rollback(self):
+                self.rolled_back = True
+
+        scraper.strategy_preferences.enabled = True
+        db = BrokenSession()
+
+        assert await scraper.learn_strategies(db) == 0
+        assert db.rolled_back is True
+
+
+class TestStreamingBody:
+    @pytest.mark.asyncio
+    async def test_html_is_truncated_at_cap(self):
+        scraper = ResilientScraper()
+        scraper.max_body_bytes = 10
+        response = httpx.Response(200, headers={"content-type": "text/html; charset=utf-8"}, content=b"x" * 100)
+
+        page = await scraper._read_body(response)
+
+        assert page["truncated"] is True
+        assert len(page["content"]) == 10
+        assert page["encoding"] == "utf-8"
+
+    @pytest.mark.asyncio
+    async def test_non_html_is_rejected(self):
+        scraper = ResilientScraper()
+        response = httpx.Response(200, headers={"content-type": "video/mp4"}, content=b"\x00" * 100)
+
+        with pytest.raises(ContentRejectedError) as exc:
+            await scraper._read_body(response)
+        assert exc.value.error_type == "non_html_content"
+
+    @pytest.mark.asyncio
+    async def test_oversized_pdf_is_rejected(self):
+        scraper = ResilientScraper()
+        scraper.max_document_bytes = 10
+        response = httpx.Response(200, headers={"content-type": "application/pdf"}, content=b"%PDF" * 10)
+
+        with pytest.raises(ContentRejectedError) as exc:
+            await scraper._read_body(response)
+        assert exc.value.error_type == "content_too_large"
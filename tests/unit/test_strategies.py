@@ -0,0 +1,73 @@
+# tests/unit/test_strategies.py
+from app.services.strategies import (
+    DomainStrategyPreferences,
+    ExtractionStrategy,
+    StrategyRegistry,
+)
+
+
+class TestStrategyRegistry:
+    def test_default_order(self):
+        registry = StrategyRegistry()
+        assert [s.name for s in registry.plan()] == ["trafilatura_retry", "html_text"]
+
+    def test_preferred_goes_first(self):
+        registry = StrategyRegistry()
+        assert [s.name for s in registry.plan("html_text")] == ["html_text", "trafilatura_retry"]
+        assert [s.name for s in registry.plan("unknown")] == ["trafilatura_retry", "html_text"]
+
+    def test_legacy_name_is_an_alias(self):
+        registry = StrategyRegistry()
+
+        assert registry.canonical_name("beautifulsoup") == "html_text"
+        assert [s.name for s in registry.plan("beautifulsoup")] == ["html_text", "trafilatura_retry"]
+
+    def test_register_before(self):
+        registry = StrategyRegistry()
+        registry.register(
+            ExtractionStrategy("og_description", "description", cost=0.5, main_content=False),
+            before="html_text",
+        )
+        assert [s.name for s in registry] == ["trafilatura_retry", "og_description", "html_text"]
+
+
+class TestDomainStrategyPreferences:
+    def _preferences(self):
+        preferences = DomainStrategyPreferences()
+        preferences.enabled = True
+        preferences.min_samples = 3
+        preferences.min_share = 0.8
+        preferences.explore_rate = 0.0
+        return preferences
+
+    def test_needs_samples_and_share(self):
+        preferences = self._preferences()
+        preferences.seed([("spa.com", "html_text")] * 2)
+        assert preferences.preferred("spa.com") is None
+
+        preferences.record("spa.com", "html_text")
+        assert preferences.preferred("spa.com") == "html_text"
+
+        preferences.seed([("mixed.com", "html_text"), ("mixed.com", "trafilatura_retry")] * 2)
+        assert preferences.preferred("mixed.com") is None
+        assert preferences.preferred("unknown.com") is None
+
+    def test_exploration_skips_preference(self):
+        preferences = self._preferences()
+        preferences.explore_rate = 1.0
+        preferences.seed([("spa.com", "html_text")] * 5)
+
+        assert preferences.preferred("spa.com") is None
+        assert preferences.get_stats()["explored"] == 1
+        assert preferences.get_stats()["domains_with_preference"] == 1
+
+    def test_window_forgets_old_outcomes(self):
+        preferences = DomainStrategyPreferences(window=4)
+        preferences.enabled = True
+        preferences.min_samples = 3
+        preferences.min_share = 0.75
+        preferences.explore_rate = 0.0
+        preferences.seed([("blog.com", "html_text")] * 4)
+        preferences.seed([("blog.com", "trafilatura_retry")] * 3)
+
+        assert preferences.preferred("blog.com") == "trafilatura_retry"
@@ -0,0 +1,33 @@
+# tests/unit/test_url_cleaner.py
+from app.services.url_cleaner import URLCleaner
+
+
+class TestBookmarkKeys:
+    def test_equivalent_urls_share_hash(self):
+        keys = URLCleaner.bookmark_keys("HTTPS://Example.com:443/post/?b=2&a=1&utm_source=x&fbclid=y#top")
+
+        assert keys["url_clean"] == "https://example.com/post?a=1&b=2"
+        assert keys["url_hash"] == URLCleaner.bookmark_keys("https://example.com/post?a=1&b=2")["url_hash"]
+        assert keys["tracking_params"] == {"utm_source": "x", "fbclid": "y"}
+
+    def test_scheme_is_not_part_of_hash(self):
+        http = URLCleaner.bookmark_keys("http://example.com/a")
+        https = URLCleaner.bookmark_keys("https://example.com/a")
+
+        assert http["url_hash"] == https["url_hash"]
+        assert http["url_clean"] == "http://example.com/a"
+        assert http["url_hash"] != URLCleaner.bookmark_keys("ftp://example.com/a")["url_hash"]
+
+    def test_hash_is_fixed_width(self):
+        short = URLCleaner.bookmark_keys("https://a.io")["url_hash"]
+        long = URLCleaner.bookmark_keys("https://example.com/" + "x" * 2000)["url_hash"]
+
+        assert len(short) == len(long) == 64
+        assert short != long
+
+    def test_functional_params_are_kept(self):
+        first = URLCleaner.bookmark_keys("https://example.com/watch?v=1")
+        second = URLCleaner.bookmark_keys("https://example.com/watch?v=2")
+
+        assert first["url_hash"] != second["url_hash"]
+        assert first["tracking_params"] is None
@@ -0,0 +1,61 @@
+# tests/unit/test_warc.py
+import gzip
+import pytest
+from app.services.warc import WARCWriter, read_archive
+
+PAGE = {
+    "url": "https://example.com/final",
+    "status_code": 200,
+    "content_type": "text/html",
+    "encoding": "iso-8859-1",
+    "content": "<html><title>Café</title></html>".encode("iso-8859-1"),
+    "truncated": True,
+    "etag": '"abc"',
+    "last_modified": None,
+    "headers": [
+        ("Content-Type", "text/html; charset=ISO-8859-1"),
+        ("Content-Encoding", "gzip"),
+        ("ETag", '"abc"'),
+    ],
+}
+
+
+class TestWARC:
+    @pytest.mark.asyncio
+    async def test_round_trip(self, tmp_path):
+        writer = WARCWriter(directory=str(tmp_path))
+        await writer.write("https://example.com/start", PAGE)
+        await writer.write("https://example.com/final", {**PAGE, "truncated": False})
+        writer.close()
+
+        pages = list(read_archive([tmp_path]))
+        assert len(pages) == 2
+        first = pages[0]
+        assert first["bookmark_url"] == "https://example.com/start"
+        assert first["url"] == "https://example.com/final"
+        assert first["content"] == PAGE["content"]
+        assert first["encoding"] == "iso-8859-1"
+        assert first["etag"] == '"abc"'
+        assert first["truncated"] is True
+        assert pages[1]["bookmark_url"] == "https://example.com/final"
+        # El cuerpo se guarda descomprimido: no se conserva Content-Encoding
+        assert "Content-Encoding" not in dict(first["headers"])
+
+    def test_standard_warc_gz(self, tmp_path):
+        writer = WARCWriter(directory=str(tmp_path))
+        writer._write("https://example.com/start", PAGE)
+        writer.close()
+
+        raw = gzip.decompress(next(tmp_path.glob("*.warc.gz")).read_bytes())
+        assert raw.startswith(b"WARC/1.1\r\nWARC-Type: warcinfo")
+        assert b"WARC-Type: response" in raw
+        assert b"WARC-Truncated: length" in raw
+
+    def test_rotation(self, tmp_path):
+        writer = WARCWriter(directory=str(tmp_path), max_file_bytes=1)
+        writer._write("https://example.com/a", PAGE)
+        writer._write("https://example.com/b", PAGE)
+        writer.close()
+
+        assert writer.get_stats()["files"] == 2
+        assert len(list(read_archive([tmp_path]))) == 2